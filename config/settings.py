@@ -2,7 +2,7 @@ from pydantic_settings import BaseSettings
 import os 
 from dotenv import load_dotenv
 load_dotenv()
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 @dataclass
 class Config():
@@ -10,18 +10,76 @@ class Config():
     host: str = "your_es_url"
     port: int = 9205
     es_url: str = f"http://{host}:{port}"
-    index_name: str = "your_es_index"
+    index_name: str = "your_es_index"   # alias; data lives in versioned <index_name>_v<timestamp> indices
     username: str = None
     password: str = None
+    vector_store_backend: str = "elasticsearch"   # or "local": in-process memmap vectors + BM25, no cluster needed
+    local_store_path: str = ".cache/local_index"
+    local_store_dtype: str = "float32"   # "float16" halves memory at a small precision cost
+    ann_index: str = None                # local store only: None (exact scan), "hnsw" or "ivfpq"
+    ann_min_rows: int = 20000            # below this many chunks the exact scan is fast enough
+    ann_ef_search: int = 64              # HNSW beam width at query time (hnsw_m / hnsw_ef_construction apply too)
+    ivf_nlist: int = 1024                # IVF cells; ~sqrt(num chunks) to 4*sqrt
+    pq_m: int = 48                       # PQ bytes per vector; must divide the indexed dimension, else the largest divisor below it is used
+    ann_nprobe: int = 16                 # IVF cells visited per query
+    ann_rerank_factor: int = 10          # candidates fetched per result and re-scored with exact vectors
+    es_pool_maxsize: int = 32            # pooled keep-alive connections per node, shared by all components
+    es_request_timeout: float = 10
+    es_max_retries: int = 3              # retries on timeouts and 429/502/503/504
+    es_retry_on_timeout: bool = True
+    es_http_compress: bool = False       # gzip request bodies; helps bulk loads over slow links
     
     # Embedding settings
     embedding_model_name: str = "hkunlp/instructor-large"
     embedding_dimension: int = 768
+    embedding_device: str = "auto"       # "auto" picks cuda, then mps, then cpu
+    embedding_precision: str = "fp32"    # "int8" = dynamically quantized model for CPU-only nodes
+    embedding_batch_size: int = 32
+    embedding_tokens_per_batch: int = 8192   # padded-token budget per length bucket during bulk encoding
+    embedding_workers: int = 0           # >1 spreads bulk encoding over a multi-process pool
+    embedding_dtype: str = "float32"     # bulk-encoding output dtype ("float16" halves memory)
+    embedding_cache_dir: str = ".cache/embeddings"   # document chunk vectors (queries use query_cache_*); None disables
     
     
     # Retrieval settings
     top_k_results: int = 5
-    similarity_threshold: float = 0.87
+    similarity_threshold: float = 0.87   # cosine similarity at which a cached answer is reused
+    answer_cache_size: int = 512         # semantic answer cache entries; 0 disables
+    answer_cache_ttl: int = 3600         # seconds
+    answer_cache_version_check_s: float = 5   # how often the serving index version is re-read
+    query_cache_size: int = 1024         # in-process query embedding LRU; 0 disables
+    query_cache_ttl: int = 3600          # seconds
+    query_batching: bool = True          # encode concurrent queries together in one forward pass
+    query_batch_max_size: int = 16
+    query_batch_wait_ms: float = 5       # how long the first query waits for others to join its batch
+    semantic_search_mode: str = "knn"    # "knn" (approximate HNSW) or "script" (exact script_score scan)
+    knn_num_candidates: int = 100        # HNSW candidates per shard; raise for recall, lower for latency
+    hybrid_search_mode: str = "auto"     # "auto"/"native_rrf" (RRF retriever, falls back to msearch), "msearch", "parallel", "sequential" (one search at a time)
+    rrf_rank_constant: int = 60
+    fusion_method: str = "rrf"           # "rrf", "weighted_rrf", "minmax" or "zscore"
+    # Retrievers fused by hybrid search and their weights; add "title" for a title-match retriever
+    fusion_weights: dict = field(default_factory=lambda: {"lexical": 1.0, "semantic": 1.0})
+
+    # Cross-encoder reranking of the fused candidates (top_k_results candidates are kept otherwise)
+    rerank_enabled: bool = False
+    reranker_model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_candidates: int = 30          # fused candidates scored by the cross-encoder
+    rerank_top_n: int = 3                # documents passed to the LLM after reranking
+    rerank_budget_ms: float = 200        # hard per-request deadline (queueing + scoring); past it the fused order is used. None waits indefinitely
+    rerank_workers: int = 4              # concurrent rerank requests; one that gets no worker before its deadline is dropped
+    rerank_batch_size: int = 16
+    rerank_max_length: int = 256         # tokens per (query, passage) pair
+    rerank_device: str = "cpu"
+
+    # Vector index layout (applies when an index is created)
+    vector_index_type: str = None        # None (cluster default), "hnsw", "int8_hnsw", "int4_hnsw" or "bbq_hnsw"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 100
+    lean_index_mapping: bool = True      # no duplicate content/metadata fields, vectors excluded from _source
+    dimension_reduction: str = "none"    # "none", "matryoshka" (truncate, MRL-trained models only) or "pca"
+    reduced_dimension: int = 256
+    dimension_reduction_path: str = ".cache/dimension_reduction.npz"   # fitted PCA, shared with the inference service
+    dimension_reduction_fit_samples: int = 2048
     
     # Azure OpenAI settings
     AZURE_API_KEY: str = os.getenv("AZURE_OPENAI_API_KEY")
@@ -36,6 +94,38 @@ class Config():
     max_links_per_page: int = 10
     max_tokens_per_chunk: int = 200
 
+    #Crawler settings
+    crawl_mode: str = "async"            # "async" (concurrent breadth-first) or "recursive"
+    crawl_concurrency: int = 8
+    requests_per_second: float = None    # per host; None derives it from `delay`
+    max_frontier_size: int = 1000
+    html_parser: str = "lxml"            # falls back to html.parser when lxml is missing
+    parse_workers: int = 0               # >0 parses/chunks pages in a process pool separate from fetching
+    parse_queue_size: int = 32           # fetched pages waiting for a parse worker
+
+    #Ingestion settings
+    stream_ingestion: bool = True        # embed and index micro-batches while crawling
+    index_batch_size: int = 64
+    index_versions_to_keep: int = 2      # versioned indices behind the index_name alias kept after a rebuild (incl. live)
+    rebuild_min_doc_ratio: float = 0.9   # a rebuilt index must hold at least this share of the live index's documents
+    rebuild_validation_query: str = "What is Salesforce Data Cloud?"
+    incremental_sync: bool = True        # skip chunks whose content_hash is unchanged, delete chunks gone from crawled pages
+    bulk_chunk_size: int = 500           # documents per _bulk request
+    bulk_threads: int = 1                # >1 sends bulk requests from a thread pool (parallel_bulk)
+    bulk_request_timeout: float = 120
+    bulk_max_retries: int = 5            # retries for documents rejected with 429, with exponential backoff
+    bulk_initial_backoff: float = 2
+    bulk_optimize_settings: bool = True  # refresh_interval=-1 and 0 replicas while loading a rebuild index, restored afterwards
+    bulk_optimize_live_index: bool = False   # also relax them on the live index during incremental runs
+    dedup_enabled: bool = True           # drop exact and near-duplicate chunks before embedding
+    dedup_similarity_threshold: float = 0.95   # SimHash similarity; 0.95 = at most 3 of 64 bits differ
+    crawl_journal_path: str = ".cache/crawl_journal.sqlite"   # checkpoint for --resume; None disables
+
+    #Fetch cache settings (set fetch_cache_dir to None to disable)
+    fetch_cache_dir: str = ".cache/http"
+    fetch_cache_ttl: int = 6 * 3600      # seconds before a cached page is revalidated
+    fetch_cache_max_mb: int = 512
+
 
 
 # Create default config
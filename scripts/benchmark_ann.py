@@ -0,0 +1,91 @@
+import sys
+sys.path.append('.')
+import argparse
+import time
+
+import numpy as np
+
+from src.vectorstore.ann_index import HNSWIndex, IVFPQIndex
+from src.vectorstore.local_store import LocalVectorStore
+from config.settings import config
+
+# Recall-vs-latency of the HNSW and IVF-PQ indexes against exact search, on the chunk embeddings
+# of the local store (or a .npy matrix). Query vectors are held out from the indexed set.
+#   python3 scripts/benchmark_ann.py --queries 200 --ef 16 32 64 128 --nprobe 4 8 16 32
+
+
+def load_vectors(args):
+    if args.vectors:
+        vectors = np.load(args.vectors, mmap_mode="r")
+    else:
+        store = LocalVectorStore(config, read_only=True)
+        rows = np.sort(np.fromiter(store._ids.values(), dtype=np.int64, count=store.count()))
+        vectors = store._vectors[rows]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def evaluate(search, queries, truth, k, rerank_vectors=None, rerank_factor=1):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        ids, _ = search(query, k * rerank_factor)
+        if rerank_vectors is not None and len(ids):
+            ids = ids[np.argsort(-(rerank_vectors[ids] @ query))[:k]]
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(set(ids[:k].tolist()) & expected) / k)
+    return np.mean(recalls), np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def report(label, result):
+    recall, p50, p95 = result
+    print(f"  {label:<28} recall@k {recall:.3f}  p50 {p50:7.2f} ms  p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN index recall vs latency benchmark")
+    parser.add_argument("--vectors", help=".npy embedding matrix; defaults to the local store's vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Held-out vectors used as queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--nlist", type=int, default=config.ivf_nlist)
+    parser.add_argument("--pq-m", type=int, default=config.pq_m)
+    parser.add_argument("--skip-hnsw", action="store_true", help="HNSW construction is slow in pure Python")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(vectors))
+    queries, base = vectors[order[:args.queries]], vectors[order[args.queries:]]
+    print(f"{len(base)} vectors x {base.shape[1]} dims, {len(queries)} held-out queries, k={args.k}")
+
+    start = time.perf_counter()
+    truth = [set(np.argpartition(-(base @ q), args.k)[:args.k].tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"exact scan: {exact_ms:.2f} ms/query, {base.nbytes / 1e6:.1f} MB of float32 vectors")
+
+    if not args.skip_hnsw:
+        start = time.perf_counter()
+        hnsw = HNSWIndex(base.shape[1], m=config.hnsw_m, ef_construction=config.hnsw_ef_construction)
+        hnsw.add(np.arange(len(base)), base)
+        graph_mb = (hnsw.layer0[:hnsw.size].nbytes + sum(4 * len(v) for level in hnsw.upper for v in level.values())) / 1e6
+        print(f"hnsw: built in {time.perf_counter() - start:.1f}s, graph {graph_mb:.1f} MB + vectors")
+        for ef in args.ef:
+            report(f"ef={ef}", evaluate(lambda q, n: hnsw.search(q, n, ef=ef), queries, truth, args.k))
+
+    start = time.perf_counter()
+    ivfpq = IVFPQIndex(base.shape[1], nlist=min(args.nlist, len(base)), m=args.pq_m)
+    ivfpq.train(base)
+    ivfpq.add(np.arange(len(base)), base)
+    print(f"ivfpq: built in {time.perf_counter() - start:.1f}s, codes {len(base) * args.pq_m / 1e6:.1f} MB")
+    for nprobe in args.nprobe:
+        search = lambda q, n: ivfpq.search(q, n, nprobe=nprobe)
+        report(f"nprobe={nprobe}", evaluate(search, queries, truth, args.k))
+        report(f"nprobe={nprobe} + rerank x{config.ann_rerank_factor}",
+               evaluate(search, queries, truth, args.k, base, config.ann_rerank_factor))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import sys
+sys.path.append('.')
+import argparse
+import glob
+import os
+import time
+
+from src.document_processing.web_scraper_2 import SmartDocumentScraper
+
+# Compares the legacy find_all extraction with the single-pass engine over saved help-article HTML.
+#   python3 scripts/benchmark_html_extraction.py --html-dir saved_pages/ --repeat 5
+
+
+def run(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [parse(html, url) for url, html in pages]
+    elapsed = (time.perf_counter() - start) / repeat
+    return elapsed, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML extraction micro-benchmark")
+    parser.add_argument("--html-dir", required=True, help="Directory with saved *.html pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.html_dir, "*.html"))):
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            pages.append((f"https://help.salesforce.com/s/articleView?id={os.path.basename(path)}", f.read()))
+    if not pages:
+        print(f"No .html files found in {args.html_dir}")
+        return 1
+
+    total_mb = sum(len(html) for _, html in pages) / 1e6
+    print(f"{len(pages)} pages, {total_mb:.1f} MB, {args.repeat} repeats")
+
+    legacy = SmartDocumentScraper()
+    single_pass_html = SmartDocumentScraper(html_parser="html.parser")
+    single_pass_lxml = SmartDocumentScraper(html_parser="lxml")
+
+    baseline, legacy_results = run(legacy._parse_html_legacy, pages, args.repeat)
+    print(f"legacy (html.parser)      : {baseline * 1000:8.1f} ms")
+
+    for name, scraper in [("single-pass (html.parser)", single_pass_html), ("single-pass (lxml)", single_pass_lxml)]:
+        elapsed, results = run(scraper._parse_html, pages, args.repeat)
+        same_headings = sum(
+            [s['heading'] for s in new[0]] == [s['heading'] for s in old[0]]
+            for new, old in zip(results, legacy_results)
+        )
+        print(f"{name:26s}: {elapsed * 1000:8.1f} ms  speedup x{baseline / elapsed:.1f}  "
+              f"same headings on {same_headings}/{len(pages)} pages")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+import sys
+sys.path.append('.')
+import argparse
+import time
+
+import numpy as np
+
+from src.retrieval.hybrid_retrieval import Hybrid_search
+from config.settings import config
+
+# Compares end-to-end hybrid retrieval latency for the parallel (thread pool), msearch and native RRF modes.
+#   python3 scripts/benchmark_hybrid_search.py --queries-file sample_queries.txt --repeat 5
+
+SAMPLE_QUERIES = [
+    "How does Salesforce Data Cloud work?",
+    "What is identity resolution in Data Cloud?",
+    "How do I create a data stream from Amazon S3?",
+    "Explain zero copy data federation with Snowflake.",
+    "What are calculated insights and how are they refreshed?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid search round-trip benchmark")
+    parser.add_argument("--queries-file", help="One query per line; defaults to built-in sample queries")
+    parser.add_argument("--top-k", type=int, default=5, help="Lexical and semantic candidates per query")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = SAMPLE_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    search = Hybrid_search(config)
+    # Embed every query once so the timings only cover Elasticsearch
+    for query in queries:
+        search.get_embeddings(query)
+
+    modes = ["parallel", "msearch"]
+    if search._supports_native_rrf():
+        modes.append("native_rrf")
+    else:
+        print("Cluster is older than 8.14, skipping native_rrf")
+
+    baseline = None
+    for mode in modes:
+        search.hybrid_search_mode = mode
+        latencies = []
+        for _ in range(args.repeat):
+            for query in queries:
+                start = time.perf_counter()
+                search.hybrid_search(query, args.top_k, args.top_k)
+                latencies.append((time.perf_counter() - start) * 1000)
+        p50 = np.percentile(latencies, 50)
+        baseline = baseline or p50
+        print(f"{mode:<12} p50 {p50:7.1f} ms  p95 {np.percentile(latencies, 95):7.1f} ms  x{baseline / p50:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
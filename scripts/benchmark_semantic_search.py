@@ -0,0 +1,82 @@
+import sys
+sys.path.append('.')
+import argparse
+import time
+
+import numpy as np
+
+from src.retrieval.hybrid_retrieval import Hybrid_search
+from config.settings import config
+
+# Compares approximate kNN (HNSW) semantic search with the exact script_score scan on the live index.
+# The script_score results are the ground truth for recall@k.
+#   python3 scripts/benchmark_semantic_search.py --queries-file sample_queries.txt --k 5 --num-candidates 50 100 200
+
+SAMPLE_QUERIES = [
+    "How does Salesforce Data Cloud work?",
+    "What is identity resolution in Data Cloud?",
+    "How do I create a data stream from Amazon S3?",
+    "Explain zero copy data federation with Snowflake.",
+    "What are calculated insights and how are they refreshed?",
+    "How do segments get activated to marketing channels?",
+    "Which data model objects are required for unified profiles?",
+    "How can I connect Tableau to Data Cloud?",
+]
+
+
+def timed_search(search, query, k, mode, num_candidates=None):
+    start = time.perf_counter()
+    hits = search.semantic_search(query, k, mode=mode, num_candidates=num_candidates)
+    return [hit["_id"] for hit in hits], (time.perf_counter() - start) * 1000
+
+
+def report(label, latencies, recalls=None):
+    line = f"{label:<22} p50 {np.percentile(latencies, 50):7.1f} ms  p95 {np.percentile(latencies, 95):7.1f} ms"
+    if recalls is not None:
+        line += f"  recall@k {np.mean(recalls):.3f}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="kNN vs script_score semantic search benchmark")
+    parser.add_argument("--queries-file", help="One query per line; defaults to built-in sample queries")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--num-candidates", type=int, nargs="+", default=[config.knn_num_candidates])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    queries = SAMPLE_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    search = Hybrid_search(config)
+    count = search.es.count(index=search.index_name)["count"]
+    print(f"Index {search.index_name}: {count} documents, {len(queries)} queries, k={args.k}")
+
+    # Embed every query once so the timings only cover Elasticsearch
+    for query in queries:
+        search.get_embeddings(query)
+
+    exact = {}
+    latencies = []
+    for _ in range(args.repeat):
+        for query in queries:
+            exact[query], ms = timed_search(search, query, args.k, "script")
+            latencies.append(ms)
+    report("script_score", latencies)
+
+    for num_candidates in args.num_candidates:
+        latencies, recalls = [], []
+        for _ in range(args.repeat):
+            for query in queries:
+                ids, ms = timed_search(search, query, args.k, "knn", num_candidates)
+                latencies.append(ms)
+                if exact[query]:
+                    recalls.append(len(set(ids) & set(exact[query])) / len(exact[query]))
+        report(f"knn nc={num_candidates}", latencies, recalls)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
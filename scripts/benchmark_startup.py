@@ -0,0 +1,49 @@
+import sys
+sys.path.append('.')
+import argparse
+import time
+
+# Measures the inference service's cold-start phases: module imports, pipeline construction
+# (model load + clients), warmup and the first query embedding.
+#   python3 scripts/benchmark_startup.py --query "What is Data Cloud?"
+
+
+def timed(label, fn, timings):
+    start = time.perf_counter()
+    result = fn()
+    timings.append((label, time.perf_counter() - start))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference service startup benchmark")
+    parser.add_argument("--query", default="How does Salesforce Data Cloud work?")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip InferencePipeline.warmup()")
+    args = parser.parse_args()
+
+    timings = []
+
+    def import_pipeline():
+        from src.pipeline.inference_pipeline import InferencePipeline
+        from config.settings import config
+        return InferencePipeline, config
+
+    InferencePipeline, config = timed("import", import_pipeline, timings)
+    pipeline = timed("construct", lambda: InferencePipeline(config), timings)
+    if not args.no_warmup:
+        timed("warmup", pipeline.warmup, timings)
+    timed("first query embedding", lambda: pipeline.search.get_embeddings(args.query), timings)
+    timed("second query embedding", lambda: pipeline.search.get_embeddings(args.query + "?"), timings)
+
+    from src.embeddings import model_registry
+    print(f"Models loaded: {model_registry.loaded_models()}")
+    total = 0.0
+    for label, seconds in timings:
+        total += seconds
+        print(f"{label:<24} {seconds * 1000:9.1f} ms")
+    print(f"{'total':<24} {total * 1000:9.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
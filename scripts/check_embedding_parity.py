@@ -0,0 +1,78 @@
+import sys
+sys.path.append('.')
+import argparse
+import time
+
+import numpy as np
+
+from src.embeddings.embeddings import SentenceTransformerEmbeddings
+from config.settings import config
+
+# Checks that the int8 CPU embedding path agrees with the fp32 model and measures query throughput.
+# Exits non-zero when agreement is below the thresholds, so it can gate a deployment.
+#   python3 scripts/check_embedding_parity.py --texts-file sample_queries.txt
+
+SAMPLE_TEXTS = [
+    "How does Salesforce Data Cloud work?",
+    "What is identity resolution in Data Cloud?",
+    "How do I create a data stream from Amazon S3?",
+    "Explain zero copy data federation with Snowflake.",
+    "What are calculated insights and how are they refreshed?",
+    "How do segments get activated to marketing channels?",
+    "Which data model objects are required for unified profiles?",
+    "How can I connect Tableau to Data Cloud?",
+    "What limits apply to streaming ingestion API requests?",
+    "How is consent managed for customer data in Data Cloud?",
+]
+
+
+def throughput(model, texts, repeat):
+    model.embed_query(texts[0])  # warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            model.embed_query(text)
+    elapsed = time.perf_counter() - start
+    return repeat * len(texts) / elapsed, elapsed / (repeat * len(texts)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fp32 vs int8 embedding parity check")
+    parser.add_argument("--model", default=config.embedding_model_name)
+    parser.add_argument("--texts-file", help="One text per line; defaults to built-in sample queries")
+    parser.add_argument("--min-cosine", type=float, default=0.98, help="Lowest acceptable per-text cosine")
+    parser.add_argument("--mean-cosine", type=float, default=0.99, help="Lowest acceptable mean cosine")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts = SAMPLE_TEXTS
+    if args.texts_file:
+        with open(args.texts_file, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+
+    fp32 = SentenceTransformerEmbeddings(args.model, device="cpu", precision="fp32", normalize_embeddings=True)
+    int8 = SentenceTransformerEmbeddings(args.model, device="cpu", precision="int8", normalize_embeddings=True)
+
+    reference = np.asarray(fp32.embed_documents(texts))
+    quantized = np.asarray(int8.embed_documents(texts))
+    cosines = np.sum(reference * quantized, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(quantized, axis=1)
+    )
+
+    fp32_qps, fp32_ms = throughput(fp32, texts, args.repeat)
+    int8_qps, int8_ms = throughput(int8, texts, args.repeat)
+
+    print(f"Model: {args.model}, {len(texts)} texts")
+    print(f"Cosine fp32 vs int8: mean {cosines.mean():.4f}, min {cosines.min():.4f}")
+    print(f"fp32: {fp32_qps:7.1f} queries/s ({fp32_ms:.1f} ms/query)")
+    print(f"int8: {int8_qps:7.1f} queries/s ({int8_ms:.1f} ms/query), x{int8_qps / fp32_qps:.2f}")
+
+    if cosines.min() < args.min_cosine or cosines.mean() < args.mean_cosine:
+        print("FAIL: int8 embeddings diverge from fp32")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
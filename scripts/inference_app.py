@@ -6,6 +6,7 @@ import sys
 sys.path.append('.')
 
 from src.pipeline.inference_pipeline import InferencePipeline
+from src.vectorstore.es_client import close_es_clients
 from config.settings import config
 
 # Setup logging
@@ -27,15 +28,20 @@ def startup_event():
     global inference_pipeline
     try:
         inference_pipeline = InferencePipeline(config)
+        inference_pipeline.warmup()
         logger.info("Inference pipeline initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize pipeline: {str(e)}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_es_clients()
+
 # Pydantic models
 class QueryRequest(BaseModel):
     query: str = Field(..., min_length=1)
-    top_k: Optional[int] = Field(default=5, ge=1, le=20)
+    top_k: Optional[int] = Field(default=None, ge=1, le=20)   # defaults to config.top_k_results
 
 class QueryResponse(BaseModel):
     query: str
@@ -49,10 +55,17 @@ def root():
     return {
         "message": "RAG System API",
         "version": "1.0.0",
-        "endpoints": ["/query"]
+        "endpoints": ["/query", "/stats"]
     }
 
 
+@app.get("/stats")
+def stats():
+    if inference_pipeline is None:
+        raise HTTPException(status_code=503, detail="Pipeline not initialized")
+    return inference_pipeline.stats()
+
+
 @app.post("/query", response_model=QueryResponse)
 def process_query(request: QueryRequest):
     if inference_pipeline is None:
@@ -60,7 +73,8 @@ def process_query(request: QueryRequest):
     
     try:
         result = inference_pipeline.process_query(
-            query=request.query
+            query=request.query,
+            top_k=request.top_k
         )
         return QueryResponse(**result)
     except Exception as e:
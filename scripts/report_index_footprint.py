@@ -0,0 +1,84 @@
+import sys
+sys.path.append('.')
+import argparse
+import copy
+import time
+
+import numpy as np
+
+from src.retrieval.hybrid_retrieval import Hybrid_search
+from src.vectorstore.elasticsearch_store import VECTOR_BYTES, estimate_vector_memory
+from src.vectorstore.es_client import get_es_client
+from config.settings import config
+
+# Reports size, estimated vector RAM and kNN latency for one or more indices, e.g. the same corpus
+# ingested with different vector_index_type / dimension_reduction settings.
+#   python3 scripts/report_index_footprint.py --index docs_hnsw docs_int8 docs_bbq
+
+SAMPLE_QUERIES = [
+    "How does Salesforce Data Cloud work?",
+    "What is identity resolution in Data Cloud?",
+    "How do I create a data stream from Amazon S3?",
+    "Explain zero copy data federation with Snowflake.",
+    "What are calculated insights and how are they refreshed?",
+]
+
+
+def vector_mapping(es, index):
+    mapping = es.indices.get_mapping(index=index)
+    properties = next(iter(mapping.values()))["mappings"]["properties"]
+    vector = properties["vector"]
+    return vector["dims"], vector.get("index_options", {}).get("type", "cluster default")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector index footprint and latency report")
+    parser.add_argument("--index", nargs="+", default=[config.index_name])
+    parser.add_argument("--queries-file", help="One query per line; defaults to built-in sample queries")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = SAMPLE_QUERIES
+    if args.queries_file:
+        with open(args.queries_file, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    es = get_es_client(config)
+    for index in args.index:
+        dims, index_type = vector_mapping(es, index)
+        totals = es.indices.stats(index=index, metric=["docs", "store"])["_all"]["primaries"]
+        num_docs = totals["docs"]["count"]
+
+        # Each index may have been built with its own dimension reduction; the query path must match it
+        index_config = copy.copy(config)
+        index_config.index_name = index
+        if dims != config.embedding_dimension and config.dimension_reduction == "none":
+            print(f"{index}: {dims}-dim vectors but dimension_reduction is off, skipping latency")
+            search = None
+        else:
+            search = Hybrid_search(index_config)
+
+        print(f"\n{index}: {num_docs} docs, {dims} dims, {index_type}, "
+              f"{totals['store']['size_in_bytes'] / 1e6:.1f} MB on disk")
+        for candidate in VECTOR_BYTES:
+            marker = " <-" if candidate == index_type else ""
+            estimate = estimate_vector_memory(num_docs, dims, candidate, config.hnsw_m)
+            print(f"  est. vector RAM as {candidate:<10} {estimate / 1e6:9.1f} MB{marker}")
+
+        if search is None:
+            continue
+        for query in queries:
+            search.get_embeddings(query)
+        latencies = []
+        for _ in range(args.repeat):
+            for query in queries:
+                start = time.perf_counter()
+                search.semantic_search(query, args.k, mode="knn")
+                latencies.append((time.perf_counter() - start) * 1000)
+        print(f"  knn latency p50 {np.percentile(latencies, 50):.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 import sys
 sys.path.append('.')
+import argparse
 import logging
 from src.pipeline.training_pipeline import TrainingPipeline
 from config.settings import config
@@ -8,8 +9,12 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def main():
-
-    print("Hi")
+    parser = argparse.ArgumentParser(description="Scrape and index Salesforce help documentation")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run from the crawl journal")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Re-ingest into a new index version and switch the alias to it once validated")
+    args = parser.parse_args()
     
     url = "https://help.salesforce.com/s/articleView?id=data.c360_a_data_cloud.htm&type=5"
     
@@ -18,7 +23,7 @@ def main():
     pipeline = TrainingPipeline(config)
     
     try:
-        results = pipeline.process_urls(url)
+        results = pipeline.process_urls(url, resume=args.resume, rebuild=args.rebuild)
         
         logger.info("Training Results:")
         logger.info(f"  - Processed URLs: {results['processed_urls']}")
@@ -26,6 +31,9 @@ def main():
         logger.info(f"  - Failed URLs: {len(results['failed_urls'])}")
         logger.info(f"  - Success URLs: {len(results['success_urls'])}")
         
+        if 'rebuild' in results:
+            logger.info(f"  - Rebuild: {results['rebuild']}")
+        
         if results['failed_urls']:
             logger.warning(f"Failed URLs: {results['failed_urls']}")
         
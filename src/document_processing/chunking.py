@@ -1,8 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List,Dict,Any 
 import re 
-from transformers import AutoTokenizer
-from langchain.text_splitter import Language, RecursiveCharacterTextSplitter
 
 
 class BaseChunker(ABC) : 
@@ -20,6 +18,7 @@ class RecursiveChunker(BaseChunker) :
 
     def create_chunk(self, text) : 
         logging.info(f"Loading documents from {files}")
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
         chunks = text_splitter.split_documents(text)
         #logging.info("Printing texts")
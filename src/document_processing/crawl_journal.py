@@ -0,0 +1,154 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Page lifecycle: pending (in the frontier) -> scraped (chunks emitted) -> indexed (all chunks stored).
+# Pages that produced nothing are marked failed and retried on resume.
+PENDING = "pending"
+SCRAPED = "scraped"
+INDEXED = "indexed"
+FAILED = "failed"
+
+
+class CrawlJournal:
+    """SQLite journal of crawl progress so an interrupted run can be resumed.
+
+    Records the frontier, every URL seen with its status, and which chunk ids have
+    already been indexed.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                depth INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                indexed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_url ON chunks(url);
+        """)
+        self._conn.commit()
+
+    def reset(self, start_url: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('start_url', ?)", (start_url,))
+            self._conn.commit()
+        logger.info(f"Crawl journal reset: {self.path}")
+
+    def start_url(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'start_url'").fetchone()
+        return row[0] if row else None
+
+    def known_urls(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT url FROM pages")}
+
+    def unfinished_pages(self) -> List[Tuple[str, int]]:
+        """Pages to crawl again on resume, shallowest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, depth FROM pages WHERE status != ? ORDER BY depth, updated_at", (INDEXED,)
+            ).fetchall()
+        return [(url, depth) for url, depth in rows]
+
+    def add_pending(self, url: str, depth: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pages (url, depth, status, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET status = excluded.status, depth = excluded.depth, "
+                "updated_at = excluded.updated_at",
+                (url, depth, PENDING, time.time())
+            )
+            self._conn.commit()
+
+    def mark_scraped(self, url: str, chunk_ids: List[str]) -> None:
+        # A page without chunks has nothing left to index
+        status = SCRAPED if chunk_ids else INDEXED
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chunks (chunk_id, url) VALUES (?, ?)",
+                [(chunk_id, url) for chunk_id in chunk_ids]
+            )
+            self._conn.execute(
+                "UPDATE pages SET status = ?, error = NULL, updated_at = ? WHERE url = ?",
+                (status, time.time(), url)
+            )
+            self._update_indexed_pages_locked([url])
+            self._conn.commit()
+
+    def mark_failed(self, url: str, error: str = "") -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET status = ?, error = ?, updated_at = ? WHERE url = ?",
+                (FAILED, error, time.time(), url)
+            )
+            self._conn.commit()
+
+    def filter_unindexed(self, chunk_ids: Iterable[str]) -> Set[str]:
+        chunk_ids = list(chunk_ids)
+        indexed = set()
+        with self._lock:
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                indexed.update(row[0] for row in self._conn.execute(
+                    f"SELECT chunk_id FROM chunks WHERE indexed = 1 AND chunk_id IN ({placeholders})", batch
+                ))
+        return set(chunk_ids) - indexed
+
+    def mark_chunks_indexed(self, chunk_ids: Iterable[str]) -> None:
+        chunk_ids = list(chunk_ids)
+        with self._lock:
+            self._conn.executemany("UPDATE chunks SET indexed = 1 WHERE chunk_id = ?", [(c,) for c in chunk_ids])
+            urls = set()
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                urls.update(row[0] for row in self._conn.execute(
+                    f"SELECT DISTINCT url FROM chunks WHERE chunk_id IN ({placeholders})", batch
+                ))
+            self._update_indexed_pages_locked(urls)
+            self._conn.commit()
+
+    def _update_indexed_pages_locked(self, urls: Iterable[str]) -> None:
+        self._conn.executemany(
+            "UPDATE pages SET status = ?, updated_at = ? WHERE url = ? AND status = ? "
+            "AND NOT EXISTS (SELECT 1 FROM chunks WHERE chunks.url = pages.url AND indexed = 0)",
+            [(INDEXED, time.time(), url, SCRAPED) for url in urls]
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM pages GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import re
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+SIMHASH_BITS = 64
+
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) >= shingle_size:
+        features = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    else:
+        features = words
+
+    counts = [0] * SIMHASH_BITS
+    for feature in features:
+        h = _hash64(feature)
+        for bit in range(SIMHASH_BITS):
+            counts[bit] += 1 if (h >> bit) & 1 else -1
+
+    fingerprint = 0
+    for bit, count in enumerate(counts):
+        if count > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class ChunkDeduplicator:
+    """Drops exact and near-duplicate chunks before they are embedded.
+
+    Exact duplicates are caught by a sha256 of the whitespace/case-normalized text. Near
+    duplicates are chunks whose 64-bit SimHash fingerprints differ in at most
+    (1 - similarity_threshold) * 64 bits. Fingerprints are split into max_distance + 1 bands,
+    so any two fingerprints within that distance share at least one band exactly and only
+    chunks in the same band buckets are compared.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, shingle_size: int = 3):
+        self.similarity_threshold = similarity_threshold
+        self.shingle_size = shingle_size
+        self.max_distance = int((1 - similarity_threshold) * SIMHASH_BITS)
+
+        num_bands = self.max_distance + 1
+        width = SIMHASH_BITS // num_bands
+        self._bands = []
+        for band in range(num_bands):
+            start = band * width
+            end = SIMHASH_BITS if band == num_bands - 1 else start + width
+            self._bands.append((start, (1 << (end - start)) - 1))
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        self._exact_hashes = set()
+
+        self.exact_duplicates = 0
+        self.near_duplicates = 0
+        self.unique = 0
+
+    def is_duplicate(self, text: str) -> bool:
+        """Check a chunk against everything seen so far and remember it if it is new."""
+        normalized = " ".join(text.lower().split())
+        digest = hashlib.sha256(normalized.encode("utf-8")).digest()
+        if digest in self._exact_hashes:
+            self.exact_duplicates += 1
+            return True
+
+        fingerprint = simhash(normalized, self.shingle_size)
+        keys = [(fingerprint >> start) & mask for start, mask in self._bands]
+        for buckets, key in zip(self._buckets, keys):
+            for other in buckets.get(key, ()):
+                if (fingerprint ^ other).bit_count() <= self.max_distance:
+                    self.near_duplicates += 1
+                    return True
+
+        self._exact_hashes.add(digest)
+        for buckets, key in zip(self._buckets, keys):
+            buckets.setdefault(key, []).append(fingerprint)
+        self.unique += 1
+        return False
+
+    def filter(self, documents: List[str], metadata: List[Dict[str, Any]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        kept_documents, kept_metadata = [], []
+        for content, meta in zip(documents, metadata):
+            if not self.is_duplicate(content):
+                kept_documents.append(content)
+                kept_metadata.append(meta)
+        return kept_documents, kept_metadata
+
+    @property
+    def dropped(self) -> int:
+        return self.exact_duplicates + self.near_duplicates
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'unique_chunks': self.unique,
+            'exact_duplicates': self.exact_duplicates,
+            'near_duplicates': self.near_duplicates,
+            'duplicates_dropped': self.dropped
+        }
@@ -0,0 +1,144 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    url: str
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+
+class FetchCache:
+    """Persistent HTTP body cache keyed by normalized URL.
+
+    Entries younger than `ttl_seconds` are served without touching the network; older
+    ones are revalidated with If-None-Match / If-Modified-Since. The total stored size is
+    kept under `max_bytes` by evicting the least recently used pages.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: float = 6 * 3600, max_bytes: int = 512 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, "fetch_cache.sqlite")
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_accessed REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_accessed ON pages(last_accessed)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+        logger.info(f"Fetch cache at {self.db_path}: {self._total_bytes / 1e6:.1f} MB cached")
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        parsed = urlparse(url.strip())
+        query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+        return urlunparse((
+            parsed.scheme.lower(),
+            parsed.netloc.lower(),
+            parsed.path or "/",
+            parsed.params,
+            query,
+            ""
+        ))
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        key = self.normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM pages WHERE url = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET last_accessed = ? WHERE url = ?", (time.time(), key))
+            self._conn.commit()
+
+        body, etag, last_modified, fetched_at = row
+        return CachedPage(key, zlib.decompress(body).decode("utf-8"), etag, last_modified, fetched_at)
+
+    def is_fresh(self, page: CachedPage) -> bool:
+        return time.time() - page.fetched_at < self.ttl_seconds
+
+    def has_fresh(self, url: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at FROM pages WHERE url = ?", (self.normalize_url(url),)
+            ).fetchone()
+        return row is not None and time.time() - row[0] < self.ttl_seconds
+
+    def conditional_headers(self, page: Optional[CachedPage]) -> Dict[str, str]:
+        headers = {}
+        if page is None:
+            return headers
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        return headers
+
+    def put(self, url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        key = self.normalize_url(url)
+        blob = zlib.compress(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM pages WHERE url = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, body, etag, last_modified, fetched_at, last_accessed, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, blob, etag, last_modified, now, now, len(blob))
+            )
+            self._total_bytes += len(blob) - (row[0] if row else 0)
+            self._evict_locked()
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark a cached page as revalidated (e.g. after a 304)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, last_accessed = ? WHERE url = ?",
+                (now, now, self.normalize_url(url))
+            )
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self._conn.execute("SELECT url, size FROM pages ORDER BY last_accessed ASC").fetchall()
+        for url, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self._total_bytes -= size
+            evicted += 1
+        logger.info(f"Fetch cache evicted {evicted} pages, {self._total_bytes / 1e6:.1f} MB remaining")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,276 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+logger = logging.getLogger(__name__)
+
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+LIST_TAGS = {'ul', 'ol'}
+BLOCK_TAGS = {'p', 'div', 'li'}
+SKIP_TAGS = {'script', 'style', 'nav', 'header', 'footer'}
+# Tags whose boundaries separate words when their text is flattened
+BREAK_TAGS = HEADING_TAGS | LIST_TAGS | BLOCK_TAGS | {'br', 'tr', 'td', 'th'}
+SKIP_WORDS = ('loading', 'menu', 'search', 'navigation')
+
+MAIN_CONTENT_SELECTORS = ('article', 'main', '[role="main"]', '.content', '.helpArticleContent', 'body')
+TITLE_SELECTORS = ('h1', '.slds-page-header__title', '.helpArticleTitle', 'title')
+
+_TEXT_TYPES = (NavigableString, CData)
+_parser_fallback_logged = False
+
+
+@dataclass
+class PageExtraction:
+    title: str
+    sections: List[Dict[str, str]]
+    links: List[str]  # raw hrefs from the main content, in document order
+
+
+def make_soup(html: str, parser: str = "lxml") -> BeautifulSoup:
+    global _parser_fallback_logged
+    if parser == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            if not _parser_fallback_logged:
+                logger.warning("lxml is not installed, falling back to html.parser")
+                _parser_fallback_logged = True
+            parser = "html.parser"
+    return BeautifulSoup(html, parser)
+
+
+def extract_page(html: str, parser: str = "lxml") -> PageExtraction:
+    """Extract title, heading-delimited sections and links in a single walk over the tree.
+
+    Produces the same section structure as the find_all based extraction, but every text
+    node is visited once: nested blocks contribute only their own text, so a div no longer
+    repeats the paragraphs it contains, and list items are not emitted twice.
+    """
+    walker = _PageWalker()
+    walker.walk(make_soup(html, parser))
+    return walker.result()
+
+
+def _matches(tag: Tag, selector: str) -> bool:
+    if selector.startswith('.'):
+        return selector[1:] in (tag.get('class') or [])
+    if selector == '[role="main"]':
+        return tag.get('role') == 'main'
+    return tag.name == selector
+
+
+def _normalize(parts: List[str]) -> str:
+    return ' '.join(''.join(parts).split())
+
+
+def _keep(text: str) -> bool:
+    if not text or len(text) < 10:
+        return False
+    lowered = text.lower()
+    return not any(skip in lowered for skip in SKIP_WORDS)
+
+
+def build_sections(blocks: List[Tuple[str, int, str]]) -> List[Dict[str, str]]:
+    content_sections = []
+    current_section = []
+    current_heading = ""
+
+    for kind, level, text in blocks:
+        if kind == 'heading':
+            if current_section:
+                section_content = '\n\n'.join(current_section)
+                if section_content.strip():
+                    content_sections.append({
+                        'heading': current_heading,
+                        'content': section_content.strip()
+                    })
+            current_heading = text
+            current_section = [f"{'#' * level} {text}"]
+        else:
+            current_section.append(text)
+
+    if current_section:
+        section_content = '\n\n'.join(current_section)
+        if section_content.strip():
+            content_sections.append({
+                'heading': current_heading,
+                'content': section_content.strip()
+            })
+
+    return content_sections
+
+
+class _PageWalker:
+    def __init__(self):
+        self.blocks: List[Tuple[str, int, str]] = []  # (kind, heading level, text)
+        self.links: List[str] = []
+        self.text_chars = 0
+        # selector -> [start_block, start_link, start_chars, end_block, end_link, end_chars]
+        self.main_candidates: Dict[str, List[int]] = {}
+        self.title_elements: Dict[str, Tag] = {}
+        # Open text runs of enclosing p/div/li blocks; None is a barrier at a main-content candidate
+        self._runs: List[Optional[List[str]]] = []
+
+    def walk(self, root: BeautifulSoup) -> None:
+        stack = [(root, None)]
+        while stack:
+            node, exit_frame = stack.pop()
+            if exit_frame is not None:
+                self._exit(*exit_frame)
+                continue
+
+            if isinstance(node, NavigableString):
+                if type(node) in _TEXT_TYPES:
+                    self._text(node)
+                continue
+            if not isinstance(node, Tag):
+                continue
+
+            name = node.name
+            if name in SKIP_TAGS:
+                self._scan_skipped(node)
+                continue
+
+            self._observe(node)
+            candidates = self._open_candidates(node)
+
+            if name in HEADING_TAGS:
+                parts = []
+                self._collect_text(node, parts)
+                self._emit('heading', int(name[1]), _normalize(parts))
+                self._close_candidates(candidates)
+                continue
+
+            if name in LIST_TAGS:
+                items = []
+                self._collect_items(node, items)
+                self._emit('list', 0, '\n'.join(item for item in items if item))
+                self._close_candidates(candidates)
+                continue
+
+            is_block = name in BLOCK_TAGS
+            if is_block:
+                self._flush()
+                self._runs.append([])
+            elif name == 'br' and self._runs and self._runs[-1] is not None:
+                self._runs[-1].append(' ')
+
+            stack.append((node, (is_block, candidates)))
+            stack.extend((child, None) for child in reversed(node.contents))
+
+    def _exit(self, is_block: bool, candidates: Tuple[str, ...]) -> None:
+        if is_block:
+            self._flush()
+            self._runs.pop()
+        self._close_candidates(candidates)
+
+    def _text(self, text: str) -> None:
+        self.text_chars += len(text.strip())
+        if self._runs and self._runs[-1] is not None:
+            self._runs[-1].append(text)
+
+    def _flush(self) -> None:
+        if self._runs and self._runs[-1]:
+            self._emit('text', 0, _normalize(self._runs[-1]))
+            self._runs[-1] = []
+
+    def _emit(self, kind: str, level: int, text: str) -> None:
+        if _keep(text):
+            self.blocks.append((kind, level, text))
+
+    def _observe(self, tag: Tag) -> None:
+        for selector in TITLE_SELECTORS:
+            if selector not in self.title_elements and _matches(tag, selector):
+                self.title_elements[selector] = tag
+        if tag.name == 'a' and tag.has_attr('href'):
+            self.links.append(tag['href'])
+
+    def _scan_skipped(self, tag: Tag) -> None:
+        # Skipped subtrees never contribute content, but the title is looked up before cleaning
+        for selector in TITLE_SELECTORS:
+            if selector in self.title_elements:
+                continue
+            if _matches(tag, selector):
+                self.title_elements[selector] = tag
+                continue
+            if selector.startswith('.'):
+                found = tag.find(class_=selector[1:])
+            else:
+                found = tag.find(selector)
+            if found is not None:
+                self.title_elements[selector] = found
+
+    def _open_candidates(self, tag: Tag) -> Tuple[str, ...]:
+        opened = tuple(
+            selector for selector in MAIN_CONTENT_SELECTORS
+            if selector not in self.main_candidates and _matches(tag, selector)
+        )
+        if opened:
+            self._flush()
+            self._runs.append(None)
+            for selector in opened:
+                self.main_candidates[selector] = [len(self.blocks), len(self.links), self.text_chars]
+        return opened
+
+    def _close_candidates(self, candidates: Tuple[str, ...]) -> None:
+        if not candidates:
+            return
+        self._runs.pop()
+        for selector in candidates:
+            self.main_candidates[selector] += [len(self.blocks), len(self.links), self.text_chars]
+
+    def _collect_text(self, tag: Tag, parts: List[str]) -> None:
+        for child in tag.children:
+            if isinstance(child, NavigableString):
+                if type(child) in _TEXT_TYPES:
+                    self.text_chars += len(child.strip())
+                    parts.append(child)
+            elif isinstance(child, Tag):
+                if child.name in SKIP_TAGS:
+                    self._scan_skipped(child)
+                    continue
+                self._observe(child)
+                if child.name in BREAK_TAGS:
+                    parts.append(' ')
+                self._collect_text(child, parts)
+                if child.name in BREAK_TAGS:
+                    parts.append(' ')
+
+    def _collect_items(self, tag: Tag, items: List[str]) -> None:
+        for child in tag.children:
+            if isinstance(child, NavigableString):
+                if type(child) in _TEXT_TYPES:
+                    self.text_chars += len(child.strip())
+            elif isinstance(child, Tag):
+                if child.name in SKIP_TAGS:
+                    self._scan_skipped(child)
+                    continue
+                self._observe(child)
+                if child.name == 'li':
+                    parts = []
+                    self._collect_text(child, parts)
+                    items.append(_normalize(parts))
+                else:
+                    self._collect_items(child, items)
+
+    def result(self) -> PageExtraction:
+        blocks, links = self.blocks, self.links
+        for selector in MAIN_CONTENT_SELECTORS:
+            span = self.main_candidates.get(selector)
+            if span and span[5] - span[2] > 50:
+                blocks = self.blocks[span[0]:span[3]]
+                links = self.links[span[1]:span[4]]
+                break
+
+        title = "Untitled"
+        for selector in TITLE_SELECTORS:
+            element = self.title_elements.get(selector)
+            if element is not None:
+                text = element.get_text(strip=True)
+                if text and len(text) > 3:
+                    title = text
+                    break
+
+        return PageExtraction(title=title, sections=build_sections(blocks), links=links)
@@ -1,11 +1,22 @@
+import asyncio
+import hashlib
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-from typing import List, Set, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+import queue
+import threading
+from typing import List, Set, Dict, Any, Optional, Callable, Iterator
 from urllib.parse import urljoin, urlparse
 import logging
 import time
 import re
 from datetime import datetime
+from .rate_limiter import HostRateLimiter
+from .fetch_cache import FetchCache, CachedPage
+from .html_extraction import extract_page
+from .crawl_journal import CrawlJournal
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +30,12 @@ class Document:
 
 class SmartDocumentScraper:    
     def __init__(self, api_key: str = None, max_depth: int = 2, delay: float = 1.0, 
-                 max_links_per_page: int = 10, max_tokens_per_chunk: int = 800):
+                 max_links_per_page: int = 10, max_tokens_per_chunk: int = 800,
+                 crawl_mode: str = "async", concurrency: int = 8,
+                 requests_per_second: Optional[float] = None, max_frontier_size: int = 1000,
+                 cache: Optional[FetchCache] = None, html_parser: str = "lxml",
+                 parse_workers: int = 0, parse_queue_size: int = 32,
+                 journal: Optional[CrawlJournal] = None):
 
         self.api_key = api_key
         self.max_depth = max_depth
@@ -27,52 +43,174 @@ class SmartDocumentScraper:
         self.max_links_per_page = max_links_per_page
         self.max_tokens_per_chunk = max_tokens_per_chunk
         
+        # "async" runs the breadth-first concurrent crawler, "recursive" the sequential depth-first one
+        self.crawl_mode = crawl_mode
+        self.concurrency = max(1, concurrency)
+        # Per-host request rate; defaults to the rate implied by `delay`
+        if requests_per_second is None:
+            requests_per_second = 1.0 / delay if delay and delay > 0 else 0.0
+        self.requests_per_second = requests_per_second
+        self.max_frontier_size = max_frontier_size
+        self.cache = cache
+        self.html_parser = html_parser
+        # With parse_workers > 0, fetch threads only download and a process pool parses and chunks
+        self.parse_workers = parse_workers
+        self.parse_queue_size = parse_queue_size
+        # Checkpoints frontier, page status and chunk ids so an interrupted crawl can resume
+        self.journal = journal
+        
         self.visited_urls: Set[str] = set()
         self.documents: List[Document] = []
+        self.pages_scraped = 0
+        self.documents_created = 0
+        self.frontier_dropped = 0
+        # When set (streaming mode), chunks are handed to the sink instead of kept in self.documents
+        self._document_sink: Optional[Callable[[List[Document]], None]] = None
+        self._stop_requested = False
+        self._crawl_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._crawl_stop: Optional[asyncio.Event] = None
         self.base_url = "https://help.salesforce.com"
         
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
     
-    def scrape_to_documents(self, start_url: str) -> List[Document]:
+    def scrape_to_documents(self, start_url: str, resume: bool = False) -> List[Document]:
+        self._document_sink = None
+        self._run_crawl(start_url, resume)
+        return self.documents
+    
+    def iter_documents(self, start_url: str, max_buffered_pages: int = 64,
+                       resume: bool = False) -> Iterator[Document]:
+        """Yield document chunks as pages are scraped, without collecting them in self.documents.
+        
+        The crawl runs on a background thread and hands over chunks page by page through a
+        bounded buffer; when the consumer falls behind, the crawler waits. Closing the
+        generator early stops the crawl from following further links.
+        """
+        buffer: queue.Queue = queue.Queue(maxsize=max_buffered_pages)
+        finished = object()
+        consumer_gone = threading.Event()
+        
+        def put(item) -> None:
+            while not consumer_gone.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+        
+        def run() -> None:
+            try:
+                self._run_crawl(start_url, resume)
+            except Exception as e:
+                put(e)
+            finally:
+                put(finished)
+        
+        self._document_sink = put
+        crawler = threading.Thread(target=run, name="document-crawler", daemon=True)
+        crawler.start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is finished:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield from item
+        finally:
+            consumer_gone.set()
+            self.request_stop()
+            crawler.join()
+            self._document_sink = None
+    
+    def request_stop(self) -> None:
+        """Stop following links; the async crawl also cancels its workers and drops the queued frontier.
+        
+        Safe to call from any thread. Dropped URLs stay pending in the journal for --resume.
+        """
+        self._stop_requested = True
+        loop, stop = self._crawl_loop, self._crawl_stop
+        if loop is not None and stop is not None:
+            try:
+                loop.call_soon_threadsafe(stop.set)
+            except RuntimeError:
+                pass  # the loop already closed
+    
+    def _run_crawl(self, start_url: str, resume: bool = False) -> None:
         logger.info(f"Starting smart document scraping: {start_url}")
         logger.info(f"Max depth: {self.max_depth}, Max tokens per chunk: {self.max_tokens_per_chunk}")
         
         self.visited_urls.clear()
         self.documents.clear()
+        self.pages_scraped = 0
+        self.documents_created = 0
+        self.frontier_dropped = 0
+        self._stop_requested = False
+        
+        seeds = self._initial_frontier(start_url, resume)
         
-        self._scrape_recursive(start_url, depth=0)
+        if self.crawl_mode == "async":
+            logger.info(f"Crawl mode: async, concurrency: {self.concurrency}, "
+                        f"per-host rate: {self.requests_per_second} req/s")
+            asyncio.run(self._crawl_async(seeds))
+        else:
+            for url, depth in seeds:
+                self._scrape_recursive(url, depth)
         
         logger.info(f"Scraping completed!")
-        logger.info(f"Total documents: {len(self.documents)}")
+        logger.info(f"Total documents: {self.documents_created}")
         logger.info(f"URLs processed: {len(self.visited_urls)}")
+        if self.frontier_dropped:
+            logger.warning(f"Links skipped because the frontier was full: {self.frontier_dropped}")
+    
+    def _initial_frontier(self, start_url: str, resume: bool) -> List[tuple]:
+        if self.journal is None:
+            return [(start_url, 0)]
         
-        return self.documents
+        if resume and self.journal.start_url() == start_url:
+            seeds = self.journal.unfinished_pages()
+            # Finished pages count as visited so their links are not crawled again
+            self.visited_urls.update(self.journal.known_urls() - {url for url, _ in seeds})
+            logger.info(f"Resuming crawl: {len(self.visited_urls)} pages done, {len(seeds)} left in frontier")
+            return seeds
+        
+        if resume:
+            logger.warning(f"No resumable crawl for {start_url} in {self.journal.path}, starting fresh")
+        self.journal.reset(start_url)
+        return [(start_url, 0)]
     
     def _scrape_recursive(self, url: str, depth: int) -> None:
         if depth > self.max_depth:
             logger.info(f"Max depth {self.max_depth} reached: {url}")
             return
         
-        if url in self.visited_urls:
+        if url in self.visited_urls or self._stop_requested:
             return
         
         self.visited_urls.add(url)
+        if self.journal:
+            self.journal.add_pending(url, depth)
         logger.info(f"[{len(self.visited_urls)}] Scraping (depth {depth}): {url}")
         
         try:
             content_sections, title, links = self._scrape_page(url)
-            if content_sections:
-                chunks = self._smart_chunk_content(content_sections, url, title, depth)
-                self.documents.extend(chunks)
-                logger.info(f"Created {len(chunks)} document chunks from URL")
-                total_tokens = sum(self._estimate_tokens(chunk.page_content) for chunk in chunks)
-                logger.info(f"Total tokens: {total_tokens}, Avg per chunk: {total_tokens//len(chunks) if chunks else 0}")
+            chunks = self._smart_chunk_content(content_sections, url, title, depth) if content_sections else []
+            self._finish_page(url, chunks, links)
             
             if self.delay > 0:
                 time.sleep(self.delay)
+            
+            if self.journal and depth < self.max_depth:
+                # Depth-first order leaves siblings unvisited for a long time; journal them now
+                for link_url in links[:self.max_links_per_page]:
+                    if link_url not in self.visited_urls:
+                        self.journal.add_pending(link_url, depth + 1)
         
             for i, link_url in enumerate(links[:self.max_links_per_page]):
                 logger.info(f"Following link {i+1}: {link_url}")
@@ -80,29 +218,225 @@ class SmartDocumentScraper:
         
         except Exception as e:
             logger.error(f"Error scraping {url}: {str(e)}")
+            if self.journal:
+                self.journal.mark_failed(url, str(e))
     
-    def _scrape_page(self, url: str) -> tuple:
+    async def _crawl_async(self, seeds: List[tuple]) -> None:
+        """Breadth-first crawl with `concurrency` fetches in flight and a per-host token bucket."""
+        frontier: asyncio.Queue = asyncio.Queue()
+        rate_limiter = HostRateLimiter(self.requests_per_second, burst=self.concurrency)
+        self._crawl_stop = asyncio.Event()
+        self._crawl_loop = asyncio.get_running_loop()
+        if self._stop_requested:
+            self._crawl_stop.set()
+        for url, depth in seeds:
+            # Resumed seeds are pending in the journal; dropping one would leave it pending forever
+            self._enqueue(frontier, url, depth, seed=True)
+        
+        if self.parse_workers > 0:
+            await self._crawl_with_parse_pool(frontier, rate_limiter)
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            workers = [
+                asyncio.create_task(self._crawl_worker(frontier, rate_limiter, executor))
+                for _ in range(self.concurrency)
+            ]
+            await self._drain(frontier, workers)
+    
+    async def _crawl_with_parse_pool(self, frontier: asyncio.Queue, rate_limiter: HostRateLimiter) -> None:
+        """Producer/consumer crawl: I/O workers fetch raw HTML, a process pool parses and chunks it.
+        
+        A frontier item is only marked done once its page has been parsed and its links queued,
+        so frontier.join() covers both stages. The bounded parse queue makes fetch workers wait
+        when parsing falls behind instead of buffering HTML without limit.
+        """
+        parse_queue: asyncio.Queue = asyncio.Queue(maxsize=self.parse_queue_size)
+        logger.info(f"Parse stage: {self.parse_workers} processes, queue size {self.parse_queue_size}")
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as io_executor, \
+                ProcessPoolExecutor(max_workers=self.parse_workers,
+                                    mp_context=multiprocessing.get_context("spawn"),
+                                    initializer=_init_parse_worker,
+                                    initargs=(self.max_tokens_per_chunk, self.html_parser)) as parse_executor:
+            workers = [
+                asyncio.create_task(self._fetch_worker(frontier, parse_queue, rate_limiter, io_executor))
+                for _ in range(self.concurrency)
+            ]
+            workers += [
+                asyncio.create_task(self._parse_worker(frontier, parse_queue, parse_executor))
+                for _ in range(self.parse_workers)
+            ]
+            await self._drain(frontier, workers)
+    
+    async def _drain(self, frontier: asyncio.Queue, workers: List[asyncio.Task]) -> None:
+        done = asyncio.create_task(frontier.join())
+        stopped = asyncio.create_task(self._crawl_stop.wait())
         try:
-            if self.api_key:
-                html_content = self._scrape_with_api(url)
+            await asyncio.wait({done, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # On a stop request the workers are cancelled mid-wait (rate limiter, parse queue or
+            # sink) instead of working through the rest of the frontier first
+            for task in [done, stopped, *workers]:
+                task.cancel()
+            await asyncio.gather(done, stopped, *workers, return_exceptions=True)
+            while not frontier.empty():
+                frontier.get_nowait()
+                frontier.task_done()
+            self._crawl_loop = None
+            self._crawl_stop = None
+    
+    def _enqueue(self, frontier: asyncio.Queue, url: str, depth: int, seed: bool = False) -> None:
+        if depth > self.max_depth:
+            logger.info(f"Max depth {self.max_depth} reached: {url}")
+            return
+        
+        if url in self.visited_urls or self._stop_requested:
+            return
+        
+        if not seed and frontier.qsize() >= self.max_frontier_size:
+            self.frontier_dropped += 1
+            logger.warning(f"Frontier full ({self.max_frontier_size} URLs), skipping: {url}")
+            return
+        
+        self.visited_urls.add(url)
+        if self.journal:
+            self.journal.add_pending(url, depth)
+        frontier.put_nowait((url, depth))
+    
+    async def _crawl_worker(self, frontier: asyncio.Queue, rate_limiter: HostRateLimiter,
+                            executor: ThreadPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            url, depth = await frontier.get()
+            try:
+                # Fresh cache hits never reach the network, so they don't spend rate-limit tokens
+                if not (self.cache and self.cache.has_fresh(url)):
+                    await rate_limiter.acquire(url)
+                self.pages_scraped += 1
+                logger.info(f"[{self.pages_scraped}] Scraping (depth {depth}): {url}")
+                
+                content_sections, title, links = await loop.run_in_executor(executor, self._scrape_page, url)
+                chunks = self._smart_chunk_content(content_sections, url, title, depth) if content_sections else []
+                await self._finish_page_async(url, chunks, links)
+                
+                for i, link_url in enumerate(links[:self.max_links_per_page]):
+                    logger.info(f"Following link {i+1}: {link_url}")
+                    self._enqueue(frontier, link_url, depth + 1)
+            
+            except Exception as e:
+                logger.error(f"Error scraping {url}: {str(e)}")
+                if self.journal:
+                    self.journal.mark_failed(url, str(e))
+            finally:
+                frontier.task_done()
+    
+    async def _fetch_worker(self, frontier: asyncio.Queue, parse_queue: asyncio.Queue,
+                            rate_limiter: HostRateLimiter, executor: ThreadPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            url, depth = await frontier.get()
+            html_content = ""
+            try:
+                if not (self.cache and self.cache.has_fresh(url)):
+                    await rate_limiter.acquire(url)
+                self.pages_scraped += 1
+                logger.info(f"[{self.pages_scraped}] Fetching (depth {depth}): {url}")
+                html_content = await loop.run_in_executor(executor, self._fetch_html, url)
+            except Exception as e:
+                logger.error(f"Error fetching {url}: {str(e)}")
+            
+            if html_content:
+                # The parse worker marks the frontier item done
+                await parse_queue.put((url, depth, html_content))
             else:
-                html_content = self._scrape_direct(url)
+                if self.journal:
+                    self.journal.mark_failed(url, "fetch failed")
+                frontier.task_done()
+    
+    async def _parse_worker(self, frontier: asyncio.Queue, parse_queue: asyncio.Queue,
+                            executor: ProcessPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            url, depth, html_content = await parse_queue.get()
+            try:
+                chunks, links = await loop.run_in_executor(executor, _parse_in_worker, html_content, url, depth)
+                await self._finish_page_async(url, chunks, links)
+                
+                for i, link_url in enumerate(links[:self.max_links_per_page]):
+                    logger.info(f"Following link {i+1}: {link_url}")
+                    self._enqueue(frontier, link_url, depth + 1)
+            
+            except Exception as e:
+                logger.error(f"Error processing page {url}: {str(e)}")
+                if self.journal:
+                    self.journal.mark_failed(url, str(e))
+            finally:
+                parse_queue.task_done()
+                frontier.task_done()
+    
+    def _journal_page(self, url: str, chunks: List[Document], links: List[str]) -> None:
+        # Journal the page before its chunks reach a consumer that may mark them indexed
+        if self.journal:
+            if chunks or links:
+                self.journal.mark_scraped(url, [chunk.metadata['chunk_id'] for chunk in chunks])
+            else:
+                self.journal.mark_failed(url, "no content")
+    
+    def _finish_page(self, url: str, chunks: List[Document], links: List[str]) -> None:
+        self._journal_page(url, chunks, links)
+        if chunks:
+            self._record_chunks(chunks)
+    
+    async def _finish_page_async(self, url: str, chunks: List[Document], links: List[str]) -> None:
+        """_finish_page for crawl workers: a sink that blocks on a slow consumer runs on a
+        thread, so it never stalls the event loop, the other workers or the rate limiter."""
+        self._journal_page(url, chunks, links)
+        if not chunks:
+            return
+        if self._document_sink is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._record_chunks, chunks)
+        else:
+            self._record_chunks(chunks)
+    
+    def _record_chunks(self, chunks: List[Document]) -> List[Document]:
+        self.documents_created += len(chunks)
+        if self._document_sink is not None:
+            self._document_sink(chunks)
+        else:
+            self.documents.extend(chunks)
+        logger.info(f"Created {len(chunks)} document chunks from URL")
+        total_tokens = sum(self._estimate_tokens(chunk.page_content) for chunk in chunks)
+        logger.info(f"Total tokens: {total_tokens}, Avg per chunk: {total_tokens//len(chunks) if chunks else 0}")
+        return chunks
+    
+    def _scrape_page(self, url: str) -> tuple:
+        try:
+            html_content = self._fetch_html(url)
             
             if not html_content:
                 return "", "", []
             
-            soup = BeautifulSoup(html_content, 'html.parser')
-            title = self._extract_title(soup)
-            self._clean_html(soup)
-            content = self._extract_structured_content(soup)
-            links = self._extract_links(soup, url)
-            
-            return content, title, links
+            return self._parse_html(html_content, url)
         
         except Exception as e:
             logger.error(f"Error processing page {url}: {str(e)}")
             return "", "", []
     
+    def _parse_html(self, html_content: str, url: str) -> tuple:
+        page = extract_page(html_content, parser=self.html_parser)
+        return page.sections, page.title, self._filter_links(page.links, url)
+    
+    def _parse_html_legacy(self, html_content: str, url: str) -> tuple:
+        """find_all based extraction, kept as the baseline for scripts/benchmark_html_extraction.py"""
+        soup = BeautifulSoup(html_content, 'html.parser')
+        title = self._extract_title(soup)
+        self._clean_html(soup)
+        content = self._extract_structured_content(soup)
+        links = self._extract_links(soup, url)
+        
+        return content, title, links
+    
     def _extract_structured_content(self, soup: BeautifulSoup) -> str:
         main_content = self._find_main_content(soup)
         content_sections = []
@@ -245,14 +579,25 @@ class SmartDocumentScraper:
                 'estimated_tokens': estimated_tokens,
                 'sections_in_chunk': sections_count,
                 'source_type': 'salesforce_help',
-                'chunk_id': f"{url}#chunk_{chunk_num}"  # Unique chunk identifier
+                'chunk_id': f"{url}#chunk_{chunk_num}",  # Unique chunk identifier
+                'content_hash': hashlib.sha256(f"{title}\n{content}".encode("utf-8")).hexdigest()
             }
         )
     
     def _estimate_tokens(self, text: str) -> int:
         return len(text) // 4
     
-    def _scrape_with_api(self, url: str) -> str:
+    def _fetch_html(self, url: str) -> str:
+        cached = self.cache.get(url) if self.cache else None
+        if cached is not None and self.cache.is_fresh(cached):
+            logger.info(f"Fetch cache hit: {url}")
+            return cached.body
+        
+        if self.api_key:
+            return self._scrape_with_api(url, cached)
+        return self._scrape_direct(url, cached)
+    
+    def _scrape_with_api(self, url: str, cached: Optional[CachedPage] = None) -> str:
         try:
             params = {
                 'api_key': self.api_key,
@@ -260,21 +605,46 @@ class SmartDocumentScraper:
                 'render': 'true',
                 'format': 'html'
             }
-            response = requests.get("https://api.scraperapi.com/", params=params, timeout=60)
-            response.raise_for_status()
-            return response.text
+            headers = self.cache.conditional_headers(cached) if self.cache else {}
+            if headers:
+                # Forward the validators to the target site
+                params['keep_headers'] = 'true'
+            response = requests.get("https://api.scraperapi.com/", params=params, headers=headers, timeout=60)
+            return self._handle_response(url, response, cached)
         except Exception as e:
             logger.warning(f"ScraperAPI failed: {str(e)}")
-            return ""
+            return self._stale_body(url, cached)
     
-    def _scrape_direct(self, url: str) -> str:
+    def _scrape_direct(self, url: str, cached: Optional[CachedPage] = None) -> str:
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return response.text
+            headers = self.cache.conditional_headers(cached) if self.cache else {}
+            response = self.session.get(url, headers=headers, timeout=30)
+            return self._handle_response(url, response, cached)
         except Exception as e:
             logger.warning(f"Direct scraping failed: {str(e)}")
-            return ""
+            return self._stale_body(url, cached)
+    
+    def _handle_response(self, url: str, response: requests.Response, cached: Optional[CachedPage]) -> str:
+        if response.status_code == 304 and cached is not None:
+            logger.info(f"Not modified (304): {url}")
+            self.cache.touch(url)
+            return cached.body
+        
+        response.raise_for_status()
+        if self.cache:
+            self.cache.put(
+                url,
+                response.text,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+        return response.text
+    
+    def _stale_body(self, url: str, cached: Optional[CachedPage]) -> str:
+        if cached is not None:
+            logger.warning(f"Serving stale cached copy of {url}")
+            return cached.body
+        return ""
     
     def _extract_title(self, soup: BeautifulSoup) -> str:
         title_selectors = ['h1', '.slds-page-header__title', '.helpArticleTitle', 'title']
@@ -316,6 +686,14 @@ class SmartDocumentScraper:
         
         return list(links)
     
+    def _filter_links(self, hrefs: List[str], base_url: str) -> List[str]:
+        links = {}
+        for href in hrefs:
+            full_url = self._resolve_url(href, base_url)
+            if self._is_valid_link(full_url):
+                links[full_url] = None
+        return list(links)
+    
     def _resolve_url(self, href: str, base_url: str) -> str:
         if href.startswith('http'):
             return href
@@ -336,6 +714,24 @@ class SmartDocumentScraper:
             return False
 
 
+_worker_scraper: Optional[SmartDocumentScraper] = None
+
+
+def _init_parse_worker(max_tokens_per_chunk: int, html_parser: str) -> None:
+    global _worker_scraper
+    _worker_scraper = SmartDocumentScraper(
+        max_tokens_per_chunk=max_tokens_per_chunk,
+        html_parser=html_parser
+    )
+
+
+def _parse_in_worker(html_content: str, url: str, depth: int) -> tuple:
+    """Runs in a parse process: HTML -> (document chunks, links)."""
+    content_sections, title, links = _worker_scraper._parse_html(html_content, url)
+    chunks = _worker_scraper._smart_chunk_content(content_sections, url, title, depth) if content_sections else []
+    return chunks, links
+
+
 def scrape_to_smart_documents(url: str, api_key: str = None, max_depth: int = 2, 
                              max_links_per_page: int = 10, max_tokens_per_chunk: int = 800) -> List[Document]:
     scraper = SmartDocumentScraper(
@@ -0,0 +1,96 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """Groups concurrent single-text embedding requests into one model call.
+
+    A background thread takes the first pending request, keeps collecting requests for up
+    to `max_wait_ms` or until `max_batch_size` texts are waiting, encodes them together
+    with `embed_batch_fn` and resolves each request's future. A lone request therefore
+    waits at most `max_wait_ms` longer than it would unbatched.
+    """
+
+    def __init__(self, embed_batch_fn: Callable[[List[str]], List[List[float]]],
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.embed_batch_fn = embed_batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: queue.Queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.max_observed_batch = 0
+
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str, timeout: float = None) -> List[float]:
+        return self.submit(text).result(timeout)
+
+    def _collect(self) -> list:
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if not batch:
+                return
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.embed_batch_fn(texts)
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                logger.error(f"Batched embedding of {len(texts)} queries failed: {str(e)}")
+                for _, future in batch:
+                    future.set_exception(e)
+
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.max_observed_batch = max(self.max_observed_batch, len(batch))
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._worker.join()
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'avg_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'max_batch_size': self.max_observed_batch
+            }
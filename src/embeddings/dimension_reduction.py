@@ -0,0 +1,162 @@
+import logging
+import os
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+from .base_embeddings import BaseEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+class DimensionReducer:
+    """Projects embeddings to `target_dim` dimensions before they reach the index.
+
+    method="matryoshka" keeps the leading dimensions and re-normalizes, which is only
+    meaningful for models trained with a Matryoshka objective. method="pca" projects onto
+    principal components fitted on a sample of the corpus at ingestion time; the fitted
+    projection is saved to `path` so the inference service applies the same one to queries.
+    """
+
+    def __init__(self, method: str = "none", target_dim: int = 256, path: Optional[str] = None):
+        self.method = method or "none"
+        self.target_dim = target_dim
+        self.path = path
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        if self.method not in ("none", "matryoshka", "pca"):
+            raise ValueError(f"Unknown dimension reduction method: {self.method}")
+        if self.method == "pca":
+            self.load()
+
+    @classmethod
+    def from_config(cls, config) -> "DimensionReducer":
+        return cls(
+            method=getattr(config, 'dimension_reduction', 'none'),
+            target_dim=getattr(config, 'reduced_dimension', 256),
+            path=getattr(config, 'dimension_reduction_path', None)
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.method != "none"
+
+    @property
+    def fitted(self) -> bool:
+        return self.method != "pca" or self.components is not None
+
+    def output_dim(self, input_dim: int) -> int:
+        if not self.enabled:
+            return input_dim
+        return min(self.target_dim, input_dim)
+
+    def fit(self, vectors: np.ndarray) -> None:
+        if self.method != "pca":
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        n_samples, dim = vectors.shape
+        target_dim = min(self.target_dim, dim)
+        if n_samples < 2:
+            # Nothing to learn a projection from: keep the leading dimensions, like matryoshka
+            logger.warning(f"PCA needs at least 2 samples, got {n_samples}; truncating to {target_dim} dimensions")
+            with self._lock:
+                self.mean = np.zeros(dim, dtype=np.float32)
+                self.components = np.ascontiguousarray(np.eye(dim, target_dim, dtype=np.float32))
+            self.save()
+            return
+
+        mean = vectors.mean(axis=0)
+        _, singular_values, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        # A small sample yields fewer than target_dim components. The rest are zero columns,
+        # so vectors keep the dimension the index mapping was created with.
+        num_components = min(target_dim, len(vt))
+        if num_components < target_dim:
+            logger.warning(f"Only {n_samples} samples for PCA to {target_dim} dimensions, fitting "
+                           f"{num_components} components; delete the saved PCA ({self.path}) to refit on a larger corpus")
+        components = np.zeros((dim, target_dim), dtype=np.float32)
+        components[:, :num_components] = vt[:num_components].T
+        variance = singular_values ** 2
+        explained = variance[:num_components].sum() / variance.sum() if variance.sum() else 1.0
+        with self._lock:
+            self.mean = mean
+            self.components = components
+        logger.info(f"Fitted PCA {dim} -> {target_dim} on {n_samples} vectors, "
+                    f"explained variance {explained:.3f}")
+        self.save()
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not self.enabled:
+            return vectors
+        if self.method == "matryoshka":
+            reduced = vectors[..., :self.target_dim]
+        else:
+            if self.components is None and not self.load():
+                raise RuntimeError("PCA dimension reduction has not been fitted yet")
+            reduced = (vectors - self.mean) @ self.components
+        norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+        return reduced / np.maximum(norms, 1e-12)
+
+    def save(self) -> None:
+        if not self.path or self.components is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, mean=self.mean, components=self.components)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> bool:
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as data:
+            mean, components = data["mean"], data["components"]
+        if components.shape[1] != self.target_dim:
+            logger.warning(f"Saved PCA has {components.shape[1]} dimensions, expected {self.target_dim}")
+        with self._lock:
+            self.mean, self.components = mean, components
+        return True
+
+
+class ReducedEmbeddings(BaseEmbeddings):
+    """Embeddings wrapper that passes every vector through a DimensionReducer."""
+
+    def __init__(self, embeddings, reducer: DimensionReducer):
+        self.embeddings = embeddings
+        self.reducer = reducer
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_texts(texts).tolist()
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        embed_fn = getattr(self.embeddings, 'embed_texts', None) or self.embeddings.embed_documents
+        return self.reducer.transform(embed_fn(list(texts)))
+
+    def embed_text(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.reducer.transform(self.embeddings.embed_query(query)).tolist()
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        embed_fn = getattr(self.embeddings, 'embed_queries', None) or \
+            (lambda texts: [self.embeddings.embed_query(text) for text in texts])
+        return self.reducer.transform(embed_fn(list(queries))).tolist()
+
+    def get_embedding_dimension(self) -> int:
+        return self.reducer.output_dim(self.embeddings.get_embedding_dimension())
+
+    def warmup(self) -> None:
+        if hasattr(self.embeddings, 'warmup'):
+            self.embeddings.warmup()
+
+
+def reduce_embeddings(embeddings, config):
+    """Wrap `embeddings` in the dimension reduction configured in `config`, if any."""
+    reducer = DimensionReducer.from_config(config)
+    if not reducer.enabled:
+        return embeddings
+    return ReducedEmbeddings(embeddings, reducer)
@@ -0,0 +1,228 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from .base_embeddings import BaseEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCacheStore:
+    """Content-addressed vector store on disk.
+
+    Vectors live in one memory-mapped float16 matrix per namespace (model, normalization
+    flag, document/query), and a SQLite table maps sha256(text) to a row of that matrix.
+    Rows are allocated inside a SQLite write transaction, so several processes (ingestion
+    and the inference service) can share one cache directory.
+    """
+
+    def __init__(self, cache_dir: str, initial_rows: int = 4096):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.initial_rows = initial_rows
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS namespaces (
+                namespace TEXT PRIMARY KEY,
+                dimension INTEGER NOT NULL,
+                next_row INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS vectors (
+                namespace TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (namespace, text_hash)
+            );
+        """)
+        self._matrices: Dict[str, np.memmap] = {}
+
+    def _matrix_path(self, namespace: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:16] + ".f16")
+
+    def _matrix(self, namespace: str, dimension: int, min_rows: int) -> np.memmap:
+        matrix = self._matrices.get(namespace)
+        if matrix is not None and matrix.shape[0] >= min_rows:
+            return matrix
+
+        path = self._matrix_path(namespace)
+        row_bytes = dimension * np.dtype(np.float16).itemsize
+        current_rows = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+        rows = max(current_rows, self.initial_rows)
+        while rows < min_rows:
+            rows *= 2
+        if rows > current_rows:
+            with open(path, "ab") as f:
+                f.truncate(rows * row_bytes)
+
+        if matrix is not None:
+            matrix.flush()
+        matrix = np.memmap(path, dtype=np.float16, mode="r+", shape=(rows, dimension))
+        self._matrices[namespace] = matrix
+        return matrix
+
+    def get_many(self, namespace: str, text_hashes: List[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT dimension, next_row FROM namespaces WHERE namespace = ?", (namespace,)
+            ).fetchone()
+            if row is None:
+                return {}
+            dimension, next_row = row
+
+            found = {}
+            for start in range(0, len(text_hashes), 500):
+                batch = text_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(self._conn.execute(
+                    f"SELECT text_hash, row FROM vectors WHERE namespace = ? AND text_hash IN ({placeholders})",
+                    [namespace, *batch]
+                ).fetchall())
+            if not found:
+                return {}
+
+            matrix = self._matrix(namespace, dimension, next_row)
+            hashes = list(found)
+            vectors = np.asarray(matrix[[found[h] for h in hashes]], dtype=np.float32)
+        return dict(zip(hashes, vectors))
+
+    def put_many(self, namespace: str, text_hashes: List[str], vectors: np.ndarray) -> None:
+        if not text_hashes:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dimension = vectors.shape[1]
+        with self._lock:
+            # Reserve rows atomically across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT dimension, next_row FROM namespaces WHERE namespace = ?", (namespace,)
+                ).fetchone()
+                if row is None:
+                    first_row = 0
+                    self._conn.execute("INSERT INTO namespaces VALUES (?, ?, ?)",
+                                       (namespace, dimension, len(text_hashes)))
+                else:
+                    if row[0] != dimension:
+                        raise ValueError(f"Cached dimension {row[0]} does not match {dimension} for {namespace}")
+                    first_row = row[1]
+                    self._conn.execute("UPDATE namespaces SET next_row = ? WHERE namespace = ?",
+                                       (first_row + len(text_hashes), namespace))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+            end_row = first_row + len(text_hashes)
+            matrix = self._matrix(namespace, dimension, end_row)
+            matrix[first_row:end_row] = vectors.astype(np.float16)
+            matrix.flush()
+
+            # Keys are only published once their vectors are on disk
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO vectors (namespace, text_hash, row) VALUES (?, ?, ?)",
+                [(namespace, h, first_row + i) for i, h in enumerate(text_hashes)]
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            for matrix in self._matrices.values():
+                matrix.flush()
+            self._matrices.clear()
+            self._conn.close()
+
+
+class CachedEmbeddings(BaseEmbeddings):
+    """Wraps an embedding model so each distinct document text is only ever encoded once.
+
+    Works with any object exposing embed_documents/embed_query (a BaseEmbeddings
+    implementation or a LangChain embeddings class). Entries are keyed by
+    (model name, normalization flag, sha256 of the text).
+
+    Queries bypass the disk cache: live queries are unbounded and mostly unique, and
+    repeats are served by the in-memory QueryEmbeddingCache in Hybrid_search.
+    """
+
+    def __init__(self, embeddings, cache_dir: str, model_name: Optional[str] = None,
+                 normalize: Optional[bool] = None, store: Optional[EmbeddingCacheStore] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, 'model_name', type(embeddings).__name__)
+        if normalize is None:
+            encode_kwargs = getattr(embeddings, 'encode_kwargs', None) or {}
+            normalize = encode_kwargs.get('normalize_embeddings', getattr(embeddings, 'normalize_embeddings', False))
+        self.normalize = bool(normalize)
+        self.store = store or EmbeddingCacheStore(cache_dir)
+
+        self.hits = 0
+        self.misses = 0
+
+    def _namespace(self, kind: str) -> str:
+        return f"{self.model_name}|normalize={int(self.normalize)}|{kind}"
+
+    def _embed_cached(self, texts: List[str], kind: str, embed_fn: Callable) -> np.ndarray:
+        # Vectors are stored as float16 and read back as float32; hand them out in the
+        # wrapped model's output dtype (embedding_dtype) like an uncached encode would
+        dtype = np.dtype(getattr(self.embeddings, 'output_dtype', np.float32))
+        if not texts:
+            return np.zeros((0, 0), dtype=dtype)
+
+        namespace = self._namespace(kind)
+        hashes = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        cached = self.store.get_many(namespace, list(set(hashes)))
+
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            new_vectors = np.asarray(embed_fn(list(missing.values())), dtype=np.float32)
+            self.store.put_many(namespace, list(missing), new_vectors)
+            cached.update(zip(missing, new_vectors))
+            logger.info(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} encoded")
+
+        return np.stack([cached[text_hash] for text_hash in hashes]).astype(dtype, copy=False)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_cached(list(texts), "document", self.embeddings.embed_documents).tolist()
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.embeddings.embed_query(query)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        if hasattr(self.embeddings, 'embed_queries'):
+            return self.embeddings.embed_queries(queries)
+        return [self.embeddings.embed_query(query) for query in queries]
+
+    def embed_text(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        embed_fn = getattr(self.embeddings, 'embed_texts', None) or self.embeddings.embed_documents
+        return self._embed_cached(list(texts), "document", embed_fn)
+
+    def get_embedding_dimension(self) -> int:
+        if hasattr(self.embeddings, 'get_embedding_dimension'):
+            return self.embeddings.get_embedding_dimension()
+        return len(self.embed_query("dimension probe"))
+
+    def warmup(self) -> None:
+        # Bypass the cache: the point is to exercise the model itself
+        if hasattr(self.embeddings, 'warmup'):
+            self.embeddings.warmup()
+        else:
+            self.embeddings.embed_query("warmup")
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
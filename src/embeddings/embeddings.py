@@ -1,38 +1,209 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
+import atexit
+import itertools
 import logging
+import math
 from typing import List
-from .base_embeddings import BaseEmbeddingModel
+from .base_embeddings import BaseEmbeddings
+from . import model_registry
 
 logger = logging.getLogger(__name__)
 
-class SentenceTransformerEmbeddings(BaseEmbeddingModel):
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self._dimension = self.model.get_sentence_embedding_dimension()
+
+def resolve_device(device: str = "auto") -> str:
+    if device != "auto":
+        return device
+    import torch
+    if torch.cuda.is_available():
+        return "cuda"
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of the Linear layers: weights stored as int8,
+    activations quantized on the fly. Only supported on CPU."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class SentenceTransformerEmbeddings(BaseEmbeddings):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", device: str = "auto",
+                 precision: str = "fp32", normalize_embeddings: bool = False,
+                 batch_size: int = 32, tokens_per_batch: int = 8192, num_workers: int = 0,
+                 output_dtype: str = "float32"):
         self.model_name = model_name
-        logger.info(f"Initialized SentenceTransformer with model: {model_name}, dimension: {self._dimension}")
-    
+        self.device = resolve_device(device)
+        self.normalize_embeddings = normalize_embeddings
+        # Bulk encoding (embed_texts): batches of up to batch_size texts and tokens_per_batch padded tokens
+        self.batch_size = batch_size
+        self.tokens_per_batch = tokens_per_batch
+        self.num_workers = num_workers
+        self.output_dtype = np.dtype(output_dtype)
+        self._pool = None
+
+        # Imported here so modules that only reference this class don't pay for torch at import time
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device=self.device)
+
+        self.precision = precision
+        if precision == "int8":
+            if self.device == "cpu":
+                self.model = quantize_int8(self.model)
+            else:
+                logger.warning(f"int8 precision is CPU-only, using fp32 on {self.device}")
+                self.precision = "fp32"
+
+        self._dimension = self.model.get_sentence_embedding_dimension()
+        logger.info(f"Initialized SentenceTransformer with model: {model_name}, dimension: {self._dimension}, "
+                    f"device: {self.device}, precision: {self.precision}")
+
     def embed_text(self, text: str) -> List[float]:
         if not text.strip():
             return [0.0] * self._dimension
-        
-        embedding = self.model.encode(text, convert_to_numpy=True)
+
+        embedding = self.model.encode(text, convert_to_numpy=True,
+                                      normalize_embeddings=self.normalize_embeddings)
         return embedding.tolist()
-    
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        if not texts:
-            return []
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Bulk-encode texts into a contiguous (len(texts), dim) array in the original order.
         
+        Texts are sorted by token length and cut into batches whose padded size stays within
+        tokens_per_batch, so short chunks are not padded to the length of long ones. With
+        num_workers > 1 the same batches are spread over a multi-process encoding pool.
+        """
+        if not texts:
+            return np.zeros((0, self._dimension), dtype=self.output_dtype)
+
         valid_texts = [text.strip() if text.strip() else " " for text in texts]
-        
-        embeddings = self.model.encode(valid_texts, convert_to_numpy=True, batch_size=32)
-        return embeddings.tolist()
-    
-    def embed_documents(self, texts: List[str]) -> np.ndarray:
-        return self.model.encode(texts, convert_to_numpy=True)
-    
-    def embed_query(self, query: str) -> np.ndarray:
-        return self.model.encode(query, convert_to_numpy=True)
-    
+
+        lengths = self._token_lengths(valid_texts)
+        order = np.argsort(-lengths, kind="stable")
+        sorted_texts = [valid_texts[i] for i in order]
+
+        buckets = self._length_buckets(sorted_texts, lengths[order])
+        if self.num_workers > 1:
+            # Runs of equal-sized buckets go to the pool together, with batch and chunk sizes
+            # that are multiples of the bucket size so the workers' batches are the buckets
+            pool = self._multi_process_pool()
+            parts = []
+            for size, run in itertools.groupby(buckets, key=len):
+                run_texts = [text for bucket in run for text in bucket]
+                batches_per_worker = math.ceil(len(run_texts) / size / self.num_workers)
+                parts.append(self.model.encode_multi_process(
+                    run_texts, pool, batch_size=size, chunk_size=size * batches_per_worker,
+                    normalize_embeddings=self.normalize_embeddings
+                ))
+            sorted_embeddings = np.concatenate(parts)
+        else:
+            sorted_embeddings = np.concatenate([
+                self.model.encode(batch, convert_to_numpy=True, batch_size=len(batch),
+                                  normalize_embeddings=self.normalize_embeddings)
+                for batch in buckets
+            ])
+
+        embeddings = np.empty((len(texts), self._dimension), dtype=self.output_dtype)
+        embeddings[order] = sorted_embeddings
+        return embeddings
+
+    def _token_lengths(self, texts: List[str]) -> np.ndarray:
+        max_length = self.model.max_seq_length
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is None:
+            return np.array([len(text) // 4 for text in texts])
+        encoded = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_length)
+        return np.array([len(ids) for ids in encoded['input_ids']])
+
+    def _length_buckets(self, sorted_texts: List[str], sorted_lengths: np.ndarray) -> List[List[str]]:
+        # Texts are sorted longest first, so the first text of a batch sets its padded length.
+        # A batch holds at most batch_size texts and tokens_per_batch padded tokens.
+        buckets = []
+        start = 0
+        while start < len(sorted_texts):
+            padded_length = max(int(sorted_lengths[start]), 1)
+            size = max(1, min(self.batch_size, self.tokens_per_batch // padded_length))
+            buckets.append(sorted_texts[start:start + size])
+            start += size
+        return buckets
+
+    def _multi_process_pool(self):
+        if self._pool is None:
+            self._pool = self.model.start_multi_process_pool(target_devices=[self.device] * self.num_workers)
+            # Shared instances live until exit, so make sure the worker processes don't outlive it
+            atexit.register(self.close)
+            logger.info(f"Started {self.num_workers} encoding processes")
+        return self._pool
+
+    def close(self) -> None:
+        """Stop the encoding processes; the next bulk encode starts a new pool."""
+        if self._pool is not None:
+            atexit.unregister(self.close)
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+            logger.info("Stopped encoding processes")
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_texts(list(texts)).tolist()
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.model.encode(query, convert_to_numpy=True,
+                                 normalize_embeddings=self.normalize_embeddings).tolist()
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        return self.model.encode(list(queries), convert_to_numpy=True,
+                                 normalize_embeddings=self.normalize_embeddings).tolist()
+
     def get_embedding_dimension(self) -> int:
         return self._dimension
+
+    def warmup(self) -> None:
+        """Run a few encodes so lazy CUDA/MKL initialisation happens before the first request."""
+        self.model.encode(["warmup"], convert_to_numpy=True)
+        self.model.encode(["warmup " * 64] * 4, convert_to_numpy=True)
+
+
+def build_embeddings(config) -> BaseEmbeddings:
+    """Embedding model for `config`, on the best available device, behind the disk cache if configured.
+
+    Instances come from the process-wide model registry, so every component asking for the
+    same model shares one copy.
+    """
+    key = (
+        "embeddings",
+        config.embedding_model_name,
+        getattr(config, 'embedding_device', 'auto'),
+        getattr(config, 'embedding_precision', 'fp32'),
+        getattr(config, 'embedding_cache_dir', None)
+    )
+    return model_registry.get_or_load(key, lambda: _load_embeddings(config))
+
+
+def _load_embeddings(config) -> BaseEmbeddings:
+    from .embedding_cache import CachedEmbeddings
+
+    embeddings = SentenceTransformerEmbeddings(
+        model_name=config.embedding_model_name,
+        device=getattr(config, 'embedding_device', 'auto'),
+        precision=getattr(config, 'embedding_precision', 'fp32'),
+        normalize_embeddings=True,
+        batch_size=getattr(config, 'embedding_batch_size', 32),
+        tokens_per_batch=getattr(config, 'embedding_tokens_per_batch', 8192),
+        num_workers=getattr(config, 'embedding_workers', 0),
+        output_dtype=getattr(config, 'embedding_dtype', 'float32')
+    )
+    if getattr(config, 'embedding_cache_dir', None):
+        # Quantized vectors differ slightly from fp32 ones, so they get their own cache entries
+        cache_name = config.embedding_model_name
+        if embeddings.precision != "fp32":
+            cache_name = f"{cache_name}@{embeddings.precision}"
+        embeddings = CachedEmbeddings(embeddings, config.embedding_cache_dir,
+                                      model_name=cache_name, normalize=True)
+    return embeddings
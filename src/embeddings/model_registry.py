@@ -0,0 +1,31 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List
+
+logger = logging.getLogger(__name__)
+
+_models: Dict[Hashable, Any] = {}
+_lock = threading.Lock()
+
+
+def get_or_load(key: Hashable, loader: Callable[[], Any]) -> Any:
+    """Return the process-wide instance for `key`, calling `loader` only the first time."""
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            start = time.perf_counter()
+            model = loader()
+            _models[key] = model
+            logger.info(f"Loaded {key} in {time.perf_counter() - start:.1f}s")
+        return model
+
+
+def loaded_models() -> List[Hashable]:
+    with _lock:
+        return list(_models)
+
+
+def clear() -> None:
+    with _lock:
+        _models.clear()
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+class QueryEmbeddingCache:
+    """Bounded in-process LRU cache of query text -> embedding, with an optional TTL.
+
+    Keys are whitespace-collapsed, so queries differing only in spacing share one entry.
+    Case is kept: the embedding models are case-sensitive ("US" and "us" embed differently).
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.split())
+
+    def get(self, query: str) -> Optional[List[float]]:
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            vector, stored_at = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, query: str, vector: List[float]) -> None:
+        key = self.normalize(query)
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Bounded LRU cache of generated answers keyed by query embedding, with an optional TTL.
+
+    A lookup returns the answer of the most similar cached question when its cosine
+    similarity reaches `threshold`, so paraphrases skip retrieval-augmented generation.
+    Entries belong to the index version they were answered from; when `version_fn`
+    reports a new version (a rebuild swapped the alias) the whole cache is dropped.
+    """
+
+    def __init__(self, threshold: float = 0.87, max_size: int = 512, ttl_seconds: Optional[float] = 3600,
+                 version_fn: Optional[Callable[[], Any]] = None, version_check_seconds: float = 5):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version_fn = version_fn
+        self.version_check_seconds = version_check_seconds
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None   # stacked embeddings, rebuilt after changes
+        self._keys: List[int] = []
+        self._next_key = 0
+        self._version = None
+        self._version_checked_at = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self) -> None:
+        # The version lookup can be a network call, so it is rate limited and made without
+        # holding the lock; concurrent lookups meanwhile keep using the cache
+        if self.version_fn is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._version_checked_at is not None and now - self._version_checked_at < self.version_check_seconds:
+                return
+            self._version_checked_at = now
+        version = self.version_fn()
+        if version is None:
+            return  # the lookup failed; keep the entries and try again after the interval
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += len(self._entries)
+                    self._entries.clear()
+                    self._matrix = None
+                self._version = version
+
+    def _expire(self) -> None:
+        if self.ttl_seconds is None:
+            return
+        now = time.monotonic()
+        # Entries are in LRU order, not insertion order, so scan them all (the cache is small)
+        expired = [key for key, entry in self._entries.items() if now - entry[2] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self.expirations += len(expired)
+            self._matrix = None
+
+    def get(self, embedding) -> Optional[Dict[str, Any]]:
+        query = self._unit(embedding)
+        self._check_version()
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.stack([self._entries[key][0] for key in self._keys])
+            similarities = self._matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            key = self._keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(self._entries[key][1], cache_similarity=float(similarities[best]))
+
+    def put(self, embedding, response: Dict[str, Any]) -> None:
+        vector = self._unit(embedding)
+        self._check_version()
+        with self._lock:
+            self._entries[self._next_key] = (vector, dict(response), time.monotonic())
+            self._next_key += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'threshold': self.threshold,
+                'index_version': self._version,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -76,12 +76,12 @@ class OpenAIGenerator(BaseGenerator):
         urls = set()
         for i, doc in enumerate(documents, 1):
             content = doc.get('text', '').strip()
-            url = doc.get("metadata", {}).get("url") or doc.get("url")
+            url = (doc.get("metadata") or {}).get("url") or doc.get("url")
             urls.add(url)
-            rrf_score = doc.get("rrf_score")
+            fusion_score = doc.get("fusion_score") or 0.0
             
             context_part = f"""
-            Document {i} (Relevance: {rrf_score:.3f}):
+            Document {i} (Relevance: {fusion_score:.3f}):
             Source: {url}
             Content: {content}
             """
@@ -1,31 +1,83 @@
-from elasticsearch import Elasticsearch
 from ..retrieval.hybrid_retrieval import Hybrid_search
 import logging 
+import time
 logger = logging.getLogger(__name__)
 from ..generation.llm_generator import OpenAIGenerator
+from ..retrieval.reranker import CrossEncoderReranker
+from ..generation.answer_cache import SemanticAnswerCache
 
 class InferencePipeline : 
 
     def __init__(self,config) : 
-        self.es = Elasticsearch([config.es_url]) 
         self.index_name = config.index_name 
         self.llm_gen = OpenAIGenerator("gpt-4o")
         self.search= Hybrid_search(config) 
+        self.reranker = CrossEncoderReranker.from_config(config)
+        self.rerank_candidates = getattr(config, 'rerank_candidates', 30)
+        self.rerank_top_n = getattr(config, 'rerank_top_n', 3)
 
+        self.answer_cache = None
+        if getattr(config, 'answer_cache_size', 0) > 0:
+            self.answer_cache = SemanticAnswerCache(
+                threshold=getattr(config, 'similarity_threshold', 0.87),
+                max_size=config.answer_cache_size,
+                ttl_seconds=getattr(config, 'answer_cache_ttl', 3600),
+                version_fn=self.search.index_version,
+                version_check_seconds=getattr(config, 'answer_cache_version_check_s', 5)
+            )
 
-    def process_query(self, query:str,lexical_topk:int=3, semantic_top_k:int=3) : 
+
+    def process_query(self, query:str,lexical_topk:int=3, semantic_top_k:int=3, top_k:int=None) : 
         try: 
-            documents = self.search.hybrid_search(query, lexical_topk, semantic_top_k)
+            # Answers depend on top_k, so only default-sized requests share the cache
+            query_embedding = None
+            if self.answer_cache is not None and top_k is None:
+                query_embedding = self.search.get_embeddings(query)
+                if query_embedding is not None:
+                    cached = self.answer_cache.get(query_embedding)
+                    if cached is not None:
+                        logger.info(f"Answer cache hit (similarity {cached['cache_similarity']:.3f})")
+                        cached["query"] = query
+                        return cached
+
+            documents = self.retrieve(query, lexical_topk, semantic_top_k, top_k)
             logger.info(f"The  Number of Documents Extracted : {len(documents)}") 
             logger.info(f"The sample document : {documents[0]}")
             response =  self.llm_gen.generate(query,documents) 
 
+            if query_embedding is not None and response.get("retrieval_successful"):
+                self.answer_cache.put(query_embedding, response)
             return response
 
         except Exception as e :
             logger.info(f"Exception is {e}") 
             return {"error" : e}
 
+    def retrieve(self, query:str, lexical_topk:int=3, semantic_top_k:int=3, top_k:int=None) : 
+        if self.reranker is not None:
+            # Fuse a wider pool, then let the cross-encoder pick the few that reach the prompt
+            top_n = top_k or self.rerank_top_n
+            pool = max(self.rerank_candidates, top_n)
+            candidates = self.search.hybrid_search(query, pool, pool, top_k=pool)
+            return self.reranker.rerank(query, candidates, top_n)
+
+        # Each retriever must return at least as many candidates as we keep after fusion
+        top_k = top_k or self.search.top_k
+        return self.search.hybrid_search(query, max(lexical_topk, top_k), max(semantic_top_k, top_k), top_k=top_k)
+
+    def warmup(self) : 
+        start = time.perf_counter()
+        self.search.warmup()
+        if self.reranker is not None:
+            self.reranker.warmup()
+        logger.info(f"Warmup completed in {time.perf_counter() - start:.2f}s")
+
+    def stats(self) : 
+        stats = self.search.stats()
+        stats["reranker"] = self.reranker.stats() if self.reranker else None
+        stats["answer_cache"] = self.answer_cache.stats() if self.answer_cache else None
+        return stats
+
     
 
         
@@ -1,6 +1,9 @@
 import logging
 from typing import List, Dict, Any
 from ..document_processing.web_scraper_2 import SmartDocumentScraper
+from ..document_processing.fetch_cache import FetchCache
+from ..document_processing.crawl_journal import CrawlJournal
+from ..document_processing.deduplication import ChunkDeduplicator
 from ..vectorstore.elasticsearch_store import ElasticSearchStore
 logger = logging.getLogger(__name__)
 
@@ -8,31 +11,97 @@ class TrainingPipeline:
     
     def __init__(self, config):
         self.config = config
+        fetch_cache = None
+        if getattr(config, 'fetch_cache_dir', None):
+            fetch_cache = FetchCache(
+                config.fetch_cache_dir,
+                ttl_seconds=getattr(config, 'fetch_cache_ttl', 6 * 3600),
+                max_bytes=getattr(config, 'fetch_cache_max_mb', 512) * 1024 * 1024
+            )
+        self.journal = None
+        if getattr(config, 'crawl_journal_path', None):
+            self.journal = CrawlJournal(config.crawl_journal_path)
         self.web_scraper = SmartDocumentScraper(
             api_key=getattr(config, 'serper_api_key'),
             max_depth=getattr(config, 'max_depth'),
             delay=1,
             max_links_per_page=getattr(config, 'max_links_per_page'),
-            max_tokens_per_chunk=getattr(config, 'max_tokens_per_chunk')
+            max_tokens_per_chunk=getattr(config, 'max_tokens_per_chunk'),
+            crawl_mode=getattr(config, 'crawl_mode', 'async'),
+            concurrency=getattr(config, 'crawl_concurrency', 8),
+            requests_per_second=getattr(config, 'requests_per_second', None),
+            max_frontier_size=getattr(config, 'max_frontier_size', 1000),
+            cache=fetch_cache,
+            html_parser=getattr(config, 'html_parser', 'lxml'),
+            parse_workers=getattr(config, 'parse_workers', 0),
+            parse_queue_size=getattr(config, 'parse_queue_size', 32),
+            journal=self.journal
         )
-        self.vector_store = ElasticSearchStore(config)
+        if getattr(config, 'vector_store_backend', 'elasticsearch') == "local":
+            from ..vectorstore.local_store import LocalVectorStore
+            self.vector_store = LocalVectorStore(config)
+        else:
+            self.vector_store = ElasticSearchStore(config)
+        self.deduplicator = None
+        self.incremental_sync = getattr(config, 'incremental_sync', True)
+        self._current_chunks = {}
+        self._unchanged_chunks = 0
         
         logger.info("Training pipeline initialized")
     
-    def process_urls(self, url: str) -> Dict[str, Any]:
+    def process_urls(self, url: str, resume: bool = False, rebuild: bool = False) -> Dict[str, Any]:
+        if rebuild:
+            return self.rebuild_index(url, resume=resume)
+        if getattr(self.config, 'stream_ingestion', False):
+            return self.process_urls_streaming(url, resume=resume)
+        return self.process_urls_batch(url, resume=resume)
+    
+    def rebuild_index(self, url: str, resume: bool = False) -> Dict[str, Any]:
+        """Re-ingest everything into a new index version and swap the alias once it validates.
+        
+        Live queries keep reading the previous version for the whole run.
+        """
+        self.vector_store.begin_rebuild(resume=resume)
+        finished = False
         try:
-            logger.info(f"Starting training pipeline for URL: {url}")
+            if getattr(self.config, 'stream_ingestion', False):
+                results = self.process_urls_streaming(url, resume=resume)
+            else:
+                results = self.process_urls_batch(url, resume=resume)
             
-            results = {
-                'processed_urls': 0,
-                'total_chunks': 0,
-                'failed_urls': [],
-                'success_urls': [],
-                'processing_stats': {}
-            }
+            if results['failed_urls'] or not results['total_chunks']:
+                logger.error(f"Rebuild into {self.vector_store.index_name} incomplete, alias left unchanged; "
+                             f"rerun with --rebuild --resume to continue")
+                results['rebuild'] = {'index': self.vector_store.index_name, 'swapped': False}
+                return results
+            
+            try:
+                # finish_rebuild points writes back at the live index itself, whether or not it swaps
+                results['rebuild'] = self.vector_store.finish_rebuild()
+                finished = True
+            except Exception as e:
+                logger.error(f"Alias swap failed: {str(e)}")
+                results['rebuild'] = {'swapped': False, 'message': str(e)}
+            return results
+        finally:
+            if not finished:
+                self.vector_store.abort_rebuild()
+    
+    def process_urls_batch(self, url: str, resume: bool = False) -> Dict[str, Any]:
+        results = {
+            'processed_urls': 0,
+            'total_chunks': 0,
+            'failed_urls': [],
+            'success_urls': [],
+            'processing_stats': {}
+        }
+        
+        try:
+            logger.info(f"Starting training pipeline for URL: {url}")
+            self._reset_run_state()
             
             logger.info("Step 1: Web scraping")
-            scraped_docs = self.web_scraper.scrape_to_documents(url)
+            scraped_docs = self.web_scraper.scrape_to_documents(url, resume=resume)
             
             if not scraped_docs:
                 logger.warning("No documents successfully scraped")
@@ -47,21 +116,8 @@ class TrainingPipeline:
             all_chunks_metadata = []  # List of metadata dict
             
             for doc in scraped_docs:
-                content = doc.page_content 
-                metadata_dict = doc.metadata
-                processed_metadata = {
-                    'url': metadata_dict.get('url', ''),
-                    'title': metadata_dict.get('title', ''),
-                    'content_length': metadata_dict.get('content_length', len(content)),
-                    'source': metadata_dict.get('url', ''),
-                    'sections_in_chunk': metadata_dict.get('sections_in_chunk', 1),
-                    'chunk_id': metadata_dict.get('chunk_id', f'chunk_{len(all_chunks)}'),
-                    'depth': metadata_dict.get('depth', 0),
-                    'created_at': metadata_dict.get('scraped_at', '2025-01-01T00:00:00Z')
-                }
-                
-                all_chunks.append(content)
-                all_chunks_metadata.append(processed_metadata)
+                all_chunks.append(doc.page_content)
+                all_chunks_metadata.append(self._prepare_metadata(doc, len(all_chunks_metadata)))
             
             logger.info(f"Processed {len(all_chunks)} documents for indexing")
             results['total_chunks'] = len(all_chunks)
@@ -72,7 +128,8 @@ class TrainingPipeline:
             
             # Step 3: Index in Elasticsearch
             logger.info("Step 3: Indexing documents in Elasticsearch")
-            success = self.vector_store.add_documents(all_chunks, all_chunks_metadata)
+            with self.vector_store.bulk_loading():
+                success = self._index_batch(all_chunks, all_chunks_metadata)
             
             if success:
                 logger.info(f"Successfully indexed {len(all_chunks)} documents")
@@ -85,13 +142,199 @@ class TrainingPipeline:
             results['processing_stats'] = {
                 'total_documents': len(all_chunks),
                 'avg_content_length': sum(len(content) for content in all_chunks) / len(all_chunks) if all_chunks else 0,
-                'unique_urls': len(set(meta['url'] for meta in all_chunks_metadata))
+                'unique_urls': len(set(meta['url'] for meta in all_chunks_metadata)),
+                **self._dedup_stats(),
+                **self._indexing_stats(),
+                **self._sync_stats()
             }
             
             return results
             
         except Exception as e:
             logger.error(f"Training pipeline failed: {str(e)}")
+            results['failed_urls'] = [url]
+            return results
+    
+    def process_urls_streaming(self, url: str, resume: bool = False) -> Dict[str, Any]:
+        """Index chunks in fixed-size micro-batches while the crawl is still running.
+        
+        Only one batch of chunks is held in memory at a time, and embedding/indexing of a
+        batch overlaps with the crawler fetching the next pages.
+        """
+        batch_size = getattr(self.config, 'index_batch_size', 64)
+        results = {
+            'processed_urls': 0,
+            'total_chunks': 0,
+            'failed_urls': [],
+            'success_urls': [],
+            'processing_stats': {}
+        }
+        
+        try:
+            logger.info(f"Starting streaming training pipeline for URL: {url} (batch size {batch_size})")
+            self._reset_run_state()
+            
+            batch_chunks = []
+            batch_metadata = []
+            total_length = 0
+            unique_urls = set()
+            failed_batches = 0
+            
+            with self.vector_store.bulk_loading():
+                for doc in self.web_scraper.iter_documents(url, resume=resume):
+                    batch_chunks.append(doc.page_content)
+                    batch_metadata.append(self._prepare_metadata(doc, results['total_chunks']))
+                    results['total_chunks'] += 1
+                    total_length += len(doc.page_content)
+                    unique_urls.add(batch_metadata[-1]['url'])
+                
+                    # Until PCA is fitted the first batch is held back until it can serve as the fitting sample
+                    flush_size = batch_size
+                    if self.vector_store.needs_fit():
+                        flush_size = max(batch_size, getattr(self.config, 'dimension_reduction_fit_samples', 2048))
+                    if len(batch_chunks) >= flush_size:
+                        failed_batches += 0 if self._index_batch(batch_chunks, batch_metadata) else 1
+                        batch_chunks, batch_metadata = [], []
+            
+                if batch_chunks:
+                    failed_batches += 0 if self._index_batch(batch_chunks, batch_metadata) else 1
+            
+            if not results['total_chunks']:
+                logger.warning("No documents successfully scraped")
+                return results
+            
+            if failed_batches:
+                logger.error(f"Failed to index {failed_batches} batches")
+                results['failed_urls'] = [url]
+            else:
+                logger.info(f"Successfully indexed {results['total_chunks']} documents")
+                results['processed_urls'] = 1
+                results['success_urls'] = [url]
+            
+            results['processing_stats'] = {
+                'total_documents': results['total_chunks'],
+                'avg_content_length': total_length / results['total_chunks'],
+                'unique_urls': len(unique_urls),
+                **self._dedup_stats(),
+                **self._indexing_stats(),
+                **self._sync_stats()
+            }
+            
+            return results
+        
+        except Exception as e:
+            logger.error(f"Streaming training pipeline failed: {str(e)}")
+            results['failed_urls'] = [url]
+            return results
+    
+    def _reset_run_state(self) -> None:
+        self._current_chunks = {}
+        self._unchanged_chunks = 0
+        if getattr(self.config, 'dedup_enabled', True):
+            self.deduplicator = ChunkDeduplicator(
+                similarity_threshold=getattr(self.config, 'dedup_similarity_threshold', 0.95)
+            )
+    
+    def _dedup_stats(self) -> Dict[str, int]:
+        if self.deduplicator is None:
+            return {}
+        stats = self.deduplicator.stats()
+        logger.info(f"Deduplication dropped {stats['duplicates_dropped']} chunks "
+                    f"({stats['exact_duplicates']} exact, {stats['near_duplicates']} near duplicates)")
+        return stats
+    
+    def _skip_unchanged(self, chunks: List[str], metadata: List[Dict[str, Any]]):
+        existing = self.vector_store.existing_hashes([meta['chunk_id'] for meta in metadata])
+        kept = [(c, m) for c, m in zip(chunks, metadata)
+                if m.get('content_hash') is None or existing.get(m['chunk_id']) != m['content_hash']]
+        unchanged = len(chunks) - len(kept)
+        if unchanged:
+            logger.info(f"Skipping {unchanged} unchanged chunks")
+            self._unchanged_chunks += unchanged
+            if self.journal:
+                kept_ids = {m['chunk_id'] for _, m in kept}
+                self.journal.mark_chunks_indexed(
+                    meta['chunk_id'] for meta in metadata if meta['chunk_id'] not in kept_ids
+                )
+        return [c for c, _ in kept], [m for _, m in kept]
+    
+    def _sync_stats(self) -> Dict[str, int]:
+        """Delete chunks that disappeared from the pages crawled in this run."""
+        if not self.incremental_sync:
+            return {}
+        deleted = self.vector_store.delete_stale_chunks(self._current_chunks) if self._current_chunks else 0
+        logger.info(f"Incremental sync: {self._unchanged_chunks} unchanged chunks skipped, {deleted} stale chunks deleted")
+        return {'unchanged_chunks': self._unchanged_chunks, 'stale_chunks_deleted': deleted}
+    
+    def _indexing_stats(self) -> Dict[str, Any]:
+        stats = self.vector_store.indexing_stats()
+        logger.info(f"Indexed {stats['indexed']} chunks at {stats['docs_per_second']:.1f} docs/s "
+                    f"({stats['failed']} failed)")
+        return {
+            'indexed_chunks': stats['indexed'],
+            'failed_chunks': stats['failed'],
+            'docs_per_second': stats['docs_per_second']
+        }
+    
+    def _index_batch(self, chunks: List[str], metadata: List[Dict[str, Any]]) -> bool:
+        if self.incremental_sync:
+            # Every crawled page takes part in stale deletion, even if all its chunks are dropped below
+            for meta in metadata:
+                self._current_chunks.setdefault(meta['url'], set())
+        
+        if self.deduplicator is not None:
+            kept_chunks, kept_metadata = self.deduplicator.filter(chunks, metadata)
+            if len(kept_chunks) < len(chunks):
+                logger.info(f"Dropped {len(chunks) - len(kept_chunks)} duplicate chunks from batch")
+                if self.journal:
+                    # Dropped duplicates need no indexing; count them as done so their pages can finish
+                    kept_ids = {meta['chunk_id'] for meta in kept_metadata}
+                    self.journal.mark_chunks_indexed(
+                        meta['chunk_id'] for meta in metadata if meta['chunk_id'] not in kept_ids
+                    )
+                chunks, metadata = kept_chunks, kept_metadata
+            if not chunks:
+                return True
+        
+        if self.incremental_sync:
+            # Only kept chunks count as current: a dropped duplicate is stale on its page, so
+            # after every run exactly one copy (the one this run kept) stays in the index
+            for meta in metadata:
+                self._current_chunks[meta['url']].add(meta['chunk_id'])
+            chunks, metadata = self._skip_unchanged(chunks, metadata)
+            if not chunks:
+                return True
+        
+        if self.journal:
+            # Chunks indexed before an interruption are not embedded again
+            pending = self.journal.filter_unindexed(meta['chunk_id'] for meta in metadata)
+            if len(pending) < len(metadata):
+                logger.info(f"Skipping {len(metadata) - len(pending)} chunks already indexed")
+                kept = [(c, m) for c, m in zip(chunks, metadata) if m['chunk_id'] in pending]
+                chunks = [c for c, _ in kept]
+                metadata = [m for _, m in kept]
+            if not chunks:
+                return True
+        
+        logger.info(f"Indexing batch of {len(chunks)} chunks")
+        success = bool(self.vector_store.add_documents(chunks, metadata))
+        if success and self.journal:
+            self.journal.mark_chunks_indexed(meta['chunk_id'] for meta in metadata)
+        return success
+    
+    def _prepare_metadata(self, doc, index: int) -> Dict[str, Any]:
+        metadata_dict = doc.metadata
+        return {
+            'url': metadata_dict.get('url', ''),
+            'title': metadata_dict.get('title', ''),
+            'content_length': metadata_dict.get('content_length', len(doc.page_content)),
+            'source': metadata_dict.get('url', ''),
+            'sections_in_chunk': metadata_dict.get('sections_in_chunk', 1),
+            'chunk_id': metadata_dict.get('chunk_id', f'chunk_{index}'),
+            'depth': metadata_dict.get('depth', 0),
+            'created_at': metadata_dict.get('scraped_at', '2025-01-01T00:00:00Z'),
+            'content_hash': metadata_dict.get('content_hash')
+        }
     
     def process_single_url(self, url: str) -> Dict[str, Any]:
         return self.process_urls(url)
@@ -0,0 +1,96 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FUSION_METHODS = ("rrf", "weighted_rrf", "minmax", "zscore")
+
+
+def _document(hit: Dict[str, Any]) -> Dict[str, Any]:
+    src = hit.get("_source") or {}
+    return {
+        "id": hit["_id"],
+        "text": src.get("text"),
+        "metadata": src.get("metadata"),
+        "title": src.get("title"),
+        "url": src.get("url"),
+    }
+
+
+def _normalized(scores: np.ndarray, method: str) -> np.ndarray:
+    if method == "minmax":
+        spread = scores.max() - scores.min()
+        return (scores - scores.min()) / spread if spread > 0 else np.ones_like(scores)
+    std = scores.std()
+    return (scores - scores.mean()) / std if std > 0 else np.zeros_like(scores)
+
+
+def fuse(hit_lists: Dict[str, List[Dict[str, Any]]], method: str = "rrf",
+         weights: Optional[Dict[str, float]] = None, k: int = 60,
+         top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Fuse any number of ranked hit lists (retriever name -> ES-style hits) into one ranking.
+
+    rrf           sum of 1 / (k + rank)
+    weighted_rrf  sum of weight / (k + rank)
+    minmax        weighted sum of per-list min-max normalized scores
+    zscore        weighted sum of per-list z-scores
+
+    Every list becomes a row of a (retrievers x documents) matrix, so fusing is one
+    weighted matrix-vector product. For score fusion a document missing from a list gets
+    that list's lowest normalized score rather than zero, so z-scores are not inflated.
+    Each result carries `fusion_score` and its normalized score per retriever.
+    """
+    if method not in FUSION_METHODS:
+        raise ValueError(f"Unknown fusion method {method}, expected one of {FUSION_METHODS}")
+
+    names = [name for name, hits in hit_lists.items() if hits]
+    if not names:
+        return []
+
+    # Documents in order of first appearance
+    positions: Dict[str, int] = {}
+    documents: List[Dict[str, Any]] = []
+    list_positions = []
+    for name in names:
+        idx = np.empty(len(hit_lists[name]), dtype=np.int64)
+        for i, hit in enumerate(hit_lists[name]):
+            doc_id = hit["_id"]
+            if doc_id not in positions:
+                positions[doc_id] = len(documents)
+                documents.append(_document(hit))
+            idx[i] = positions[doc_id]
+        list_positions.append(idx)
+
+    matrix = np.zeros((len(names), len(documents)), dtype=np.float64)
+    per_list_scores = np.zeros_like(matrix)
+    for row, (name, idx) in enumerate(zip(names, list_positions)):
+        hits = hit_lists[name]
+        raw = np.array([hit.get("_score") or 0.0 for hit in hits], dtype=np.float64)
+        per_list_scores[row, idx] = np.array([hit.get("_normalized_score", 0.0) for hit in hits])
+        if method in ("rrf", "weighted_rrf"):
+            matrix[row, idx] = 1.0 / (k + np.arange(1, len(hits) + 1))
+        else:
+            normalized = _normalized(raw, method)
+            matrix[row, :] = normalized.min()
+            matrix[row, idx] = normalized
+
+    weights = weights or {}
+    weight_vector = np.array([1.0 if method == "rrf" else weights.get(name, 1.0) for name in names])
+    fused = weight_vector @ matrix
+
+    order = np.argsort(-fused, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+
+    results = []
+    for position in order:
+        document = documents[position]
+        document["fusion_score"] = float(fused[position])
+        for name in hit_lists:
+            document[f"{name}_score"] = 0.0
+        for row, name in enumerate(names):
+            document[f"{name}_score"] = float(per_list_scores[row, position])
+        results.append(document)
+    return results
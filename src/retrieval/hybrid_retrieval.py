@@ -1,47 +1,126 @@
-from langchain.vectorstores.elasticsearch import ElasticsearchStore
 import logging
-import torch
-import os
-import base64
-import json
-from elasticsearch import Elasticsearch
-from langchain_huggingface import HuggingFaceEmbeddings
+from concurrent.futures import ThreadPoolExecutor
+from ..vectorstore.es_client import get_es_client
+from .fusion import fuse
+from ..embeddings.embeddings import build_embeddings
+from ..embeddings.dimension_reduction import reduce_embeddings
+from ..embeddings.query_cache import QueryEmbeddingCache
+from ..embeddings.batch_scheduler import EmbeddingBatcher
 
 logger = logging.getLogger(__name__)
+
+SOURCE_FIELDS = ["text", "metadata", "title", "url", "chunk_id", "source", "sections_in_chunk", "depth"]
+
 class Hybrid_search : 
     def __init__(self, config) : 
-        self.es = Elasticsearch([config.es_url ])
+        self.backend = getattr(config, 'vector_store_backend', 'elasticsearch')
+        self.es = None
+        self.local_store = None
+        if self.backend == "local":
+            # In-process index: no cluster, no network round trips
+            from ..vectorstore.local_store import LocalVectorStore
+            self.local_store = LocalVectorStore(config, read_only=True)
+        else:
+            self.es = get_es_client(config)
         self.index_name = config.index_name  
         self.embed_model = config.embedding_model_name 
+        self.semantic_search_mode = getattr(config, 'semantic_search_mode', 'knn')
+        self.knn_num_candidates = getattr(config, 'knn_num_candidates', 100)
+        self.hybrid_search_mode = getattr(config, 'hybrid_search_mode', 'auto')
+        self.rrf_rank_constant = getattr(config, 'rrf_rank_constant', 60)
+        self._native_rrf_supported = None
+        self.top_k = getattr(config, 'top_k_results', 5)
+        self.fusion_method = getattr(config, 'fusion_method', 'rrf')
+        # Retrievers to run and fuse, with their weights (used by weighted_rrf/minmax/zscore)
+        self.fusion_weights = dict(getattr(config, 'fusion_weights', None) or {"lexical": 1.0, "semantic": 1.0})
+        self._executor = ThreadPoolExecutor(max_workers=max(2, len(self.fusion_weights)),
+                                            thread_name_prefix="retriever")
         
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=self.embed_model,
-            model_kwargs={'device': 'cuda'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        # Queries go through the same dimension reduction as the indexed vectors
+        self.embeddings = reduce_embeddings(build_embeddings(config), config)
+
+        self.query_cache = None
+        if getattr(config, 'query_cache_size', 0) > 0:
+            self.query_cache = QueryEmbeddingCache(
+                max_size=config.query_cache_size,
+                ttl_seconds=getattr(config, 'query_cache_ttl', 3600)
+            )
+
+        self.query_batcher = None
+        if getattr(config, 'query_batching', False):
+            self.query_batcher = EmbeddingBatcher(
+                getattr(self.embeddings, 'embed_queries', self.embeddings.embed_documents),
+                max_batch_size=getattr(config, 'query_batch_max_size', 16),
+                max_wait_ms=getattr(config, 'query_batch_wait_ms', 5)
+            )
 
     def get_embeddings(self, query:str) : 
         try:
             query = query.replace("\n", " ")
-            return self.embeddings.embed_query(query)
+            embedding = self.query_cache.get(query) if self.query_cache else None
+            if embedding is None:
+                embedding = self._encode_query(query)
+                if self.query_cache:
+                    self.query_cache.put(query, embedding)
+            return embedding
         except Exception as e:
             logger.error(f"Error fetching embedding: {str(e)}")
 
+    def _encode_query(self, query:str) : 
+        if self.query_batcher is not None:
+            return self.query_batcher.embed(query)
+        return self.embeddings.embed_query(query)
+
+    def index_version(self) : 
+        """Name of the index currently serving queries: the alias target on Elasticsearch,
+        the CURRENT version on the local backend."""
+        try:
+            if self.local_store is not None:
+                self.local_store.maybe_reload()
+                return self.local_store.index_name
+            if self.es.indices.exists_alias(name=self.index_name):
+                return ",".join(sorted(self.es.indices.get_alias(name=self.index_name)))
+            return self.index_name
+        except Exception as e:
+            logger.error(f"Error resolving the index version : {e}")
+            return None
+
+    def warmup(self) : 
+        if hasattr(self.embeddings, 'warmup'):
+            self.embeddings.warmup()
+        else:
+            self.embeddings.embed_query("warmup")
+        if self.es is not None:
+            self.es.ping()
+
+    def stats(self) :
+        return {
+            "query_embedding_cache": self.query_cache.stats() if self.query_cache else None,
+            "query_batcher": self.query_batcher.stats() if self.query_batcher else None
+        }
+
+    @staticmethod
+    def _normalize_hits(hits):
+        max_score = max([hit.get("_score") or 0 for hit in hits], default=1.0)
+        for hit in hits:
+            hit["_normalized_score"] = ((hit.get("_score") or 0) / max_score) if max_score else 0.0
+        return hits
+
+    def _lexical_body(self, query: str, top_k: int, field: str = "text"):
+        return {
+            "size": top_k,
+            "query": {"match": {field: query}},
+            "_source": SOURCE_FIELDS  #Extract metadata stored in _source
+        }
+
     def lexical_search(self, query: str, top_k: int):
 
         try : 
-            lexical_query = {
-                "size": top_k,
-                "query": {"match": {"text": query}},
-                "_source": ["text", "metadata", "title", "url", "chunk_id", "source", "sections_in_chunk", "depth"]  #Extract metadata stored in _source
-            }
-
-            lexical_results = self.es.search(index=self.index_name, body=lexical_query)
-            lexical_hits = lexical_results["hits"]["hits"]
-            max_bm25_score = max([hit.get("_score", 0) for hit in lexical_hits], default=1.0)
-            for hit in lexical_hits:
-                hit["_normalized_score"] = (hit.get("_score", 0) / max_bm25_score) if max_bm25_score else 0.0
-            return lexical_hits
+            if self.local_store is not None:
+                self.local_store.maybe_reload()
+                return self._normalize_hits(self.local_store.lexical_search(query, top_k))
+            lexical_results = self.es.search(index=self.index_name, body=self._lexical_body(query, top_k))
+            return self._normalize_hits(lexical_results["hits"]["hits"])
 
         except Exception as e :
             logger.error(f"Error in fetching data using BM25 : {e}") 
@@ -50,37 +129,58 @@ class Hybrid_search :
 
 
 
-    def semantic_search(self,query: str, top_k: int):
-        try : 
-            query_embedding = self.get_embeddings(query)
-            script_query = {
-                "size": top_k,
-                "query": {
-                    "script_score": {
+    def _knn_body(self, query_embedding, top_k: int, num_candidates: int = None):
+        # Approximate search over the HNSW graph; cost depends on num_candidates, not corpus size
+        num_candidates = max(top_k, num_candidates or self.knn_num_candidates)
+        return {
+            "knn": {
+                "field": "vector",
+                "query_vector": query_embedding,
+                "k": top_k,
+                "num_candidates": min(num_candidates, 10000)
+            },
+            "size": top_k,
+            "_source": SOURCE_FIELDS
+        }
 
-                        "query": {
+    def _script_body(self, query_embedding, top_k: int):
+        # Exact brute-force cosine over every document with a vector
+        return {
+            "size": top_k,
+            "query": {
+                "script_score": {
+                    "query": {
                         "bool": {
                             "filter": [
                                 {"exists": {"field": "vector"}}
                             ]
                         }
                     },
-                        "script": {
-                            "source": "cosineSimilarity(params.query_embedding, 'vector') + 1.0",
-                            "params": {
-                                "query_embedding": query_embedding,
-                            }
+                    "script": {
+                        "source": "cosineSimilarity(params.query_embedding, 'vector') + 1.0",
+                        "params": {
+                            "query_embedding": query_embedding,
                         }
                     }
-                },
-                "_source": ["text", "metadata", "title", "url", "chunk_id", "source", "sections_in_chunk", "depth"]
-            }
-            semantic_results = self.es.search(index=self.index_name, body=script_query)
-            semantic_hits = semantic_results["hits"]["hits"]
-            max_semantic_score = max([hit["_score"] for hit in semantic_hits], default=1.0)
-            for hit in semantic_hits:
-                hit["_normalized_score"] = hit["_score"] / max_semantic_score
-            return semantic_hits
+                }
+            },
+            "_source": SOURCE_FIELDS
+        }
+
+    def _semantic_body(self, query_embedding, top_k: int, mode: str = None, num_candidates: int = None):
+        if (mode or self.semantic_search_mode) == "script":
+            return self._script_body(query_embedding, top_k)
+        return self._knn_body(query_embedding, top_k, num_candidates)
+
+    def semantic_search(self,query: str, top_k: int, mode: str = None, num_candidates: int = None):
+        try : 
+            query_embedding = self.get_embeddings(query)
+            if self.local_store is not None:
+                self.local_store.maybe_reload()
+                return self._normalize_hits(self.local_store.vector_search(query_embedding, top_k))
+            body = self._semantic_body(query_embedding, top_k, mode, num_candidates)
+            semantic_results = self.es.search(index=self.index_name, body=body)
+            return self._normalize_hits(semantic_results["hits"]["hits"])
         
         except Exception as  e : 
             logger.error(f"Error in fetching data using Semantic Search : {e}")
@@ -89,56 +189,164 @@ class Hybrid_search :
 
     def reciprocal_rank_fusion(self, query, lexical_hits, semantic_hits, k=60, top_k=2):
         try : 
-            rrf_scores = {}
-            for rank, hit in enumerate(lexical_hits, start=1):
-                doc_id = hit["_id"]
-                src = hit.get("_source", {})
-                rrf_scores.setdefault(doc_id, {
-                    "id": doc_id,
-                    "text": src.get("text"),
-                    "metadata": src.get("metadata"),
-                    "title": src.get("title"),
-                    "url": src.get("url"),
-                    "lexical_score": 0,
-                    "semantic_score": 0,
-                    "rrf_score": 0,
-                })
-                rrf_scores[doc_id]["lexical_score"] = hit.get("_normalized_score", 0)
-                rrf_scores[doc_id]["rrf_score"] += 1 / (k + rank)
-
-            for rank, hit in enumerate(semantic_hits, start=1):
-                doc_id = hit["_id"]
-                src = hit.get("_source", {})
-                rrf_scores.setdefault(doc_id, {
-                    "id": doc_id,
-                    "text": src.get("text"),
-                    "metadata": src.get("metadata"),
-                    "title": src.get("title"),
-                    "url": src.get("url"),
-                    "lexical_score": 0,
-                    "semantic_score": 0,
-                    "rrf_score": 0,
-                })
-                rrf_scores[doc_id]["semantic_score"] = hit.get("_normalized_score", 0)
-                rrf_scores[doc_id]["rrf_score"] += 1 / (k + rank)
-
-            sorted_results = sorted(rrf_scores.values(), key=lambda x: x["rrf_score"], reverse=True)
-
-            # Print for debugging
-            for i, doc in enumerate(sorted_results[:top_k], 1):
-                print(f"{i}. id={doc['id']} rrf={doc['rrf_score']:.6f} text_snippet={doc['text'][:80] if doc['text'] else ''}")
-
-            return sorted_results[:top_k]
+            return fuse({"lexical": lexical_hits, "semantic": semantic_hits}, method="rrf", k=k, top_k=top_k)
 
         except Exception as e : 
             logger.error(f"Error in Reciprocal Rank Fusion : {e}")
             return {}
 
 
+    def _rrf_retriever_body(self, query: str, query_embedding, lexical_top_k: int, semantic_top_k: int, top_k: int):
+        # Both sub-queries and the fusion run inside Elasticsearch (RRF retriever, 8.14+)
+        if self.semantic_search_mode == "script":
+            # Same exact script_score scan as _script_body, as a standard retriever
+            semantic_retriever = {"standard": {"query": self._script_body(query_embedding, semantic_top_k)["query"]}}
+        else:
+            semantic_retriever = {"knn": {
+                "field": "vector",
+                "query_vector": query_embedding,
+                "k": semantic_top_k,
+                "num_candidates": min(max(semantic_top_k, self.knn_num_candidates), 10000)
+            }}
+        return {
+            "retriever": {
+                "rrf": {
+                    "retrievers": [
+                        {"standard": {"query": {"match": {"text": query}}}},
+                        semantic_retriever
+                    ],
+                    "rank_window_size": max(lexical_top_k, semantic_top_k, top_k),
+                    "rank_constant": self.rrf_rank_constant
+                }
+            },
+            "size": top_k,
+            "_source": SOURCE_FIELDS
+        }
 
-    def hybrid_search(self,query: str, lexical_top_k:int=5, semantic_top_k:int=5):
-        lexical_hits = self.lexical_search(query, lexical_top_k)
-        semantic_hits = self.semantic_search(query, semantic_top_k)
-        rrf_results = self.reciprocal_rank_fusion(query, lexical_hits, semantic_hits, k=60, top_k=2)
-        return rrf_results 
+    def _supports_native_rrf(self) -> bool:
+        if self._native_rrf_supported is None:
+            try:
+                version = self.es.info()["version"]["number"]
+                major, minor = (int(part) for part in version.split(".")[:2])
+                self._native_rrf_supported = (major, minor) >= (8, 14)
+            except Exception as e:
+                logger.warning(f"Could not read the cluster version, not using native RRF: {e}")
+                self._native_rrf_supported = False
+        return self._native_rrf_supported
 
+    def native_rrf_search(self, query: str, lexical_top_k: int, semantic_top_k: int, top_k: int = 2):
+        """Hybrid search fused by Elasticsearch; returns None when the cluster rejects the retriever."""
+        query_embedding = self.get_embeddings(query)
+        if query_embedding is None:
+            # Sending the retriever without a vector gets a 400, which would disable RRF for good
+            return None
+        body = self._rrf_retriever_body(query, query_embedding, lexical_top_k, semantic_top_k, top_k)
+        try:
+            response = self.es.search(index=self.index_name, body=body)
+        except Exception as e:
+            status = getattr(e, 'status_code', None) or getattr(getattr(e, 'meta', None), 'status', None)
+            if status in (400, 403):
+                # Unknown retriever or a license without RRF; stop trying for the life of this process
+                logger.warning(f"Native RRF retriever unavailable, falling back to msearch: {e}")
+                self._native_rrf_supported = False
+            else:
+                # Timeouts, 429s and 5xx are transient: fall back for this request only
+                logger.warning(f"Native RRF search failed, using msearch for this query: {e}")
+            return None
+
+        results = []
+        for hit in response["hits"]["hits"]:
+            src = hit.get("_source", {})
+            results.append({
+                "id": hit["_id"],
+                "text": src.get("text"),
+                "metadata": src.get("metadata"),
+                "title": src.get("title"),
+                "url": src.get("url"),
+                "lexical_score": None,
+                "semantic_score": None,
+                "fusion_score": hit.get("_score") or 0,
+            })
+        return results
+
+    def _retriever_body(self, name: str, query: str, query_embedding, size: int):
+        if name == "lexical":
+            return self._lexical_body(query, size)
+        if name == "title":
+            return self._lexical_body(query, size, field="title")
+        if name == "semantic":
+            return self._semantic_body(query_embedding, size)
+        raise ValueError(f"Unknown retriever: {name}")
+
+    def _search_one(self, name: str, query: str, query_embedding, size: int):
+        try:
+            if self.local_store is not None:
+                if name == "semantic":
+                    hits = self.local_store.vector_search(query_embedding, size)
+                else:
+                    hits = self.local_store.lexical_search(query, size, field="title" if name == "title" else "text")
+            else:
+                body = self._retriever_body(name, query, query_embedding, size)
+                hits = self.es.search(index=self.index_name, body=body)["hits"]["hits"]
+            return self._normalize_hits(hits)
+        except Exception as e:
+            logger.error(f"Error in {name} retriever : {e}")
+            return []
+
+    def msearch(self, query: str, query_embedding, sizes):
+        """Hits of every retriever in `sizes` from a single _msearch round trip."""
+        try:
+            searches = []
+            for name, size in sizes.items():
+                searches += [{}, self._retriever_body(name, query, query_embedding, size)]
+            responses = self.es.msearch(index=self.index_name, body=searches)["responses"]
+            hits = {}
+            for name, response in zip(sizes, responses):
+                if "error" in response:
+                    logger.error(f"Error in {name} part of msearch : {response['error']}")
+                    hits[name] = []
+                else:
+                    hits[name] = self._normalize_hits(response["hits"]["hits"])
+            return hits
+
+        except Exception as e:
+            logger.error(f"Error in msearch : {e}")
+            return {name: [] for name in sizes}
+
+    def retrieve(self, query: str, sizes):
+        """Run the retrievers named in `sizes` (name -> number of hits) concurrently.
+        
+        On Elasticsearch all of them go out in one _msearch; otherwise (local backend or
+        hybrid_search_mode='parallel') each runs on the retriever thread pool.
+        hybrid_search_mode='sequential' runs them one after another on the calling thread.
+        """
+        query_embedding = self.get_embeddings(query) if "semantic" in sizes else None
+        if self.local_store is not None:
+            self.local_store.maybe_reload()
+        elif self.hybrid_search_mode not in ("parallel", "sequential"):
+            return self.msearch(query, query_embedding, sizes)
+
+        if self.hybrid_search_mode == "sequential":
+            return {name: self._search_one(name, query, query_embedding, size) for name, size in sizes.items()}
+
+        futures = {name: self._executor.submit(self._search_one, name, query, query_embedding, size)
+                   for name, size in sizes.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def hybrid_search(self,query: str, lexical_top_k:int=5, semantic_top_k:int=5, top_k:int=None):
+        top_k = top_k or self.top_k
+        plain_rrf = self.fusion_method == "rrf" and set(self.fusion_weights) == {"lexical", "semantic"}
+        if self.local_store is None and plain_rrf and self.hybrid_search_mode in ("auto", "native_rrf") \
+                and self._supports_native_rrf():
+            rrf_results = self.native_rrf_search(query, lexical_top_k, semantic_top_k, top_k=top_k)
+            if rrf_results is not None:
+                return rrf_results
+
+        sizes = {name: semantic_top_k if name == "semantic" else lexical_top_k for name in self.fusion_weights}
+        hit_lists = self.retrieve(query, sizes)
+        try:
+            return fuse(hit_lists, method=self.fusion_method, weights=self.fusion_weights,
+                        k=self.rrf_rank_constant, top_k=top_k)
+        except Exception as e:
+            logger.error(f"Error in fusion : {e}")
+            return []
@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..embeddings import model_registry
+from ..embeddings.embeddings import resolve_device
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Re-scores fused candidates with a cross-encoder under a hard per-request time budget.
+
+    Pairs are scored in batches on a small worker pool sized for concurrent requests. The
+    budget is one deadline counted from the call, covering both the wait for a worker and
+    the scoring. A request that gets no worker before the deadline is dropped from the
+    queue; either way it gets the fused order back, and a worker that was already scoring
+    stops at its next batch boundary instead of finishing work nobody will read.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", device: str = "cpu",
+                 batch_size: int = 16, max_length: int = 256, budget_ms: Optional[float] = 200,
+                 workers: int = 4):
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.budget_ms = budget_ms
+        self.model = model_registry.get_or_load(
+            ("cross_encoder", model_name, device, max_length), self._load_model
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="reranker")
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.reranked = 0
+        self.timeouts = 0
+        self.queue_timeouts = 0
+        self.errors = 0
+        self._latencies_ms: List[float] = []
+
+    @classmethod
+    def from_config(cls, config) -> Optional["CrossEncoderReranker"]:
+        if not getattr(config, 'rerank_enabled', False):
+            return None
+        return cls(
+            model_name=getattr(config, 'reranker_model_name', "cross-encoder/ms-marco-MiniLM-L-6-v2"),
+            device=getattr(config, 'rerank_device', 'cpu'),
+            batch_size=getattr(config, 'rerank_batch_size', 16),
+            max_length=getattr(config, 'rerank_max_length', 256),
+            budget_ms=getattr(config, 'rerank_budget_ms', 200),
+            workers=getattr(config, 'rerank_workers', 4)
+        )
+
+    def _load_model(self):
+        # Imported here so the reranker costs nothing unless it is enabled
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(self.model_name, device=resolve_device(self.device), max_length=self.max_length)
+
+    def warmup(self) -> None:
+        self.model.predict([("warmup", "warmup " * 64)] * self.batch_size, batch_size=self.batch_size)
+
+    def _score(self, pairs: List[tuple], started: threading.Event,
+               cancelled: threading.Event) -> Optional[np.ndarray]:
+        if cancelled.is_set():
+            return None  # the request gave up while this job was queued
+        started.set()
+        scores = []
+        for start in range(0, len(pairs), self.batch_size):
+            if cancelled.is_set():
+                return None
+            batch = pairs[start:start + self.batch_size]
+            scores.append(np.asarray(self.model.predict(batch, batch_size=len(batch)), dtype=np.float32))
+        return np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+
+    def rerank(self, query: str, documents: List[Dict[str, Any]], top_n: int) -> List[Dict[str, Any]]:
+        """The `top_n` best of `documents` by cross-encoder score, or the first `top_n` in
+        fused order if scoring fails or misses the budget."""
+        if len(documents) <= 1:
+            return documents[:top_n]
+
+        start = time.perf_counter()
+        pairs = [(query, doc.get("text") or "") for doc in documents]
+        started = threading.Event()
+        cancelled = threading.Event()
+        future = self._executor.submit(self._score, pairs, started, cancelled)
+        deadline = start + self.budget_ms / 1000 if self.budget_ms else None
+        if not started.wait(timeout=self._remaining(deadline)) and not future.done():
+            # Every worker is busy with other requests; don't queue CPU work we won't wait for
+            cancelled.set()
+            future.cancel()
+            self._record(start, queue_timed_out=True)
+            logger.warning(f"No rerank worker free within {self.budget_ms} ms, using the fused order")
+            return documents[:top_n]
+        try:
+            scores = future.result(timeout=self._remaining(deadline))
+            if scores is None:
+                raise FutureTimeout()
+        except FutureTimeout:
+            cancelled.set()
+            self._record(start, timed_out=True)
+            logger.warning(f"Rerank exceeded its {self.budget_ms} ms budget, using the fused order")
+            return documents[:top_n]
+        except Exception as e:
+            self._record(start, failed=True)
+            logger.error(f"Error in reranking : {e}")
+            return documents[:top_n]
+
+        order = np.argsort(-scores, kind="stable")[:top_n]
+        results = []
+        for position in order:
+            document = documents[position]
+            document["rerank_score"] = float(scores[position])
+            results.append(document)
+        self._record(start)
+        return results
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(0.0, deadline - time.perf_counter())
+
+    def _record(self, start: float, timed_out: bool = False, queue_timed_out: bool = False,
+                failed: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.timeouts += timed_out
+            self.queue_timeouts += queue_timed_out
+            self.errors += failed
+            self.reranked += not (timed_out or queue_timed_out or failed)
+            self._latencies_ms.append((time.perf_counter() - start) * 1000)
+            del self._latencies_ms[:-1000]   # recent window only
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = np.asarray(self._latencies_ms) if self._latencies_ms else None
+            return {
+                'model': self.model_name,
+                'budget_ms': self.budget_ms,
+                'requests': self.requests,
+                'reranked': self.reranked,
+                'timeouts': self.timeouts,
+                'queue_timeouts': self.queue_timeouts,
+                'errors': self.errors,
+                'p50_ms': float(np.percentile(latencies, 50)) if latencies is not None else None,
+                'p95_ms': float(np.percentile(latencies, 95)) if latencies is not None else None
+            }
@@ -0,0 +1,407 @@
+import heapq
+import logging
+import math
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Approximate nearest-neighbour indexes for the in-process retrieval path, in plain numpy.
+# Both score by inner product, i.e. cosine similarity on the L2-normalized vectors the
+# local store keeps, and map results back to caller-supplied integer ids.
+
+
+def kmeans(x: np.ndarray, k: int, iterations: int = 20, seed: int = 42) -> np.ndarray:
+    """Lloyd's k-means (L2), initialised from a random sample; returns (k, dim) centroids."""
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=np.float32)
+    centroids = x[rng.choice(len(x), size=k, replace=len(x) < k)].copy()
+    x_norms = (x ** 2).sum(axis=1)
+    for _ in range(iterations):
+        assign = _nearest_centroid(x, centroids, x_norms)
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            # Re-seed empty clusters on random points so every centroid stays in use
+            centroids[empty] = x[rng.choice(len(x), size=int(empty.sum()))]
+    return centroids
+
+
+def _nearest_centroid(x: np.ndarray, centroids: np.ndarray, x_norms: Optional[np.ndarray] = None,
+                      block: int = 65536) -> np.ndarray:
+    c_norms = (centroids ** 2).sum(axis=1)
+    assign = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), block):
+        part = x[start:start + block]
+        norms = x_norms[start:start + block] if x_norms is not None else (part ** 2).sum(axis=1)
+        distances = norms[:, None] - 2 * part @ centroids.T + c_norms[None, :]
+        assign[start:start + block] = distances.argmin(axis=1)
+    return assign
+
+
+class HNSWIndex:
+    """Hierarchical Navigable Small World graph (Malkov & Yashunin) over inner product.
+
+    Layer 0 neighbours live in a dense (n, 2*m) int32 matrix; the sparse upper layers in
+    dicts. Inserts are incremental; `ef_search` trades recall for latency at query time.
+    """
+
+    kind = "hnsw"
+
+    def __init__(self, dim: int, m: int = 16, ef_construction: int = 100, ef_search: int = 64, seed: int = 42):
+        self.dim = dim
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.level_mult = 1 / math.log(max(m, 2))
+        self.rng = np.random.default_rng(seed)
+
+        self.size = 0
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.layer0 = np.full((0, self.m0), -1, dtype=np.int32)
+        self.upper: List[dict] = []
+        self.entry_point = -1
+        self.max_level = -1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _grow(self, extra: int) -> None:
+        needed = self.size + extra
+        if needed <= len(self.vectors):
+            return
+        capacity = max(needed, 2 * len(self.vectors), 1024)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self.size] = self.ids[:self.size]
+        layer0 = np.full((capacity, self.m0), -1, dtype=np.int32)
+        layer0[:self.size] = self.layer0[:self.size]
+        self.vectors, self.ids, self.layer0 = vectors, ids, layer0
+
+    def max_id(self) -> int:
+        return int(self.ids[:self.size].max()) if self.size else -1
+
+    def _neighbors(self, node: int, level: int) -> np.ndarray:
+        if level == 0:
+            row = self.layer0[node]
+            return row[row >= 0]
+        return self.upper[level - 1].get(node, np.zeros(0, dtype=np.int32))
+
+    def _set_neighbors(self, node: int, level: int, neighbors: List[int]) -> None:
+        if level == 0:
+            self.layer0[node] = -1
+            self.layer0[node, :len(neighbors)] = neighbors
+        else:
+            self.upper[level - 1][node] = np.asarray(neighbors, dtype=np.int32)
+
+    def _search_layer(self, query: np.ndarray, entry_points: List[int], ef: int, level: int) -> List[Tuple[float, int]]:
+        visited = set(entry_points)
+        sims = self.vectors[entry_points] @ query
+        candidates = [(-float(s), node) for s, node in zip(sims, entry_points)]
+        heapq.heapify(candidates)
+        results = [(float(s), node) for s, node in zip(sims, entry_points)]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if len(results) >= ef and -neg_sim < results[0][0]:
+                break
+            new = [n for n in self._neighbors(node, level).tolist() if n not in visited]
+            if not new:
+                continue
+            visited.update(new)
+            for n, s in zip(new, (self.vectors[new] @ query).tolist()):
+                if len(results) < ef or s > results[0][0]:
+                    heapq.heappush(candidates, (-s, n))
+                    heapq.heappush(results, (s, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, reverse=True)
+
+    def _select(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """Neighbour-selection heuristic: skip candidates closer to an already chosen neighbour
+        than to the base point, so edges spread in different directions; top up with the
+        skipped ones if fewer than m survive."""
+        selected, skipped = [], []
+        for sim, node in candidates:
+            if len(selected) >= m:
+                break
+            if not selected or float((self.vectors[selected] @ self.vectors[node]).max()) < sim:
+                selected.append(node)
+            else:
+                skipped.append(node)
+        return selected + skipped[:m - len(selected)]
+
+    def _connect(self, node: int, neighbor: int, level: int) -> None:
+        current = self._neighbors(neighbor, level).tolist()
+        max_neighbors = self.m0 if level == 0 else self.m
+        if len(current) < max_neighbors:
+            self._set_neighbors(neighbor, level, current + [node])
+            return
+        pool = current + [node]
+        sims = self.vectors[pool] @ self.vectors[neighbor]
+        ranked = sorted(zip(sims.tolist(), pool), reverse=True)
+        self._set_neighbors(neighbor, level, self._select(ranked, max_neighbors))
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self._grow(len(vectors))
+        for external_id, vector in zip(ids, vectors):
+            self._insert(int(external_id), vector)
+
+    def _insert(self, external_id: int, vector: np.ndarray) -> None:
+        node = self.size
+        self.vectors[node] = vector
+        self.ids[node] = external_id
+        self.size += 1
+
+        level = int(-math.log(max(self.rng.random(), 1e-12)) * self.level_mult)
+        while len(self.upper) < level:
+            self.upper.append({})
+
+        if self.entry_point < 0:
+            self.entry_point, self.max_level = node, level
+            return
+
+        entry = [self.entry_point]
+        for l in range(self.max_level, level, -1):
+            entry = [self._search_layer(vector, entry, 1, l)[0][1]]
+
+        for l in range(min(level, self.max_level), -1, -1):
+            candidates = self._search_layer(vector, entry, self.ef_construction, l)
+            neighbors = self._select(candidates, self.m)
+            self._set_neighbors(node, l, neighbors)
+            for neighbor in neighbors:
+                self._connect(node, neighbor, l)
+            entry = [n for _, n in candidates]
+
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+
+    def search(self, query: np.ndarray, k: int, ef: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if self.size == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+        entry = [self.entry_point]
+        for l in range(self.max_level, 0, -1):
+            entry = [self._search_layer(query, entry, 1, l)[0][1]]
+        results = self._search_layer(query, entry, max(ef or self.ef_search, k), 0)[:k]
+        nodes = np.array([n for _, n in results], dtype=np.int64)
+        return self.ids[nodes], np.array([s for s, _ in results], dtype=np.float32)
+
+    def save(self, path: str) -> None:
+        arrays = {
+            "kind": np.array(self.kind),
+            "params": np.array([self.dim, self.m, self.ef_construction, self.ef_search,
+                                self.entry_point, self.max_level], dtype=np.int64),
+            "vectors": self.vectors[:self.size],
+            "ids": self.ids[:self.size],
+            "layer0": self.layer0[:self.size],
+        }
+        for level, links in enumerate(self.upper, start=1):
+            nodes = np.array(sorted(links), dtype=np.int32)
+            matrix = np.full((len(nodes), self.m), -1, dtype=np.int32)
+            for i, node in enumerate(nodes):
+                matrix[i, :len(links[node])] = links[node]
+            arrays[f"upper_nodes_{level}"] = nodes
+            arrays[f"upper_links_{level}"] = matrix
+        _savez(path, arrays)
+
+    @classmethod
+    def from_arrays(cls, data) -> "HNSWIndex":
+        dim, m, ef_construction, ef_search, entry_point, max_level = data["params"].tolist()
+        index = cls(dim, m=m, ef_construction=ef_construction, ef_search=ef_search)
+        index.vectors = data["vectors"].astype(np.float32)
+        index.ids = data["ids"].astype(np.int64)
+        index.layer0 = data["layer0"].astype(np.int32)
+        index.size = len(index.ids)
+        index.entry_point, index.max_level = entry_point, max_level
+        level = 1
+        while f"upper_nodes_{level}" in data:
+            nodes, matrix = data[f"upper_nodes_{level}"], data[f"upper_links_{level}"]
+            index.upper.append({int(node): row[row >= 0] for node, row in zip(nodes, matrix)})
+            level += 1
+        return index
+
+
+class IVFPQIndex:
+    """Inverted file with product quantization.
+
+    A coarse k-means splits the space into `nlist` cells; each vector is stored as its cell
+    plus an m-byte PQ code of the residual, so 768 float32 dims (3 KB) shrink to m bytes.
+    Queries visit the `nprobe` best cells and score codes with per-subspace lookup tables.
+    The index must be trained on a representative sample before vectors are added.
+    """
+
+    kind = "ivfpq"
+
+    def __init__(self, dim: int, nlist: int = 256, m: int = 16, nprobe: int = 8):
+        if dim % m:
+            raise ValueError(f"PQ needs the dimension ({dim}) to be a multiple of m ({m})")
+        self.dim = dim
+        self.nlist = nlist
+        self.m = m
+        self.dsub = dim // m
+        self.ksub = 256
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+        self.list_ids: List[List[np.ndarray]] = [[] for _ in range(nlist)]
+        self.list_codes: List[List[np.ndarray]] = [[] for _ in range(nlist)]
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def max_id(self) -> int:
+        ids = [ids for lists in self.list_ids for ids in lists if len(ids)]
+        return max(int(i.max()) for i in ids) if ids else -1
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, max_samples: int = 50000, seed: int = 42) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) > max_samples:
+            vectors = vectors[np.random.default_rng(seed).choice(len(vectors), max_samples, replace=False)]
+        self.nlist = min(self.nlist, len(vectors))
+        self.list_ids = [[] for _ in range(self.nlist)]
+        self.list_codes = [[] for _ in range(self.nlist)]
+        self.centroids = kmeans(vectors, self.nlist, seed=seed)
+        residuals = vectors - self.centroids[_nearest_centroid(vectors, self.centroids)]
+        ksub = min(self.ksub, len(vectors))
+        self.codebooks = np.stack([
+            kmeans(residuals[:, j * self.dsub:(j + 1) * self.dsub], ksub, seed=seed + j)
+            for j in range(self.m)
+        ])
+        logger.info(f"Trained IVF-PQ: {self.nlist} lists, {self.m} x {ksub} codebooks on {len(vectors)} vectors")
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        codes = np.empty((len(residuals), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _nearest_centroid(residuals[:, j * self.dsub:(j + 1) * self.dsub], self.codebooks[j])
+        return codes
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        if not self.trained:
+            raise RuntimeError("IVF-PQ index must be trained before adding vectors")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        assign = _nearest_centroid(vectors, self.centroids)
+        codes = self._encode(vectors - self.centroids[assign])
+        for list_id in np.unique(assign):
+            members = assign == list_id
+            self.list_ids[list_id].append(ids[members])
+            self.list_codes[list_id].append(codes[members])
+        self.size += len(ids)
+
+    def _list(self, list_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Appended batches are merged on first read
+        ids, codes = self.list_ids[list_id], self.list_codes[list_id]
+        if len(ids) > 1:
+            ids[:] = [np.concatenate(ids)]
+            codes[:] = [np.concatenate(codes)]
+        if not ids:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.m), dtype=np.uint8)
+        return ids[0], codes[0]
+
+    def search(self, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        if not self.size:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+        coarse = self.centroids @ query
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        probes = np.argpartition(-coarse, nprobe - 1)[:nprobe]
+        # <q, c + r> = <q, c> + sum_j <q_j, codebook_j[code_j]>
+        tables = np.einsum("mkd,md->mk", self.codebooks, query.reshape(self.m, self.dsub))
+        subspaces = np.arange(self.m)
+
+        all_ids, all_scores = [], []
+        for list_id in probes:
+            ids, codes = self._list(list_id)
+            if len(ids):
+                all_ids.append(ids)
+                all_scores.append(coarse[list_id] + tables[subspaces, codes].sum(axis=1))
+        if not all_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        ids, scores = np.concatenate(all_ids), np.concatenate(all_scores)
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return ids[top], scores[top].astype(np.float32)
+
+    def save(self, path: str) -> None:
+        lists = [self._list(list_id) for list_id in range(self.nlist)]
+        _savez(path, {
+            "kind": np.array(self.kind),
+            "params": np.array([self.dim, self.nlist, self.m, self.nprobe], dtype=np.int64),
+            "centroids": self.centroids,
+            "codebooks": self.codebooks,
+            "offsets": np.cumsum([0] + [len(ids) for ids, _ in lists]),
+            "ids": np.concatenate([ids for ids, _ in lists]),
+            "codes": np.concatenate([codes for _, codes in lists]),
+        })
+
+    @classmethod
+    def from_arrays(cls, data) -> "IVFPQIndex":
+        dim, nlist, m, nprobe = data["params"].tolist()
+        index = cls(dim, nlist=nlist, m=m, nprobe=nprobe)
+        index.centroids, index.codebooks = data["centroids"], data["codebooks"]
+        offsets, ids, codes = data["offsets"], data["ids"], data["codes"]
+        for list_id in range(nlist):
+            start, end = offsets[list_id], offsets[list_id + 1]
+            if end > start:
+                index.list_ids[list_id] = [ids[start:end]]
+                index.list_codes[list_id] = [codes[start:end]]
+        index.size = len(ids)
+        return index
+
+
+def _savez(path: str, arrays: dict) -> None:
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_ann_index(path: str):
+    with np.load(path) as data:
+        kind = str(data["kind"])
+        if kind == HNSWIndex.kind:
+            return HNSWIndex.from_arrays(data)
+        if kind == IVFPQIndex.kind:
+            return IVFPQIndex.from_arrays(data)
+    raise ValueError(f"Unknown ANN index type in {path}: {kind}")
+
+
+def resolve_pq_m(dim: int, m: int) -> int:
+    """The largest PQ sub-quantizer count <= m that divides dim, warning when it isn't m itself."""
+    if m < 1:
+        raise ValueError(f"pq_m must be positive, got {m}")
+    resolved = next(candidate for candidate in range(min(m, dim), 0, -1) if dim % candidate == 0)
+    if resolved != m:
+        logger.warning(f"pq_m={m} does not divide the indexed dimension {dim}, using pq_m={resolved}")
+    return resolved
+
+
+def build_ann_index(kind: str, dim: int, config, pq_m: Optional[int] = None):
+    if kind == "hnsw":
+        return HNSWIndex(dim, m=getattr(config, 'hnsw_m', 16),
+                         ef_construction=getattr(config, 'hnsw_ef_construction', 100),
+                         ef_search=getattr(config, 'ann_ef_search', 64))
+    if kind == "ivfpq":
+        if pq_m is None:
+            pq_m = resolve_pq_m(dim, getattr(config, 'pq_m', 16))
+        return IVFPQIndex(dim, nlist=getattr(config, 'ivf_nlist', 256), m=pq_m,
+                          nprobe=getattr(config, 'ann_nprobe', 8))
+    raise ValueError(f"Unknown ANN index type: {kind}")
@@ -1,7 +1,22 @@
 from abc import ABC, abstractmethod 
-from typing import List 
+from typing import Any, Dict, List 
 import numpy as np 
 
+
+def document_fields(content: str, meta: Dict[str, Any], index: int = 0) -> Dict[str, Any]:
+    """Stored fields of one chunk, shared by every backend so hits look the same."""
+    return {
+        "text": content,
+        "url": meta.get('url', ''),
+        "title": meta.get('title', ''),
+        "chunk_id": meta.get('chunk_id', f'doc_{index}'),
+        "content_hash": meta.get('content_hash'),
+        "source": meta.get('source', ''),
+        "sections_in_chunk": meta.get('sections_in_chunk', 1),
+        "depth": meta.get('depth', 0),
+        "created_at": meta.get('created_at', '2025-01-01T00:00:00Z')
+    }
+
 class BaseVectorStore(ABC)  :
     
     @abstractmethod 
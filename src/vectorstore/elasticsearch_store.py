@@ -1,142 +1,432 @@
 # 
 
-from elasticsearch import Elasticsearch
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from contextlib import contextmanager
 import logging
-from sentence_transformers import SentenceTransformer
-from langchain_elasticsearch.vectorstores import ElasticsearchStore
-#from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.schema import Document
-from elasticsearch.helpers import bulk
+import time
+import numpy as np
+from elasticsearch.helpers import parallel_bulk, scan, streaming_bulk
+from ..embeddings.embeddings import build_embeddings
+from .es_client import BULK_RETRY_STATUSES, get_es_client
+from .basevectorstore import document_fields
+from ..embeddings.dimension_reduction import DimensionReducer, ReducedEmbeddings
 logger = logging.getLogger(__name__)
 
+# Off-heap bytes per vector that HNSW search wants resident in page cache, per index type
+# (Elasticsearch tuning guide); the graph adds 4 * m bytes per vector on top.
+VECTOR_BYTES = {
+    "hnsw": lambda dims: 4 * dims,
+    "int8_hnsw": lambda dims: dims + 4,
+    "int4_hnsw": lambda dims: dims / 2 + 4,
+    "bbq_hnsw": lambda dims: dims / 8 + 14,
+}
+
+
+def estimate_vector_memory(num_vectors: int, dims: int, index_type: str = "hnsw", m: int = 16) -> int:
+    per_vector = VECTOR_BYTES.get(index_type or "hnsw", VECTOR_BYTES["hnsw"])(dims) + 4 * m
+    return int(num_vectors * per_vector)
+
+
+def vector_index_options(index_type: Optional[str], dims: int, m: int = 16, ef_construction: int = 100) -> Optional[Dict[str, Any]]:
+    """`index_options` for the dense_vector field, or None to keep the cluster default."""
+    if not index_type:
+        return None
+    if index_type not in VECTOR_BYTES:
+        raise ValueError(f"Unsupported vector index type: {index_type}")
+    if index_type == "int4_hnsw" and dims % 2:
+        logger.warning(f"int4_hnsw needs an even dimension count, using int8_hnsw for {dims} dims")
+        index_type = "int8_hnsw"
+    if index_type == "bbq_hnsw" and dims < 64:
+        logger.warning(f"bbq_hnsw needs at least 64 dims, using int8_hnsw for {dims} dims")
+        index_type = "int8_hnsw"
+    return {"type": index_type, "m": m, "ef_construction": ef_construction}
+
 class ElasticSearchStore:
     def __init__(self, config):
         self.config = config
         self.es_url = config.es_url
+        # config.index_name is an alias over versioned indices; writes go to index_name,
+        # which is the alias itself except while a rebuild fills a new version
+        self.alias = config.index_name
         self.index_name = config.index_name 
         self.embed_model = config.embedding_model_name
         
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=self.embed_model,
-            model_kwargs={'device': 'cuda'}, 
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        self.embeddings = build_embeddings(config)
+        self.reducer = DimensionReducer.from_config(config)
+        self.index_embeddings = ReducedEmbeddings(self.embeddings, self.reducer) if self.reducer.enabled else self.embeddings
 
         sample_embedding = self.embeddings.embed_query("test")
-        self.embedding_dim = len(sample_embedding)
-        self.es = Elasticsearch([self.es_url])
+        self.embedding_dim = self.reducer.output_dim(len(sample_embedding))
+        self.vector_index_type = getattr(config, 'vector_index_type', None)
+        self.hnsw_m = getattr(config, 'hnsw_m', 16)
+        self.hnsw_ef_construction = getattr(config, 'hnsw_ef_construction', 100)
+        self.lean_mapping = getattr(config, 'lean_index_mapping', True)
+        self._indexing_stats = {'indexed': 0, 'failed': 0, 'seconds': 0.0, 'embedding_seconds': 0.0}
+        self.es = get_es_client(config)
         self._create_index_if_not_exists()
         
         logger.info(f" ElasticsearchStore initialized: {self.es_url}")
     
     def _create_index_if_not_exists(self):
         try:
-            if not self.es.indices.exists(index=self.index_name):
-                logger.info(f" Creating index: {self.index_name}")
-                mapping = {
-                    "mappings": {
-                        "properties": {
-                            "text": {"type": "text"},
-                            "vector": {   
-                                "type": "dense_vector",
-                                "dims": self.embedding_dim,
-                                "index": True,
-                                "similarity": "cosine"
-                            },
-                            "metadata": {"type": "object", "enabled": False},
-                            "content": {"type": "text"},
-                            "url": {"type": "keyword"},
-                            "title": {"type": "text"},
-                            "chunk_id": {"type": "keyword"},
-                            "source": {"type": "keyword"},
-                            "sections_in_chunk": {"type": "integer"},
-                            "depth": {"type": "integer"},
-                        }
-                    },
-                    "settings": {
-                        "number_of_shards": 1,
-                        "number_of_replicas": 0,
-                    }
-                }
-                
-                self.es.indices.create(index=self.index_name, body=mapping)
-                logger.info(f"Index '{self.index_name}' created successfully")
+            if self.es.indices.exists_alias(name=self.alias):
+                logger.info(f"Alias '{self.alias}' -> {self.alias_targets()}")
+            elif self.es.indices.exists(index=self.alias):
+                logger.info(f"Index '{self.alias}' already exists (not yet behind an alias; a rebuild migrates it)")
             else:
-                logger.info(f"Index '{self.index_name}' already exists")
+                index = self._create_version_index()
+                self.es.indices.put_alias(index=index, name=self.alias)
+                logger.info(f"Alias '{self.alias}' created on {index}")
                 
         except Exception as e:
             logger.error(f"Error creating index: {str(e)}")
+
+    def _create_version_index(self) -> str:
+        index = f"{self.alias}_v{time.strftime('%Y%m%d%H%M%S')}"
+        logger.info(f" Creating index: {index}")
+        self.es.indices.create(index=index, body=self._index_body())
+        logger.info(f"Index '{index}' created successfully")
+        return index
+
+    def alias_targets(self) -> List[str]:
+        try:
+            if not self.es.indices.exists_alias(name=self.alias):
+                return []
+            return sorted(self.es.indices.get_alias(name=self.alias))
+        except Exception as e:
+            logger.error(f"Error resolving alias {self.alias}: {str(e)}")
+            return []
+
+    def _version_indices(self) -> List[str]:
+        # Timestamped names sort chronologically
+        return sorted(self.es.indices.get(index=f"{self.alias}_v*", expand_wildcards="open"))
+
+    def begin_rebuild(self, resume: bool = False) -> str:
+        """Point writes at a new versioned index; the alias keeps serving the old one.
+
+        With resume=True the newest version that never went live is reused, so an
+        interrupted rebuild continues where it stopped.
+        """
+        index = None
+        if resume:
+            live = set(self.alias_targets())
+            pending = [name for name in self._version_indices() if name not in live]
+            index = pending[-1] if pending else None
+        if index is None:
+            index = self._create_version_index()
+        self.index_name = index
+        logger.info(f"Rebuilding into {index}; '{self.alias}' still serves {self.alias_targets() or self.alias}")
+        return index
+
+    def validate_index(self, index: str) -> Tuple[bool, str]:
+        """Check document count against the live index and that a sample query returns hits."""
+        self.es.indices.refresh(index=index)
+        count = self.es.count(index=index)["count"]
+        live_count = 0
+        if self.es.indices.exists(index=self.alias):
+            live_count = self.es.count(index=self.alias)["count"]
+        min_ratio = getattr(self.config, 'rebuild_min_doc_ratio', 0.9)
+        if count == 0 or count < live_count * min_ratio:
+            return False, f"{index} has {count} documents, live index has {live_count} (min ratio {min_ratio})"
+
+        query = getattr(self.config, 'rebuild_validation_query', "What is Salesforce Data Cloud?")
+        vector = np.asarray(self.index_embeddings.embed_texts([query]))[0].tolist()
+        hits = self.es.search(index=index, body={
+            "knn": {"field": "vector", "query_vector": vector, "k": 3, "num_candidates": 50},
+            "size": 3, "_source": ["title"]
+        })["hits"]["hits"]
+        if not hits:
+            return False, f"Sample query returned no hits from {index}"
+        return True, f"{index}: {count} documents (live {live_count}), sample query top hit '{hits[0]['_source'].get('title')}'"
+
+    def finish_rebuild(self) -> Dict[str, Any]:
+        """Validate the rebuilt index, swap the alias onto it atomically and garbage-collect old versions."""
+        index = self.index_name
+        self.index_name = self.alias
+        ok, message = self.validate_index(index)
+        if not ok:
+            logger.error(f"Rebuild validation failed, alias unchanged: {message}")
+            return {'index': index, 'swapped': False, 'message': message}
+        logger.info(f"Rebuild validated: {message}")
+
+        actions = [{"add": {"index": index, "alias": self.alias}}]
+        previous = self.alias_targets()
+        actions += [{"remove": {"index": old, "alias": self.alias}} for old in previous if old != index]
+        if not previous and self.es.indices.exists(index=self.alias):
+            # A concrete index still holds the alias name; it is dropped in the same atomic call
+            logger.warning(f"Replacing concrete index '{self.alias}' with an alias to {index}")
+            actions.append({"remove_index": {"index": self.alias}})
+        self.es.indices.update_aliases(body={"actions": actions})
+        logger.info(f"Alias '{self.alias}' now points to {index} (was {previous or self.alias})")
+
+        return {'index': index, 'swapped': True, 'message': message, 'deleted_versions': self.gc_versions()}
+
+    def abort_rebuild(self) -> None:
+        """Send writes back to the alias; the partial version is kept for --rebuild --resume."""
+        self.index_name = self.alias
+
+    def gc_versions(self) -> List[str]:
+        """Delete old versions beyond index_versions_to_keep; live and newer indices are never deleted."""
+        keep = max(1, getattr(self.config, 'index_versions_to_keep', 2))
+        try:
+            live = set(self.alias_targets())
+            versions = self._version_indices()
+            newest_live = max((versions.index(name) for name in live if name in versions), default=len(versions) - 1)
+            retired = [name for name in versions[:newest_live + 1] if name not in live]
+            to_delete = retired[:max(0, len(retired) - (keep - 1))]
+            for index in to_delete:
+                self.es.indices.delete(index=index)
+                logger.info(f"Deleted old index version {index}")
+            return to_delete
+        except Exception as e:
+            logger.error(f"Error deleting old index versions: {str(e)}")
+            return []
     
-    def add_documents(self, documents: List[str], metadata: List[Dict[str, Any]]) -> int:
+    def _index_body(self) -> Dict[str, Any]:
+        vector_field = {
+            "type": "dense_vector",
+            "dims": self.embedding_dim,
+            "index": True,
+            "similarity": "cosine"
+        }
+        index_options = vector_index_options(self.vector_index_type, self.embedding_dim,
+                                             self.hnsw_m, self.hnsw_ef_construction)
+        if index_options:
+            vector_field["index_options"] = index_options
+
+        properties = {
+            "text": {"type": "text"},
+            "vector": vector_field,
+            "url": {"type": "keyword"},
+            "title": {"type": "text"},
+            "chunk_id": {"type": "keyword"},
+            "content_hash": {"type": "keyword", "index": False},
+            "source": {"type": "keyword"},
+            "sections_in_chunk": {"type": "integer"},
+            "depth": {"type": "integer"},
+        }
+        mappings = {"properties": properties}
+        if self.lean_mapping:
+            # The text is indexed once, metadata fields are flat, and vectors are kept out of
+            # _source: the HNSW structures already hold them and search never returns them.
+            mappings["dynamic"] = False
+            mappings["_source"] = {"excludes": ["vector"]}
+        else:
+            properties["metadata"] = {"type": "object", "enabled": False}
+            properties["content"] = {"type": "text"}
+
+        return {
+            "mappings": mappings,
+            "settings": {
+                "number_of_shards": 1,
+                "number_of_replicas": 0,
+            }
+        }
+
+    def needs_fit(self) -> bool:
+        return not self.reducer.fitted
+
+    def fit_dimension_reduction(self, documents: List[str]) -> None:
+        sample_size = getattr(self.config, 'dimension_reduction_fit_samples', 2048)
+        sample = documents
+        if len(documents) > sample_size:
+            step = len(documents) / sample_size
+            sample = [documents[int(i * step)] for i in range(sample_size)]
+        embed_fn = getattr(self.embeddings, 'embed_texts', None) or self.embeddings.embed_documents
+        self.reducer.fit(embed_fn(sample))
+
+    def index_stats(self) -> Dict[str, Any]:
+        """Document count, on-disk size and estimated vector RAM for the index and each index type."""
         try:
-            logger.info(f"Adding {len(documents)} documents to index")
-            langchain_docs = []
-            for content, meta in zip(documents, metadata):
-                doc = Document(
-                    page_content=content,
-                    metadata=meta
-                )
-                langchain_docs.append(doc)
-            if len(langchain_docs) > 0:
+            stats = self.es.indices.stats(index=self.index_name, metric=["docs", "store"])
+            totals = stats["_all"]["primaries"]
+            num_docs = totals["docs"]["count"]
+            return {
+                "documents": num_docs,
+                "store_size_bytes": totals["store"]["size_in_bytes"],
+                "dims": self.embedding_dim,
+                "vector_index_type": self.vector_index_type or "cluster default",
+                "estimated_vector_memory_bytes": {
+                    index_type: estimate_vector_memory(num_docs, self.embedding_dim, index_type, self.hnsw_m)
+                    for index_type in VECTOR_BYTES
+                }
+            }
+        except Exception as e:
+            logger.error(f"Error reading index stats: {str(e)}")
+            return {}
+
+    def _serving(self) -> bool:
+        """True when writes go to an index that is answering queries (the alias or one of its targets)."""
+        return self.index_name == self.alias or self.index_name in self.alias_targets()
+
+    @contextmanager
+    def bulk_loading(self):
+        """Disable refresh and replicas for the duration of a large load, then restore them.
+
+        Only applied to a version index that is not serving yet (a rebuild), unless
+        bulk_optimize_live_index is set: on the live index it would hide new documents and
+        drop replicas for the whole crawl, and a killed process would never restore them.
+        """
+        if not getattr(self.config, 'bulk_optimize_settings', True):
+            yield
+            return
+        if self._serving() and not getattr(self.config, 'bulk_optimize_live_index', False):
+            logger.info(f"{self.index_name} is serving queries, keeping its refresh and replica settings")
+            yield
+            return
+
+        previous = None
+        try:
+            settings = self.es.indices.get_settings(index=self.index_name, flat_settings=True)
+            current = next(iter(settings.values()))["settings"]
+            refresh_interval = current.get("index.refresh_interval")
+            if refresh_interval == "-1":
+                # Left behind by an interrupted load (e.g. --rebuild --resume); restore the default
+                refresh_interval = None
+            previous = {
+                "index.refresh_interval": refresh_interval,  # None resets to the default
+                "index.number_of_replicas": current.get("index.number_of_replicas", "0"),
+            }
+            self.es.indices.put_settings(index=self.index_name, body={
+                "index.refresh_interval": "-1",
+                "index.number_of_replicas": 0,
+            })
+            logger.info(f"Disabled refresh and replicas on {self.index_name} for bulk load")
+        except Exception as e:
+            logger.warning(f"Could not relax index settings for bulk load: {str(e)}")
+
+        try:
+            yield
+        finally:
+            if previous is not None:
                 try:
-                    db = ElasticsearchStore.from_documents(
-                        documents=langchain_docs, 
-                        embedding=self.embeddings,  #Function to convert embeddings of documents  
-                        es_url=self.es_url, 
-                        index_name=self.index_name 
-                    )
-                    
-                    logger.info(f"Successfully indexed {len(documents)} documents")
-                    return 1
-                    
+                    self.es.indices.put_settings(index=self.index_name, body=previous)
+                    self.es.indices.refresh(index=self.index_name)
+                    logger.info(f"Restored index settings on {self.index_name}: {previous}")
                 except Exception as e:
-                    logger.error(f"Error with from_documents: {str(e)}")
-                    # Fallback to manual insertion
-                    return self._manual_insert(documents, metadata)
-            else:
+                    logger.error(f"Failed to restore index settings on {self.index_name}: {str(e)}")
+
+    def indexing_stats(self) -> Dict[str, Any]:
+        stats = dict(self._indexing_stats)
+        stats['docs_per_second'] = stats['indexed'] / stats['seconds'] if stats['seconds'] else 0.0
+        return stats
+
+    def add_documents(self, documents: List[str], metadata: List[Dict[str, Any]]) -> int:
+        try:
+            logger.info(f"Adding {len(documents)} documents to index")
+            if not documents:
                 logger.warning("No documents to add")
                 return 0
+            if self.needs_fit():
+                self.fit_dimension_reduction(documents)
+            return self._manual_insert(documents, metadata)
                 
         except Exception as e:
             logger.error(f" Error in add_documents: {str(e)}")
             return 0
+
+    def existing_hashes(self, chunk_ids: List[str]) -> Dict[str, Optional[str]]:
+        """content_hash of each chunk_id already in the index; missing ids are left out."""
+        existing = {}
+        try:
+            for start in range(0, len(chunk_ids), 1000):
+                response = self.es.mget(index=self.index_name, body={"ids": chunk_ids[start:start + 1000]},
+                                        _source=["content_hash"])
+                for doc in response["docs"]:
+                    if doc.get("found"):
+                        existing[doc["_id"]] = doc.get("_source", {}).get("content_hash")
+        except Exception as e:
+            logger.error(f"Error looking up existing chunks: {str(e)}")
+        return existing
+
+    def delete_stale_chunks(self, current_chunks: Dict[str, set]) -> int:
+        """Delete indexed chunks of the given URLs whose chunk_id is not in that URL's current set."""
+        urls = list(current_chunks)
+        stale = []
+        try:
+            for start in range(0, len(urls), 1000):
+                query = {"query": {"terms": {"url": urls[start:start + 1000]}}, "_source": ["url"]}
+                for hit in scan(self.es, index=self.index_name, query=query):
+                    url = hit["_source"].get("url")
+                    if hit["_id"] not in current_chunks.get(url, ()):
+                        stale.append(hit["_id"])
+
+            if not stale:
+                return 0
+            actions = ({"_op_type": "delete", "_index": self.index_name, "_id": doc_id} for doc_id in stale)
+            deleted, failed = self._bulk(actions)
+            logger.info(f"Deleted {deleted} stale chunks ({len(failed)} failed)")
+            return deleted
+        except Exception as e:
+            logger.error(f"Error deleting stale chunks: {str(e)}")
+            return 0
+
+    def _bulk_actions(self, documents: List[str], metadata: List[Dict[str, Any]], embeddings):
+        for i, (content, meta, embedding) in enumerate(zip(documents, metadata, embeddings)):
+            doc_data = document_fields(content, meta, i)
+            doc_data["vector"] = embedding.tolist()
+            doc_id = doc_data["chunk_id"]
+            if not self.lean_mapping:
+                doc_data["content"] = content
+                doc_data["metadata"] = meta
+            yield {"_index": self.index_name, "_id": doc_id, "_source": doc_data}
+
+    def _bulk(self, actions) -> Tuple[int, List[Dict[str, Any]]]:
+        chunk_size = getattr(self.config, 'bulk_chunk_size', 500)
+        max_retries = getattr(self.config, 'bulk_max_retries', 5)
+        threads = getattr(self.config, 'bulk_threads', 1)
+        # Bulk requests run far longer than searches; same pooled connections, longer timeout.
+        # 429s are retried with backoff by streaming_bulk below, not by the transport as well.
+        client = self.es.options(request_timeout=getattr(self.config, 'bulk_request_timeout', 120),
+                                 retry_on_status=BULK_RETRY_STATUSES)
+        indexed, failed = 0, []
+
+        if threads > 1:
+            # parallel_bulk does not retry rejections itself; 429s are collected and retried below
+            actions = list(actions)
+            rejected = []
+            for i, (ok, item) in enumerate(parallel_bulk(client, actions, thread_count=threads,
+                                                         chunk_size=chunk_size, raise_on_error=False,
+                                                         raise_on_exception=False)):
+                if ok:
+                    indexed += 1
+                elif next(iter(item.values())).get('status') == 429:
+                    rejected.append(actions[i])
+                else:
+                    failed.append(item)
+            actions = rejected
+            if rejected:
+                logger.warning(f"Retrying {len(rejected)} documents rejected with 429")
+
+        for ok, item in streaming_bulk(client, actions, chunk_size=chunk_size, max_retries=max_retries,
+                                       initial_backoff=getattr(self.config, 'bulk_initial_backoff', 2),
+                                       max_backoff=600, raise_on_error=False, raise_on_exception=False):
+            if ok:
+                indexed += 1
+            else:
+                failed.append(item)
+        return indexed, failed
     
     def _manual_insert(self, documents: List[str], metadata: List[Dict[str, Any]]) -> int:
         try:
-            logger.info("Using manual insertion fallback")
-            embeddings = self.embeddings.encode(documents)
-            bulk_data = []
-            for i, (content, meta, embedding) in enumerate(zip(documents, metadata, embeddings)):
-                doc_id = meta.get('chunk_id', f'doc_{i}')
-                bulk_data.append({
-                    "index": {
-                        "_index": self.index_name,
-                        "_id": doc_id
-                    }
-                })
-            
-                doc_data = {
-                    "text": content,  
-                    "content": content,  
-                    "vector": embedding.tolist(),
-                    "metadata": meta,
-                    "url": meta.get('url', ''),
-                    "title": meta.get('title', ''),
-                    "chunk_id": meta.get('chunk_id', f'doc_{i}'),
-                    "source": meta.get('source', ''),
-                    "sections_in_chunk": meta.get('sections_in_chunk', 1),
-                    "depth": meta.get('depth', 0),
-                    "created_at": meta.get('created_at', '2025-01-01T00:00:00Z')
-                }
-                bulk_data.append(doc_data)
-            
-            success, failed = bulk(self.es, bulk_data, refresh=True)
-            
-            logger.info(f"Manual insertion: {success} successful, {len(failed)} failed")
-            return 1 if success > 0 else 0
+            start = time.perf_counter()
+            embeddings = self.index_embeddings.embed_texts(documents)
+            embedded = time.perf_counter()
+
+            indexed, failed = self._bulk(self._bulk_actions(documents, metadata, embeddings))
+            finished = time.perf_counter()
+
+            self._indexing_stats['indexed'] += indexed
+            self._indexing_stats['failed'] += len(failed)
+            self._indexing_stats['embedding_seconds'] += embedded - start
+            self._indexing_stats['seconds'] += finished - start
+            logger.info(f"Bulk insertion: {indexed} successful, {len(failed)} failed, "
+                        f"{indexed / max(finished - start, 1e-9):.1f} docs/s "
+                        f"(embedding {embedded - start:.2f}s, indexing {finished - embedded:.2f}s)")
+            for item in failed[:5]:
+                logger.error(f"Bulk failure: {item}")
+            return 1 if indexed > 0 and not failed else 0
             
         except Exception as e:
-            logger.error(f"Manual insertion failed: {str(e)}")
+            logger.error(f"Bulk insertion failed: {str(e)}")
             return 0
@@ -0,0 +1,73 @@
+import logging
+import threading
+from typing import Any, Dict
+
+from elasticsearch import Elasticsearch
+
+logger = logging.getLogger(__name__)
+
+_clients: Dict[tuple, Any] = {}
+_lock = threading.Lock()
+
+# Statuses the transport retries. Bulk loading overrides this without 429, which it retries itself.
+RETRY_STATUSES = (429, 502, 503, 504)
+BULK_RETRY_STATUSES = (502, 503, 504)
+
+
+def _client_kwargs(config) -> Dict[str, Any]:
+    kwargs = {
+        "connections_per_node": getattr(config, 'es_pool_maxsize', 32),
+        "request_timeout": getattr(config, 'es_request_timeout', 10),
+        "max_retries": getattr(config, 'es_max_retries', 3),
+        "retry_on_timeout": getattr(config, 'es_retry_on_timeout', True),
+        "retry_on_status": RETRY_STATUSES,
+        "http_compress": getattr(config, 'es_http_compress', False),
+    }
+    if getattr(config, 'username', None):
+        kwargs["basic_auth"] = (config.username, config.password)
+    return kwargs
+
+
+def _client_key(kind: str, config) -> tuple:
+    return (kind, config.es_url, getattr(config, 'username', None))
+
+
+def get_es_client(config) -> Elasticsearch:
+    """Process-wide sync client for `config.es_url`; its connection pool is shared by every caller."""
+    key = _client_key("sync", config)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = Elasticsearch([config.es_url], **_client_kwargs(config))
+            _clients[key] = client
+            logger.info(f"Created Elasticsearch client for {config.es_url}")
+        return client
+
+
+def get_async_es_client(config):
+    """AsyncElasticsearch counterpart of get_es_client, with the same pool and retry policy."""
+    from elasticsearch import AsyncElasticsearch
+
+    key = _client_key("async", config)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = AsyncElasticsearch([config.es_url], **_client_kwargs(config))
+            _clients[key] = client
+            logger.info(f"Created async Elasticsearch client for {config.es_url}")
+        return client
+
+
+async def close_es_clients() -> None:
+    """Close every shared client, sync and async; called from the app's shutdown hook."""
+    with _lock:
+        clients = list(_clients.items())
+        _clients.clear()
+    for (kind, _, _), client in clients:
+        try:
+            if kind == "async":
+                await client.close()
+            else:
+                client.close()
+        except Exception as e:
+            logger.warning(f"Error closing Elasticsearch client: {e}")
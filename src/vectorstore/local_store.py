@@ -0,0 +1,582 @@
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .basevectorstore import BaseVectorStore, document_fields
+from .ann_index import build_ann_index, load_ann_index, resolve_pq_m
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """In-memory inverted index scored with Okapi BM25 (Elasticsearch's defaults k1=1.2, b=0.75).
+
+    Postings are numpy arrays, so a query costs one vectorized scatter-add per query term.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        self.num_docs = 0
+        self.avg_length = 0.0
+
+    def build(self, texts: List[Optional[str]]) -> None:
+        """Index `texts` by row; None marks an empty (deleted) row."""
+        postings = defaultdict(lambda: ([], []))
+        doc_lengths = np.zeros(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            if text is None:
+                continue
+            counts = Counter(tokenize(text))
+            doc_lengths[row] = sum(counts.values())
+            for term, tf in counts.items():
+                rows, tfs = postings[term]
+                rows.append(row)
+                tfs.append(tf)
+
+        self.postings = {
+            term: (np.asarray(rows, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (rows, tfs) in postings.items()
+        }
+        self.doc_lengths = doc_lengths
+        self.num_docs = sum(1 for text in texts if text is not None)
+        self.avg_length = float(doc_lengths.sum() / self.num_docs) if self.num_docs else 0.0
+
+    def scores(self, query: str) -> Optional[np.ndarray]:
+        if not self.num_docs or not self.avg_length:
+            return None
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float32)
+        matched = False
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / self.avg_length)
+        for term, query_tf in Counter(tokenize(query)).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            rows, tfs = posting
+            idf = math.log(1 + (self.num_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            np.add.at(scores, rows, query_tf * idf * tfs * (self.k1 + 1) / (tfs + length_norm[rows]))
+            matched = True
+        return scores if matched else None
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row indices of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class LocalVectorStore(BaseVectorStore):
+    """Embedded vector store: no server, everything in one directory.
+
+    Layout of `root` (config.local_store_path):
+        CURRENT              name of the live version directory (swapped atomically on rebuild)
+        v<timestamp>/
+            manifest.json    vector dimension and dtype
+            vectors.bin      row-major matrix of L2-normalized vectors, memory-mapped
+            docs.jsonl       append-only log of put/delete records holding the stored fields
+            ann.npz          optional HNSW / IVF-PQ index over the rows (config.ann_index)
+
+    Searches run in-process: cosine top-k is a matrix-vector product over the memmap and
+    lexical search uses an in-memory BM25 index rebuilt from the stored texts. Readers
+    (read_only=True) pick up new versions and appended records with `maybe_reload`.
+    """
+
+    def __init__(self, config, read_only: bool = False, root: Optional[str] = None):
+        self.config = config
+        self.root = root or getattr(config, 'local_store_path', '.cache/local_index')
+        self.read_only = read_only
+        self.dtype = np.dtype(getattr(config, 'local_store_dtype', 'float32'))
+        self.alias = "CURRENT"
+        self.ann_kind = getattr(config, 'ann_index', None)
+        self.ann_min_rows = getattr(config, 'ann_min_rows', 20000)
+        self.ann_rerank_factor = getattr(config, 'ann_rerank_factor', 10)
+
+        self._lock = threading.RLock()
+        self._indexing_stats = {'indexed': 0, 'failed': 0, 'seconds': 0.0, 'embedding_seconds': 0.0}
+        self.embeddings = None
+        self.index_embeddings = None
+        self.reducer = None
+        self.embedding_dim = None
+        self.pq_m = None
+
+        if not read_only:
+            from ..embeddings.embeddings import build_embeddings
+            from ..embeddings.dimension_reduction import DimensionReducer, ReducedEmbeddings
+            self.embeddings = build_embeddings(config)
+            self.reducer = DimensionReducer.from_config(config)
+            self.index_embeddings = ReducedEmbeddings(self.embeddings, self.reducer) if self.reducer.enabled else self.embeddings
+            self.embedding_dim = self.reducer.output_dim(len(self.embeddings.embed_query("test")))
+            if self.ann_kind == "ivfpq":
+                # Checked against the indexed (possibly reduced) dimension now, not at the first ANN build
+                self.pq_m = resolve_pq_m(self.embedding_dim, getattr(config, 'pq_m', 16))
+
+        self._create_index_if_not_exists()
+        logger.info(f"LocalVectorStore initialized: {self.root}/{self.index_name} ({self.count()} documents)")
+
+    # ---- versions -------------------------------------------------------------------------
+
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, "CURRENT"), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _set_current(self, version: str) -> None:
+        tmp_path = os.path.join(self.root, "CURRENT.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, "CURRENT"))
+
+    def _version_dirs(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if name.startswith("v") and os.path.isdir(os.path.join(self.root, name)))
+
+    def _create_version(self) -> str:
+        version = f"v{time.strftime('%Y%m%d%H%M%S')}"
+        suffix = 0
+        while os.path.exists(os.path.join(self.root, version if not suffix else f"{version}_{suffix}")):
+            suffix += 1
+        version = version if not suffix else f"{version}_{suffix}"
+        os.makedirs(os.path.join(self.root, version))
+        with open(os.path.join(self.root, version, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"dim": self.embedding_dim, "dtype": self.dtype.name}, f)
+        logger.info(f"Created local index version {version}")
+        return version
+
+    def _create_index_if_not_exists(self):
+        os.makedirs(self.root, exist_ok=True)
+        version = self._current_version()
+        if version is None and not self.read_only:
+            version = self._create_version()
+            self._set_current(version)
+        self._open(version)
+
+    # ---- loading --------------------------------------------------------------------------
+
+    def _open(self, version: Optional[str]) -> None:
+        with self._lock:
+            self.index_name = version
+            self._ids: Dict[str, int] = {}
+            self._sources: List[Optional[Dict[str, Any]]] = []
+            self._log_offset = 0
+            self._log_inode = None
+            self._live = None
+            self._vectors = None
+            self._bm25: Dict[str, BM25Index] = {}   # per text field, built on first use
+            self._bm25_dirty = True
+            self._ann = None
+            self._ann_rows = 0
+            self._ann_mtime = None
+            if version is None:
+                return
+
+            with open(os.path.join(self._version_path(), "manifest.json"), encoding="utf-8") as f:
+                manifest = json.load(f)
+            if self.read_only:
+                self.embedding_dim = manifest["dim"]
+            elif manifest["dim"] != self.embedding_dim:
+                raise ValueError(f"Local index {version} has {manifest['dim']} dims, embeddings produce {self.embedding_dim}")
+            self.dtype = np.dtype(manifest["dtype"])
+            self._replay_log()
+            self._map_vectors(len(self._sources))
+            self._load_ann()
+
+    def _version_path(self, version: Optional[str] = None) -> str:
+        return os.path.join(self.root, version or self.index_name)
+
+    def _replay_log(self) -> None:
+        path = os.path.join(self._version_path(), "docs.jsonl")
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            self._log_inode = os.fstat(f.fileno()).st_ino
+            f.seek(self._log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # record still being written
+                self._log_offset += len(line)
+                record = json.loads(line)
+                self._apply(record)
+        self._bm25_dirty = True
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        self._live = None
+        previous = self._ids.pop(record["id"], None)
+        if previous is not None:
+            self._sources[previous] = None
+        if record["op"] == "put":
+            row = record["row"]
+            while len(self._sources) <= row:
+                self._sources.append(None)
+            self._sources[row] = record["source"]
+            self._ids[record["id"]] = row
+
+    def _map_vectors(self, min_rows: int) -> None:
+        path = os.path.join(self._version_path(), "vectors.bin")
+        row_bytes = self.embedding_dim * self.dtype.itemsize
+        current_rows = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+        rows = current_rows
+        if not self.read_only and rows < max(min_rows, 1):
+            rows = max(1024, rows)
+            while rows < min_rows:
+                rows *= 2
+            with open(path, "ab") as f:
+                f.truncate(rows * row_bytes)
+        if self._vectors is not None and self._vectors.shape[0] == rows:
+            return
+        if self._vectors is not None and not self.read_only:
+            self._vectors.flush()
+        if rows == 0:
+            self._vectors = np.zeros((0, self.embedding_dim), dtype=self.dtype)
+            return
+        # Zero-copy: pages are faulted in from the file on demand and shared with other processes
+        self._vectors = np.memmap(path, dtype=self.dtype, mode="r" if self.read_only else "r+",
+                                  shape=(rows, self.embedding_dim))
+
+    def maybe_reload(self) -> None:
+        """Pick up a swapped version or records appended by a writer since the last call."""
+        version = self._current_version()
+        with self._lock:
+            if version != self.index_name:
+                logger.info(f"Local index switched to {version}")
+                self._open(version)
+                return
+            if version is None:
+                return
+            path = os.path.join(self._version_path(), "docs.jsonl")
+            if not os.path.exists(path):
+                return
+            stat = os.stat(path)
+            if self._log_inode is not None and stat.st_ino != self._log_inode:
+                # The writer compacted the version: files were replaced, start over
+                self._open(version)
+            elif stat.st_size > self._log_offset:
+                self._replay_log()
+                self._map_vectors(len(self._sources))
+            self._load_ann()
+
+    # ---- ANN index ------------------------------------------------------------------------
+
+    def _ann_path(self) -> str:
+        return os.path.join(self._version_path(), "ann.npz")
+
+    def _load_ann(self) -> None:
+        """(Re)load the saved ANN index if it changed on disk."""
+        path = self._ann_path()
+        if not self.ann_kind or not os.path.exists(path):
+            return
+        mtime = os.path.getmtime(path)
+        if mtime == self._ann_mtime:
+            return
+        ann = load_ann_index(path)
+        if ann.kind != self.ann_kind:
+            logger.warning(f"Saved ANN index is {ann.kind}, config asks for {self.ann_kind}; ignoring it")
+            return
+        self._ann, self._ann_mtime = ann, mtime
+        # Rows are appended in order, so the index covers a prefix of them
+        self._ann_rows = ann.max_id() + 1
+        logger.info(f"Loaded {ann.kind} index over {len(ann)} vectors")
+
+    def _update_ann(self) -> None:
+        """Index rows appended since the last update; the first build waits for ann_min_rows rows."""
+        if not self.ann_kind:
+            return
+        num_rows = len(self._sources)
+        if self._ann is None:
+            if len(self._ids) < self.ann_min_rows:
+                return
+            self._ann = build_ann_index(self.ann_kind, self.embedding_dim, self.config, pq_m=self.pq_m)
+            self._ann_rows = 0
+            if hasattr(self._ann, 'train'):
+                live_rows = np.fromiter(self._ids.values(), dtype=np.int64, count=len(self._ids))
+                self._ann.train(np.asarray(self._vectors[np.sort(live_rows)], dtype=np.float32))
+        if num_rows > self._ann_rows:
+            start = time.perf_counter()
+            rows = np.arange(self._ann_rows, num_rows)
+            # Freed rows are skipped; rows updated later are filtered out at query time
+            rows = rows[self._live_mask(num_rows)[rows]]
+            if len(rows):
+                self._ann.add(rows, np.asarray(self._vectors[rows], dtype=np.float32))
+            self._ann_rows = num_rows
+            logger.info(f"Added {len(rows)} vectors to the {self.ann_kind} index in {time.perf_counter() - start:.1f}s")
+
+    def save_ann(self) -> None:
+        with self._lock:
+            self._update_ann()
+            if self._ann is not None:
+                self._ann.save(self._ann_path())
+                self._ann_mtime = os.path.getmtime(self._ann_path())
+
+    # ---- writing --------------------------------------------------------------------------
+
+    def _append_records(self, records: List[Dict[str, Any]]) -> None:
+        with open(os.path.join(self._version_path(), "docs.jsonl"), "ab") as f:
+            for record in records:
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                self._log_offset += len(line)
+                self._apply(record)
+        self._bm25_dirty = True
+
+    def needs_fit(self) -> bool:
+        return self.reducer is not None and not self.reducer.fitted
+
+    def fit_dimension_reduction(self, documents: List[str]) -> None:
+        sample_size = getattr(self.config, 'dimension_reduction_fit_samples', 2048)
+        sample = documents
+        if len(documents) > sample_size:
+            step = len(documents) / sample_size
+            sample = [documents[int(i * step)] for i in range(sample_size)]
+        embed_fn = getattr(self.embeddings, 'embed_texts', None) or self.embeddings.embed_documents
+        self.reducer.fit(embed_fn(sample))
+
+    def add_documents(self, documents: List[str], metadata: List[Dict[str, Any]]) -> int:
+        try:
+            logger.info(f"Adding {len(documents)} documents to local index")
+            if not documents:
+                logger.warning("No documents to add")
+                return 0
+            if self.needs_fit():
+                self.fit_dimension_reduction(documents)
+            return self._manual_insert(documents, metadata)
+        except Exception as e:
+            logger.error(f"Error in add_documents: {str(e)}")
+            return 0
+
+    def _manual_insert(self, documents: List[str], metadata: List[Dict[str, Any]]) -> int:
+        try:
+            start = time.perf_counter()
+            vectors = np.asarray(self.index_embeddings.embed_texts(documents), dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            embedded = time.perf_counter()
+
+            with self._lock:
+                # Rows are append-only; an updated chunk gets a new row and its old one is freed
+                first_row = len(self._sources)
+                end_row = first_row + len(documents)
+                self._map_vectors(end_row)
+                self._vectors[first_row:end_row] = vectors.astype(self.dtype)
+                self._vectors.flush()
+                # Records are only logged once their vectors are on disk
+                records = []
+                for i, (content, meta) in enumerate(zip(documents, metadata)):
+                    source = document_fields(content, meta, i)
+                    records.append({"op": "put", "id": source["chunk_id"], "row": first_row + i, "source": source})
+                self._append_records(records)
+
+            finished = time.perf_counter()
+            self._indexing_stats['indexed'] += len(documents)
+            self._indexing_stats['embedding_seconds'] += embedded - start
+            self._indexing_stats['seconds'] += finished - start
+            logger.info(f"Local insertion: {len(documents)} documents, "
+                        f"{len(documents) / max(finished - start, 1e-9):.1f} docs/s")
+            return 1
+        except Exception as e:
+            logger.error(f"Local insertion failed: {str(e)}")
+            self._indexing_stats['failed'] += len(documents)
+            return 0
+
+    def existing_hashes(self, chunk_ids: List[str]) -> Dict[str, Optional[str]]:
+        with self._lock:
+            return {chunk_id: self._sources[self._ids[chunk_id]].get("content_hash")
+                    for chunk_id in chunk_ids if chunk_id in self._ids}
+
+    def delete_stale_chunks(self, current_chunks: Dict[str, set]) -> int:
+        with self._lock:
+            stale = [chunk_id for chunk_id, row in self._ids.items()
+                     if self._sources[row].get("url") in current_chunks
+                     and chunk_id not in current_chunks[self._sources[row].get("url")]]
+            if stale:
+                self._append_records([{"op": "delete", "id": chunk_id} for chunk_id in stale])
+                logger.info(f"Deleted {len(stale)} stale chunks")
+            return len(stale)
+
+    @contextmanager
+    def bulk_loading(self):
+        yield
+        self.compact()
+        self.save_ann()
+
+    def compact(self, min_garbage_ratio: float = 0.3) -> None:
+        """Rewrite the version without freed rows once they make up min_garbage_ratio of it."""
+        with self._lock:
+            garbage = len(self._sources) - len(self._ids)
+            if not self._sources or garbage / len(self._sources) < min_garbage_ratio:
+                return
+            path = self._version_path()
+            rows = sorted(self._ids.values())
+            vectors = np.asarray(self._vectors[rows])
+            with open(os.path.join(path, "vectors.bin.tmp"), "wb") as f:
+                f.write(vectors.tobytes())
+            with open(os.path.join(path, "docs.jsonl.tmp"), "wb") as f:
+                for new_row, row in enumerate(rows):
+                    source = self._sources[row]
+                    record = {"op": "put", "id": source["chunk_id"], "row": new_row, "source": source}
+                    f.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            self._vectors = None
+            os.replace(os.path.join(path, "vectors.bin.tmp"), os.path.join(path, "vectors.bin"))
+            os.replace(os.path.join(path, "docs.jsonl.tmp"), os.path.join(path, "docs.jsonl"))
+            if os.path.exists(self._ann_path()):
+                os.remove(self._ann_path())  # row numbers changed; rebuilt by save_ann
+            logger.info(f"Compacted local index {self.index_name}: dropped {garbage} freed rows")
+            self._open(self.index_name)
+
+    def indexing_stats(self) -> Dict[str, Any]:
+        stats = dict(self._indexing_stats)
+        stats['docs_per_second'] = stats['indexed'] / stats['seconds'] if stats['seconds'] else 0.0
+        return stats
+
+    # ---- rebuilds -------------------------------------------------------------------------
+
+    def begin_rebuild(self, resume: bool = False) -> str:
+        live = self._current_version()
+        version = None
+        if resume:
+            pending = [name for name in self._version_dirs() if name != live and name > (live or "")]
+            version = pending[-1] if pending else None
+        self._open(version or self._create_version())
+        logger.info(f"Rebuilding into {self.index_name}; {live} stays live")
+        return self.index_name
+
+    def finish_rebuild(self) -> Dict[str, Any]:
+        version = self.index_name
+        live = self._current_version()
+        live_count = 0
+        if live and live != version:
+            live_count = LocalVectorStore(self.config, read_only=True, root=self.root).count()
+
+        count = self.count()
+        min_ratio = getattr(self.config, 'rebuild_min_doc_ratio', 0.9)
+        query = getattr(self.config, 'rebuild_validation_query', "What is Salesforce Data Cloud?")
+        hits = self.vector_search(self.index_embeddings.embed_texts([query])[0], 3)
+        if count == 0 or count < live_count * min_ratio or not hits:
+            message = f"{version} has {count} documents (live {live_count}), sample query hits: {len(hits)}"
+            logger.error(f"Rebuild validation failed, {live} stays live: {message}")
+            self._open(live)
+            return {'index': version, 'swapped': False, 'message': message}
+
+        self._set_current(version)
+        logger.info(f"Local index now serves {version} (was {live})")
+        return {'index': version, 'swapped': True, 'message': f"{count} documents (live {live_count})",
+                'deleted_versions': self.gc_versions()}
+
+    def abort_rebuild(self) -> None:
+        self._open(self._current_version())
+
+    def gc_versions(self) -> List[str]:
+        keep = max(1, getattr(self.config, 'index_versions_to_keep', 2))
+        live = self._current_version()
+        versions = self._version_dirs()
+        retired = [name for name in versions if name < (live or "")]
+        to_delete = retired[:max(0, len(retired) - (keep - 1))]
+        for version in to_delete:
+            shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+            logger.info(f"Deleted old local index version {version}")
+        return to_delete
+
+    # ---- search ---------------------------------------------------------------------------
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def _hits(self, rows: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        hits = []
+        for row in rows:
+            score = float(scores[row])
+            if score == -np.inf:
+                break
+            source = self._sources[row]
+            hits.append({"_id": source["chunk_id"], "_score": score, "_source": source})
+        return hits
+
+    def _live_mask(self, num_rows: int) -> np.ndarray:
+        if self._live is None or len(self._live) != num_rows:
+            mask = np.zeros(num_rows, dtype=bool)
+            mask[np.fromiter(self._ids.values(), dtype=np.int64, count=len(self._ids))] = True
+            self._live = mask
+        return self._live
+
+    def vector_scores(self, query_vector) -> np.ndarray:
+        """Cosine similarity of the query to every row; freed rows score -inf."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            num_rows = len(self._sources)
+            vectors = self._vectors[:num_rows]
+            if vectors.dtype == np.float32:
+                scores = vectors @ query
+            else:
+                # Upcast block by block instead of materializing a float32 copy of the whole matrix
+                scores = np.empty(num_rows, dtype=np.float32)
+                for start in range(0, num_rows, 65536):
+                    scores[start:start + 65536] = vectors[start:start + 65536].astype(np.float32) @ query
+            scores[~self._live_mask(num_rows)] = -np.inf
+        return scores
+
+    def vector_search(self, query_vector, top_k: int, ef: Optional[int] = None,
+                      nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        if not self._ids:
+            return []
+        if self._ann is None:
+            scores = self.vector_scores(query_vector)
+            return self._hits(top_k_rows(scores, top_k), scores)
+        return self._ann_search(query_vector, top_k, ef, nprobe)
+
+    def _ann_search(self, query_vector, top_k: int, ef: Optional[int], nprobe: Optional[int]) -> List[Dict[str, Any]]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            num_rows = len(self._sources)
+            live = self._live_mask(num_rows)
+            kwargs = {'ef': ef} if self._ann.kind == "hnsw" else {'nprobe': nprobe}
+            candidates, _ = self._ann.search(query, top_k * self.ann_rerank_factor, **kwargs)
+            # Rows appended since the index was last saved are scanned exactly
+            rows = np.concatenate([candidates, np.arange(self._ann_rows, num_rows)])
+            rows = rows[rows < num_rows]
+            rows = np.unique(rows[live[rows]])
+            if not len(rows):
+                return []
+            # Re-rank the candidates with the exact stored vectors
+            exact = np.asarray(self._vectors[rows], dtype=np.float32) @ query
+            order = np.argsort(-exact, kind="stable")[:top_k]
+            return [{"_id": self._sources[rows[i]]["chunk_id"], "_score": float(exact[i]),
+                     "_source": self._sources[rows[i]]} for i in order]
+
+    def lexical_search(self, query: str, top_k: int, field: str = "text") -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._bm25_dirty:
+                self._bm25 = {}
+                self._bm25_dirty = False
+            index = self._bm25.get(field)
+            if index is None:
+                index = self._bm25[field] = BM25Index()
+                index.build([(source.get(field) or "") if source is not None else None for source in self._sources])
+            scores = index.scores(query)
+            if scores is None:
+                return []
+            scores = np.where(scores > 0, scores, -np.inf)
+            return self._hits(top_k_rows(scores, top_k), scores)
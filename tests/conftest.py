@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the project the same way the scripts do: `src` and `config` from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
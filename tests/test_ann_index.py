@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.vectorstore.ann_index import IVFPQIndex, build_ann_index, resolve_pq_m
+
+
+def test_resolve_pq_m_keeps_a_divisor():
+    assert resolve_pq_m(768, 48) == 48
+
+
+def test_resolve_pq_m_falls_back_to_largest_divisor():
+    # The default pq_m=48 against a 256-dim PCA/matryoshka reduction
+    assert resolve_pq_m(256, 48) == 32
+    assert resolve_pq_m(100, 48) == 25
+
+
+def test_build_ann_index_uses_resolved_pq_m():
+    index = build_ann_index("ivfpq", 256, SimpleNamespace(pq_m=48, ivf_nlist=4))
+    assert index.m == 32
+    assert index.dsub == 8
+
+
+def test_ivfpq_rejects_non_divisor():
+    with pytest.raises(ValueError):
+        IVFPQIndex(256, m=48)
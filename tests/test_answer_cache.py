@@ -0,0 +1,28 @@
+from src.generation.answer_cache import SemanticAnswerCache
+
+
+def test_failed_version_lookup_keeps_the_cache():
+    versions = iter(["v1", None, "v1", "v2"])
+    cache = SemanticAnswerCache(version_fn=lambda: next(versions), version_check_seconds=0)
+    cache.put([1.0, 0.0], {"answer": "a"})        # v1
+    assert cache.get([1.0, 0.0])["answer"] == "a"   # lookup failed
+    assert cache.get([1.0, 0.0])["answer"] == "a"   # still v1
+    assert cache.get([1.0, 0.0]) is None            # v2 flushed it
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_version_lookup_runs_without_the_lock():
+    cache = SemanticAnswerCache(version_check_seconds=0)
+    lock_free = []
+
+    def version():
+        acquired = cache._lock.acquire(blocking=False)
+        if acquired:
+            cache._lock.release()
+        lock_free.append(acquired)
+        return "v1"
+
+    cache.version_fn = version
+    cache.put([0.0, 1.0], {"answer": "b"})
+    cache.get([0.0, 1.0])
+    assert lock_free == [True, True]
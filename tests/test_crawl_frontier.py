@@ -0,0 +1,16 @@
+import asyncio
+
+from src.document_processing.web_scraper_2 import SmartDocumentScraper
+
+
+def test_full_frontier_counts_dropped_links_but_keeps_seeds():
+    scraper = SmartDocumentScraper(max_depth=3, max_frontier_size=2)
+    frontier = asyncio.Queue()
+    for i in range(3):
+        scraper._enqueue(frontier, f"https://seed/{i}", 1, seed=True)
+    scraper._enqueue(frontier, "https://link", 2)
+
+    assert frontier.qsize() == 3
+    assert scraper.frontier_dropped == 1
+    # A dropped link is not marked visited, so it can be queued again once there is room
+    assert "https://link" not in scraper.visited_urls
@@ -0,0 +1,61 @@
+import pytest
+
+from src.document_processing.crawl_journal import CrawlJournal, FAILED, INDEXED, PENDING, SCRAPED
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = CrawlJournal(str(tmp_path / "journal" / "crawl.db"))
+    journal.reset("https://start")
+    yield journal
+    journal.close()
+
+
+def test_page_lifecycle_pending_scraped_indexed(journal):
+    journal.add_pending("https://a", 1)
+    assert journal.stats() == {PENDING: 1}
+
+    journal.mark_scraped("https://a", ["a#0", "a#1"])
+    assert journal.stats() == {SCRAPED: 1}
+    assert journal.filter_unindexed(["a#0", "a#1"]) == {"a#0", "a#1"}
+
+    journal.mark_chunks_indexed(["a#0"])
+    assert journal.stats() == {SCRAPED: 1}
+    journal.mark_chunks_indexed(["a#1"])
+    assert journal.stats() == {INDEXED: 1}
+    assert journal.filter_unindexed(["a#0", "a#1", "b#0"]) == {"b#0"}
+
+
+def test_page_without_chunks_is_indexed_immediately(journal):
+    journal.add_pending("https://empty", 0)
+    journal.mark_scraped("https://empty", [])
+    assert journal.stats() == {INDEXED: 1}
+
+
+def test_unfinished_pages_are_resumed_shallowest_first(journal):
+    journal.add_pending("https://deep", 2)
+    journal.add_pending("https://shallow", 1)
+    journal.add_pending("https://done", 0)
+    journal.mark_scraped("https://done", [])
+    journal.add_pending("https://broken", 1)
+    journal.mark_failed("https://broken", "timeout")
+
+    assert journal.stats()[FAILED] == 1
+    assert journal.unfinished_pages() == [("https://shallow", 1), ("https://broken", 1), ("https://deep", 2)]
+    assert journal.known_urls() == {"https://deep", "https://shallow", "https://done", "https://broken"}
+
+
+def test_state_survives_reopen_and_reset_clears_it(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    journal = CrawlJournal(path)
+    journal.reset("https://start")
+    journal.add_pending("https://a", 0)
+    journal.close()
+
+    journal = CrawlJournal(path)
+    assert journal.start_url() == "https://start"
+    assert journal.unfinished_pages() == [("https://a", 0)]
+    journal.reset("https://other")
+    assert journal.start_url() == "https://other"
+    assert journal.known_urls() == set()
+    journal.close()
@@ -0,0 +1,37 @@
+from src.document_processing.deduplication import ChunkDeduplicator, simhash
+
+TEXT = ("Data Cloud unifies customer data from every Salesforce org and external source "
+        "into a single profile that segments, activations and calculated insights can use.")
+
+
+def test_exact_duplicates_ignore_case_and_whitespace():
+    dedup = ChunkDeduplicator()
+    assert not dedup.is_duplicate(TEXT)
+    assert dedup.is_duplicate("  " + TEXT.upper().replace(" ", "\n  "))
+    assert dedup.stats() == {'unique_chunks': 1, 'exact_duplicates': 1,
+                             'near_duplicates': 0, 'duplicates_dropped': 1}
+
+
+def test_near_duplicate_is_dropped_and_different_text_kept():
+    dedup = ChunkDeduplicator(similarity_threshold=0.9)
+    assert not dedup.is_duplicate(TEXT)
+    assert dedup.is_duplicate(TEXT + " Learn more.")
+    assert not dedup.is_duplicate("Identity resolution rulesets match and reconcile individuals "
+                                  "across data streams using fuzzy and exact match rules.")
+    assert dedup.near_duplicates == 1
+    assert dedup.unique == 2
+
+
+def test_filter_keeps_metadata_aligned():
+    dedup = ChunkDeduplicator()
+    docs = [TEXT, "Another chunk about data streams and ingestion APIs.", TEXT]
+    meta = [{"chunk_id": "1"}, {"chunk_id": "2"}, {"chunk_id": "3"}]
+    kept_docs, kept_meta = dedup.filter(docs, meta)
+    assert kept_docs == docs[:2]
+    assert [m["chunk_id"] for m in kept_meta] == ["1", "2"]
+    assert dedup.dropped == 1
+
+
+def test_simhash_is_stable_and_case_insensitive():
+    assert simhash(TEXT) == simhash(TEXT.lower())
+    assert 0 <= simhash(TEXT) < 2 ** 64
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.embeddings.dimension_reduction import DimensionReducer
+
+
+def random_vectors(n, dim, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_pca_fit_transform_shapes_and_unit_norm(tmp_path):
+    reducer = DimensionReducer("pca", target_dim=16, path=str(tmp_path / "pca.npz"))
+    assert not reducer.fitted
+    reducer.fit(random_vectors(200, 64))
+    assert reducer.fitted
+    assert reducer.components.shape == (64, 16)
+
+    reduced = reducer.transform(random_vectors(5, 64, seed=1))
+    assert reduced.shape == (5, 16)
+    assert np.linalg.norm(reduced, axis=1) == pytest.approx(np.ones(5), abs=1e-5)
+    assert reducer.transform(random_vectors(64, 64)[0]).shape == (16,)
+
+
+def test_pca_is_saved_and_loaded_for_queries(tmp_path):
+    path = str(tmp_path / "pca.npz")
+    writer = DimensionReducer("pca", target_dim=8, path=path)
+    writer.fit(random_vectors(100, 32))
+    reader = DimensionReducer("pca", target_dim=8, path=path)
+    query = random_vectors(1, 32, seed=2)
+    np.testing.assert_allclose(reader.transform(query), writer.transform(query), atol=1e-6)
+
+
+def test_pca_on_fewer_samples_than_target_dim_keeps_output_dim():
+    reducer = DimensionReducer("pca", target_dim=32, path=None)
+    reducer.fit(random_vectors(5, 64))
+    assert reducer.transform(random_vectors(3, 64)).shape == (3, 32)
+    assert reducer.output_dim(64) == 32
+
+    single = DimensionReducer("pca", target_dim=32, path=None)
+    single.fit(random_vectors(1, 64))
+    assert single.transform(random_vectors(2, 64)).shape == (2, 32)
+
+
+def test_matryoshka_truncates_and_none_passes_through():
+    vectors = random_vectors(4, 64)
+    truncated = DimensionReducer("matryoshka", target_dim=16).transform(vectors)
+    assert truncated.shape == (4, 16)
+    np.testing.assert_allclose(truncated[0] * np.linalg.norm(vectors[0, :16]), vectors[0, :16], rtol=1e-5)
+    assert DimensionReducer("none").transform(vectors).shape == (4, 64)
+    with pytest.raises(ValueError):
+        DimensionReducer("svd")
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("elasticsearch")
+
+from src.vectorstore import elasticsearch_store
+from src.vectorstore.elasticsearch_store import ElasticSearchStore
+from src.vectorstore.es_client import BULK_RETRY_STATUSES
+
+
+def make_store(**settings):
+    # Skip __init__: it loads the embedding model and talks to the cluster
+    store = ElasticSearchStore.__new__(ElasticSearchStore)
+    store.config = SimpleNamespace(bulk_chunk_size=2, bulk_max_retries=3, bulk_initial_backoff=0,
+                                   bulk_request_timeout=30, **settings)
+    store.es = mock.MagicMock()
+    return store
+
+
+def actions(*ids):
+    return [{"_index": "docs_v1", "_id": doc_id, "_source": {"text": doc_id}} for doc_id in ids]
+
+
+def test_bulk_uses_bulk_client_options_and_counts_results(monkeypatch):
+    store = make_store(bulk_threads=1)
+    calls = {}
+
+    def streaming_bulk(client, items, **kwargs):
+        calls.update(client=client, kwargs=kwargs)
+        for item in items:
+            ok = item["_id"] != "bad"
+            yield ok, {"index": {"_id": item["_id"], "status": 201 if ok else 400}}
+
+    monkeypatch.setattr(elasticsearch_store, "streaming_bulk", streaming_bulk)
+    indexed, failed = store._bulk(actions("a", "b", "bad"))
+
+    assert indexed == 2
+    assert [item["index"]["_id"] for item in failed] == ["bad"]
+    # 429s are retried by streaming_bulk only, not by the transport as well
+    store.es.options.assert_called_once_with(request_timeout=30, retry_on_status=BULK_RETRY_STATUSES)
+    assert 429 not in BULK_RETRY_STATUSES
+    assert calls["client"] is store.es.options.return_value
+    assert calls["kwargs"]["max_retries"] == 3
+    assert calls["kwargs"]["chunk_size"] == 2
+
+
+def test_parallel_bulk_rejections_are_retried_once_through_streaming_bulk(monkeypatch):
+    store = make_store(bulk_threads=2)
+    retried = []
+
+    def parallel_bulk(client, items, **kwargs):
+        for item in items:
+            status = 429 if item["_id"] == "busy" else 201
+            yield status == 201, {"index": {"_id": item["_id"], "status": status}}
+
+    def streaming_bulk(client, items, **kwargs):
+        for item in items:
+            retried.append(item["_id"])
+            yield True, {"index": {"_id": item["_id"], "status": 201}}
+
+    monkeypatch.setattr(elasticsearch_store, "parallel_bulk", parallel_bulk)
+    monkeypatch.setattr(elasticsearch_store, "streaming_bulk", streaming_bulk)
+    indexed, failed = store._bulk(actions("a", "busy", "c"))
+
+    assert (indexed, failed) == (3, [])
+    assert retried == ["busy"]
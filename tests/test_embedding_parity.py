@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.embeddings.embeddings import quantize_int8
+
+
+def test_int8_quantization_agrees_with_fp32():
+    # A small Linear stack stands in for the transformer; quantize_int8 only touches Linear layers
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(
+        torch.nn.Linear(128, 256), torch.nn.GELU(), torch.nn.Linear(256, 384)
+    ).eval()
+    inputs = torch.randn(64, 128)
+
+    with torch.no_grad():
+        reference = model(inputs).numpy()
+        quantized = quantize_int8(model)(inputs).numpy()
+
+    cosines = np.sum(reference * quantized, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(quantized, axis=1)
+    )
+    # Same thresholds as scripts/check_embedding_parity.py
+    assert cosines.min() >= 0.98
+    assert cosines.mean() >= 0.99
@@ -0,0 +1,75 @@
+import numpy as np
+
+from src.embeddings.embedding_cache import CachedEmbeddings, EmbeddingCacheStore
+from src.embeddings.embeddings import SentenceTransformerEmbeddings
+
+
+class FakeModel:
+    """Stands in for a SentenceTransformer: one-token-per-word lengths, vectors from text length."""
+
+    max_seq_length = 512
+    tokenizer = None
+
+    def __init__(self):
+        self.pool_calls = []
+
+    def _vectors(self, texts):
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    def encode(self, texts, convert_to_numpy=True, batch_size=32, normalize_embeddings=False):
+        return self._vectors(texts)
+
+    def start_multi_process_pool(self, target_devices):
+        return object()
+
+    def stop_multi_process_pool(self, pool):
+        pass
+
+    def encode_multi_process(self, texts, pool, batch_size=32, chunk_size=None, normalize_embeddings=False):
+        self.pool_calls.append((len(texts), batch_size, chunk_size))
+        return self._vectors(texts)
+
+
+def make_embeddings(batch_size=4, tokens_per_batch=64, num_workers=0, output_dtype="float32"):
+    # Skip __init__, which loads a real model
+    embeddings = SentenceTransformerEmbeddings.__new__(SentenceTransformerEmbeddings)
+    embeddings.model = FakeModel()
+    embeddings.device = "cpu"
+    embeddings.normalize_embeddings = False
+    embeddings.batch_size = batch_size
+    embeddings.tokens_per_batch = tokens_per_batch
+    embeddings.num_workers = num_workers
+    embeddings.output_dtype = np.dtype(output_dtype)
+    embeddings._pool = None
+    embeddings._dimension = 2
+    return embeddings
+
+
+def test_length_buckets_respect_batch_size_and_token_budget():
+    embeddings = make_embeddings(batch_size=4, tokens_per_batch=64)
+    texts = ["x" * 4] * 10 + ["x" * 400] * 3
+    lengths = np.array([1] * 10 + [100] * 3)
+    order = np.argsort(-lengths, kind="stable")
+    buckets = embeddings._length_buckets([texts[i] for i in order], lengths[order])
+    assert [len(bucket) for bucket in buckets] == [1, 1, 1, 4, 4, 2]
+
+
+def test_multi_process_path_encodes_length_buckets_in_original_order():
+    embeddings = make_embeddings(batch_size=4, tokens_per_batch=100, num_workers=2)
+    texts = ["a " * 10, "b", "c " * 200, "d", "e " * 3]
+    vectors = embeddings.embed_texts(texts)
+    assert vectors[:, 0].tolist() == [len(text.strip()) for text in texts]
+    assert all(chunk % batch == 0 for _, batch, chunk in embeddings.model.pool_calls)
+    assert embeddings.model.pool_calls[0][1] == 1   # the ~100-token text gets a batch of its own
+    embeddings.close()
+    assert embeddings._pool is None
+
+
+def test_cached_embeddings_use_the_model_output_dtype(tmp_path):
+    model = make_embeddings(output_dtype="float16")
+    cached = CachedEmbeddings(model, str(tmp_path), model_name="fake",
+                              store=EmbeddingCacheStore(str(tmp_path)))
+    first = cached.embed_texts(["one", "three"])
+    second = cached.embed_texts(["one", "three"])
+    assert first.dtype == second.dtype == np.float16
+    assert cached.stats() == {'hits': 2, 'misses': 2}
@@ -0,0 +1,39 @@
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("elasticsearch")
+
+from src.vectorstore import es_client
+
+
+@pytest.fixture
+def config():
+    return SimpleNamespace(es_url="http://es:9200", username=None, es_pool_maxsize=8)
+
+
+def test_sync_and_async_clients_are_shared_with_one_policy(config, monkeypatch):
+    sync_cls, async_cls = mock.MagicMock(), mock.MagicMock()
+    monkeypatch.setattr(es_client, "Elasticsearch", sync_cls)
+    monkeypatch.setattr("elasticsearch.AsyncElasticsearch", async_cls)
+    monkeypatch.setattr(es_client, "_clients", {})
+
+    assert es_client.get_es_client(config) is es_client.get_es_client(config)
+    assert es_client.get_async_es_client(config) is es_client.get_async_es_client(config)
+    assert sync_cls.call_count == async_cls.call_count == 1
+    assert sync_cls.call_args.kwargs == async_cls.call_args.kwargs
+    assert sync_cls.call_args.kwargs["connections_per_node"] == 8
+    assert sync_cls.call_args.kwargs["retry_on_status"] == es_client.RETRY_STATUSES
+
+
+def test_close_awaits_async_clients_and_closes_sync_ones(config, monkeypatch):
+    sync_client, async_client = mock.MagicMock(), mock.MagicMock()
+    async_client.close = mock.AsyncMock()
+    monkeypatch.setattr(es_client, "_clients", {("sync", "u", None): sync_client,
+                                                ("async", "u", None): async_client})
+    asyncio.run(es_client.close_es_clients())
+    sync_client.close.assert_called_once_with()
+    async_client.close.assert_awaited_once_with()
+    assert es_client._clients == {}
@@ -0,0 +1,55 @@
+import pytest
+
+from src.retrieval.fusion import fuse
+
+
+def hits(*scored):
+    return [{"_id": doc_id, "_score": score, "_source": {"text": doc_id, "url": f"https://x/{doc_id}"}}
+            for doc_id, score in scored]
+
+
+def ids(results):
+    return [doc["id"] for doc in results]
+
+
+def test_rrf_ranks_documents_found_by_both_retrievers_first():
+    results = fuse({"lexical": hits(("a", 3.0), ("b", 2.0)),
+                    "semantic": hits(("b", 0.9), ("c", 0.8))}, method="rrf", k=60)
+    assert ids(results) == ["b", "a", "c"]
+    assert results[0]["fusion_score"] == pytest.approx(1 / 62 + 1 / 61)
+    assert results[0]["url"] == "https://x/b"
+
+
+def test_rrf_ignores_weights_and_weighted_rrf_uses_them():
+    lists = {"lexical": hits(("a", 1.0)), "semantic": hits(("c", 1.0))}
+    weights = {"lexical": 1.0, "semantic": 3.0}
+    assert ids(fuse(lists, method="rrf", weights=weights)) == ["a", "c"]
+    assert ids(fuse(lists, method="weighted_rrf", weights=weights)) == ["c", "a"]
+
+
+def test_score_fusion_fills_missing_documents_with_the_list_minimum():
+    results = fuse({"lexical": hits(("a", 10.0), ("b", 5.0), ("c", 0.0)),
+                    "semantic": hits(("d", 0.9))}, method="minmax")
+    scores = {doc["id"]: doc["fusion_score"] for doc in results}
+    # a: 1 + semantic filled with its only (= minimum) value 1; d: lexical filled with 0
+    assert scores == pytest.approx({"a": 2.0, "b": 1.5, "c": 1.0, "d": 1.0})
+
+
+def test_zscore_orders_by_combined_standardized_score():
+    results = fuse({"lexical": hits(("a", 3.0), ("b", 2.0), ("c", 1.0)),
+                    "semantic": hits(("c", 0.9), ("b", 0.8), ("a", 0.1))}, method="zscore")
+    assert ids(results)[0] == "b"
+
+
+def test_top_k_and_per_retriever_score_keys():
+    results = fuse({"lexical": hits(("a", 1.0), ("b", 0.5)), "semantic": [], "title": hits(("a", 2.0))},
+                   top_k=1)
+    assert ids(results) == ["a"]
+    assert {"lexical_score", "semantic_score", "title_score"} <= set(results[0])
+    assert results[0]["semantic_score"] == 0.0
+
+
+def test_empty_lists_and_unknown_method():
+    assert fuse({"lexical": [], "semantic": []}) == []
+    with pytest.raises(ValueError):
+        fuse({"lexical": hits(("a", 1.0))}, method="borda")
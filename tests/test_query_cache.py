@@ -0,0 +1,46 @@
+from src.embeddings import query_cache
+from src.embeddings.query_cache import QueryEmbeddingCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_keys_collapse_whitespace_but_keep_case():
+    cache = QueryEmbeddingCache(max_size=10)
+    cache.put("what is  Data\nCloud", [1.0])
+    assert cache.get("what is Data Cloud") == [1.0]
+    assert cache.get("what is data cloud") is None
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = QueryEmbeddingCache(max_size=2, ttl_seconds=None)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    assert cache.get("a") == [1.0]  # "b" is now least recently used
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.get("c") == [3.0]
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    cache = QueryEmbeddingCache(max_size=10, ttl_seconds=60)
+    cache.put("q", [1.0])
+    clock.now += 59
+    assert cache.get("q") == [1.0]
+    clock.now += 2
+    assert cache.get("q") is None
+
+    stats = cache.stats()
+    assert stats['expirations'] == 1
+    assert stats['size'] == 0
+    assert (stats['hits'], stats['misses']) == (1, 1)
+    assert stats['hit_rate'] == 0.5
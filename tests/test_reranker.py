@@ -0,0 +1,56 @@
+import threading
+import time
+
+from src.retrieval import reranker as reranker_module
+from src.retrieval.reranker import CrossEncoderReranker
+
+
+class LengthModel:
+    """Scores a pair by passage length, optionally sleeping per batch."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def predict(self, pairs, batch_size):
+        time.sleep(self.delay)
+        return [len(passage) for _, passage in pairs]
+
+
+def make_reranker(monkeypatch, model, **kwargs):
+    monkeypatch.setattr(reranker_module.model_registry, "get_or_load", lambda key, loader: model)
+    return CrossEncoderReranker(**kwargs)
+
+
+def documents(n):
+    return [{"id": i, "text": "x" * i} for i in range(n)]
+
+
+def test_rerank_keeps_best_by_cross_encoder_score(monkeypatch):
+    reranker = make_reranker(monkeypatch, LengthModel(), batch_size=4, budget_ms=1000)
+    results = reranker.rerank("q", documents(10), top_n=3)
+    assert [doc["id"] for doc in results] == [9, 8, 7]
+    assert results[0]["rerank_score"] == 9.0
+    assert reranker.stats()["reranked"] == 1
+
+
+def test_budget_is_one_deadline_for_queueing_and_scoring(monkeypatch):
+    # One worker, 40 ms batches: concurrent requests queue behind each other
+    reranker = make_reranker(monkeypatch, LengthModel(delay=0.04), batch_size=4, budget_ms=60, workers=1)
+    latencies, results = [], []
+
+    def request():
+        start = time.perf_counter()
+        results.append(reranker.rerank("q", documents(12), top_n=2))
+        latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(latencies) < 0.06 + 0.03
+    # Every request missed the budget and got the fused order back
+    assert all([doc["id"] for doc in result] == [0, 1] for result in results)
+    stats = reranker.stats()
+    assert stats["timeouts"] + stats["queue_timeouts"] == 4